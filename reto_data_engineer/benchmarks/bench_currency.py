@@ -0,0 +1,94 @@
+"""
+Benchmark de la conversión a moneda de reporte (etl/currency.py).
+
+Genera N órdenes sintéticas (monedas MXN/ARS/BRL/COP/USD, fechas en
+Q1 2024) contra una tabla de tasas diaria y compara la búsqueda fila a
+fila (bisect sobre las fechas de cada moneda, como haría un apply) con
+convert_amounts (np.searchsorted por moneda). Verifica que ambas den la
+misma tasa.
+
+Uso:
+    python -m reto_data_engineer.benchmarks.bench_currency --rows 1000000 --rowwise-rows 100000
+"""
+import argparse
+import bisect
+import time
+import numpy as np
+import pandas as pd
+
+from reto_data_engineer.etl.currency import build_rate_table, convert_amounts
+
+CURRENCIES = ["MXN", "ARS", "BRL", "COP", "USD"]
+BASE_RATES = {"MXN": 17.2, "ARS": 370.0, "BRL": 5.0, "COP": 3980.0}
+
+
+def synthetic_rates(days: int, rng) -> pd.DataFrame:
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    frames = [
+        pd.DataFrame({
+            "date": dates, "from_currency": "USD", "to_currency": cur,
+            "exchange_rate": base * (1 + rng.normal(0, 0.01, days)),
+        })
+        for cur, base in BASE_RATES.items()
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_orders(rows: int, rng) -> pd.DataFrame:
+    start = pd.Timestamp("2024-01-01", tz="UTC")
+    return pd.DataFrame({
+        "total_amount": rng.random(rows) * 500,
+        "currency": np.array(CURRENCIES, dtype=object)[rng.integers(0, len(CURRENCIES), rows)],
+        "order_date": start + pd.to_timedelta(rng.integers(0, 90 * 24 * 3600, rows), unit="s"),
+    })
+
+
+def rowwise_rates(orders: pd.DataFrame, table: pd.DataFrame) -> list:
+    by_currency = {
+        cur: (g["rate_date"].tolist(), g["fx_rate"].tolist())
+        for cur, g in table.groupby("currency")
+    }
+
+    def lookup(row):
+        if row["currency"] == "USD":
+            return 1.0
+        dates, rates = by_currency.get(row["currency"], ([], []))
+        i = bisect.bisect_right(dates, row["order_date"]) - 1
+        return rates[i] if i >= 0 else np.nan
+
+    return orders.apply(lookup, axis=1).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rowwise-rows", type=int, default=100_000,
+                        help="filas para la versión fila a fila (es lenta)")
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    table = build_rate_table(synthetic_rates(args.days, rng))
+    orders = synthetic_orders(args.rows, rng)
+    print(f"{args.rows} órdenes contra {len(table)} tasas ({args.days} días)\n")
+
+    t0 = time.perf_counter()
+    _, fx = convert_amounts(orders["total_amount"], orders["currency"], orders["order_date"], table)
+    t_vec = time.perf_counter() - t0
+
+    sample = orders.head(args.rowwise_rows)
+    t0 = time.perf_counter()
+    ref = rowwise_rates(sample, table)
+    t_row = time.perf_counter() - t0
+
+    ok = np.allclose(fx.head(len(sample)).to_numpy(), np.array(ref, dtype=float), equal_nan=True)
+    per_row_vec = t_vec / args.rows
+    per_row_slow = t_row / len(sample)
+    print(f"{'método':22}{'filas':>12}{'tiempo':>11}{'µs/fila':>10}")
+    print(f"{'fila a fila (bisect)':22}{len(sample):>12}{t_row:>10.3f}s{per_row_slow * 1e6:>10.2f}")
+    print(f"{'searchsorted':22}{args.rows:>12}{t_vec:>10.3f}s{per_row_vec * 1e6:>10.2f}")
+    print(f"\nspeedup por fila: {per_row_slow / per_row_vec:.0f}x   misma tasa: {'sí' if ok else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Benchmark de punta a punta sobre datos sintéticos a escala.
+
+Para cada tamaño (10K / 1M / 10M filas por dataset de hechos) genera o
+reutiliza el juego de datos de benchmarks/synthetic.py y mide, en un
+proceso hijo por tamaño (así el RSS pico de uno no contamina al otro):
+
+  - extract_all (cada archivo)
+  - cada transform_* (vía transform_all, por dataset)
+  - cada loader (bulk_load_* o load_*) contra el PostgreSQL local de
+    config/db_config.yaml, tabla por tabla
+
+con filas/s y el RSS pico del proceso al terminar cada etapa. Los
+resultados se guardan en benchmarks/results/<fecha>_<commit>.json;
+--compare contra un resultado anterior marca las mediciones que
+empeoraron más que --threshold (y sale con código 1, útil en CI).
+
+La carga escribe en la base configurada: usar una base descartable.
+
+Uso:
+    python -m reto_data_engineer.benchmarks.bench_etl --rows 10K,1M
+    python -m reto_data_engineer.benchmarks.bench_etl --rows 1M --no-load
+    python -m reto_data_engineer.benchmarks.bench_etl --rows 1M --compare results/base.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from reto_data_engineer.benchmarks.synthetic import generate, parse_rows
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# por encima de estas filas los loaders fila a fila tardan horas: se omiten
+ROW_LOADER_MAX_ROWS = 100_000
+
+# dataset transformado -> función que lo produce
+TRANSFORM_FUNCTIONS = {
+    "customers": "transform_customers",
+    "orders": "transform_orders",
+    "reviews": "transform_reviews",
+    "competitor_pricing": "transform_competitor",
+    "inventory_adjustments": "transform_inventory",
+    "support_tickets": "transform_support",
+    "email_sends": "transform_email_sends",
+    "campaigns": "transform_campaigns",
+}
+
+
+def _rate(rows: int, seconds: float):
+    return round(rows / seconds, 1) if seconds else None
+
+
+# ==============================
+# PROCESO HIJO: UN TAMAÑO
+# ==============================
+
+def run_scale(loader: str, load: bool) -> dict:
+    """Corre en el hijo, con RETO_DATA_DIR apuntando a los datos sintéticos."""
+    # imports aquí: extract lee RETO_DATA_DIR al importarse
+    from reto_data_engineer.etl.extract import extract_all, DATASET_FILES
+    from reto_data_engineer.etl.transform import transform_all
+    from reto_data_engineer.utils.logger import reset_metrics, metrics_report, peak_rss_bytes
+
+    def timers(name: str) -> dict:
+        return {tuple(sorted(t["labels"].items())): t["seconds"]
+                for t in metrics_report()["timers"] if t["name"] == name}
+
+    def peak_mb():
+        rss = peak_rss_bytes()
+        return round(rss / 1024 ** 2, 1) if rss is not None else None
+
+    result = {"extract": {}, "transform": {}, "load": {}, "peak_rss_mb": {}}
+    reset_metrics()
+
+    t0 = time.perf_counter()
+    raw = extract_all()
+    result["stage_seconds"] = {"extract": round(time.perf_counter() - t0, 3)}
+    result["peak_rss_mb"]["extract"] = peak_mb()
+    extract_times = timers("extract_dataset")
+    for name, filename in DATASET_FILES.items():
+        seconds = extract_times.get((("dataset", filename), ("source", "file")), 0.0)
+        result["extract"][filename] = {"seconds": round(seconds, 4), "rows": len(raw[name]),
+                                       "rows_per_s": _rate(len(raw[name]), seconds)}
+
+    t0 = time.perf_counter()
+    data = transform_all(raw)
+    result["stage_seconds"]["transform"] = round(time.perf_counter() - t0, 3)
+    result["peak_rss_mb"]["transform"] = peak_mb()
+    transform_times = timers("transform_dataset")
+    for key, df in data.items():
+        seconds = transform_times.get((("dataset", key),), 0.0)
+        fn = TRANSFORM_FUNCTIONS.get(key, f"transform_csv_table[{key}]")
+        result["transform"][fn] = {"seconds": round(seconds, 4), "rows": len(df),
+                                   "rows_per_s": _rate(len(df), seconds)}
+    del raw
+
+    if not load:
+        return result
+
+    from reto_data_engineer.main_etl import LOAD_TASKS, LOAD_DEPENDENCIES
+
+    t_stage = time.perf_counter()
+    customer_map = {}
+    # customers primero: el resto necesita customer_map
+    order = sorted(LOAD_TASKS, key=lambda t: t != "customers")
+    for table in order:
+        _, data_key, row_loader, bulk_loader = LOAD_TASKS[table]
+        df = data.get(data_key)
+        if df is None:
+            continue
+        fn = bulk_loader if loader == "bulk" else row_loader
+        name = getattr(getattr(fn, "func", fn), "__name__", str(fn))
+        if loader == "row" and len(df) > ROW_LOADER_MAX_ROWS:
+            print(f"LOAD: {name}({table}) omitido: {len(df)} filas > {ROW_LOADER_MAX_ROWS} fila a fila")
+            continue
+
+        t0 = time.perf_counter()
+        if table == "customers":
+            customer_map = fn(df)
+        elif "customers" in LOAD_DEPENDENCIES.get(table, ()):
+            fn(df, customer_map)
+        else:
+            fn(df)
+        seconds = time.perf_counter() - t0
+        result["load"][f"{name}[{table}]"] = {"seconds": round(seconds, 4), "rows": len(df),
+                                              "rows_per_s": _rate(len(df), seconds)}
+    result["stage_seconds"]["load"] = round(time.perf_counter() - t_stage, 3)
+    result["peak_rss_mb"]["load"] = peak_mb()
+    return result
+
+
+# ==============================
+# COMPARACIÓN
+# ==============================
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Mediciones que empeoraron más que threshold (tiempo o memoria)."""
+    regressions = []
+    for rows, scale in current["scales"].items():
+        base = baseline.get("scales", {}).get(rows)
+        if base is None:
+            continue
+        for section in ("extract", "transform", "load"):
+            for name, now in scale[section].items():
+                before = base.get(section, {}).get(name)
+                # por debajo de 10 ms el ruido domina
+                if not before or max(now["seconds"], before["seconds"]) < 0.01:
+                    continue
+                if now["seconds"] > before["seconds"] * (1 + threshold):
+                    regressions.append((rows, section, name, before["seconds"], now["seconds"], "s"))
+        for stage, now in scale["peak_rss_mb"].items():
+            before = base.get("peak_rss_mb", {}).get(stage)
+            if before and now and now > before * (1 + threshold):
+                regressions.append((rows, "peak_rss_mb", stage, before, now, "MB"))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scale(rows: int, scale: dict):
+    print(f"\n===== {rows} filas =====")
+    print(f"{'medición':48}{'filas':>10}{'segundos':>11}{'filas/s':>14}")
+    for section in ("extract", "transform", "load"):
+        for name, m in scale[section].items():
+            rate = f"{m['rows_per_s']:,.0f}" if m["rows_per_s"] else "-"
+            print(f"{section + ' ' + name:48}{m['rows']:>10}{m['seconds']:>11.3f}{rate:>14}")
+    print("etapas: " + ", ".join(f"{k} {v:.2f} s" for k, v in scale["stage_seconds"].items()))
+    print("RSS pico: " + ", ".join(f"{k} {v} MB" for k, v in scale["peak_rss_mb"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="10K", help="tamaños separados por coma: 10K,1M,10M")
+    parser.add_argument("--loader", choices=["bulk", "row"], default="bulk")
+    parser.add_argument("--no-load", action="store_true", help="sólo extract + transform (sin BD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="archivo de resultados (por defecto results/)")
+    parser.add_argument("--compare", default=None, help="resultado anterior contra el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.15, help="empeoramiento tolerado (0.15 = 15 %%)")
+    parser.add_argument("--scale-worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scale_worker:
+        result = run_scale(args.loader, not args.no_load)
+        with open(args.scale_worker, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    commit = _git_commit()
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "loader": None if args.no_load else args.loader,
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__},
+        "scales": {},
+    }
+
+    for rows in [parse_rows(r) for r in args.rows.split(",")]:
+        data_dir = generate(rows, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "scale.json")
+            cmd = [sys.executable, "-m", "reto_data_engineer.benchmarks.bench_etl",
+                   "--loader", args.loader, "--scale-worker", out]
+            if args.no_load:
+                cmd.append("--no-load")
+            subprocess.run(cmd, check=True, env={**os.environ, "RETO_DATA_DIR": data_dir})
+            with open(out, "r", encoding="utf-8") as f:
+                report["scales"][str(rows)] = json.load(f)
+        print_scale(rows, report["scales"][str(rows)])
+
+    path = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresultados: {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        print(f"\ncomparación contra {args.compare} (commit {baseline.get('commit')}):")
+        if not regressions:
+            print(f"sin regresiones por encima de {args.threshold:.0%}")
+            return
+        for rows, section, name, before, now, unit in regressions:
+            print(f"⚠ REGRESIÓN {rows} filas {section} {name}: {before:.3f} → {now:.3f} {unit} "
+                  f"(+{now / before - 1:.0%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
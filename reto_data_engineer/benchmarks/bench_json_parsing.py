@@ -0,0 +1,67 @@
+"""
+Benchmark de backends de parseo JSON (stdlib / orjson / pyarrow).
+
+Replica los registros de data/json hasta --scale veces en un directorio
+temporal (mismo nombre de archivo, así aplica el esquema) y mide para
+cada backend el tiempo de load_json con y sin esquema y la memoria del
+DataFrame resultante. Se genera también una variante NDJSON para pyarrow.
+
+Uso:
+    python -m reto_data_engineer.benchmarks.bench_json_parsing --scale 20000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from reto_data_engineer.etl.extract import BASE_PATH, DATASET_FILES, PARSERS, load_json
+
+
+def build_scaled_files(target_dir: str, scale: int) -> list:
+    files = []
+    for filename in sorted(f for f in set(DATASET_FILES.values()) if f.endswith(".json")):
+        with open(os.path.join(BASE_PATH, filename), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        records = records if isinstance(records, list) else [records]
+
+        with open(os.path.join(target_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(records * scale, f)
+
+        ndjson = filename.replace(".json", ".ndjson")
+        with open(os.path.join(target_dir, ndjson), "w", encoding="utf-8") as f:
+            for _ in range(scale):
+                for r in records:
+                    f.write(json.dumps(r) + "\n")
+        files.append(filename)
+    return files
+
+
+def run(path: str, parser: str, typed: bool):
+    t0 = time.perf_counter()
+    df = load_json(path, parser=parser, typed=typed)
+    return time.perf_counter() - t0, df.memory_usage(deep=True).sum() / 2**20, len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=20_000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_json_")
+    try:
+        files = build_scaled_files(tmp, args.scale)
+        print(f"{'archivo':34}{'parser':>9}{'esquema':>9}{'filas':>10}{'seg':>9}{'MiB':>9}")
+        for filename in files:
+            for name in sorted(PARSERS):
+                target = filename.replace(".json", ".ndjson") if name == "pyarrow" else filename
+                for typed in (False, True):
+                    secs, mib, rows = run(os.path.join(tmp, target), name, typed)
+                    print(f"{target:34}{name:>9}{'sí' if typed else 'no':>9}{rows:>10}{secs:>9.3f}{mib:>9.1f}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
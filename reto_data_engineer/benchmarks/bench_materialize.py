@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: materialización de filas para la BD.
+
+Compara el camino clásico (iterrows + clean_value por celda) contra
+etl/materialize.py (columna a columna con máscaras NumPy) y contra el
+buffer COPY vectorizado, sobre los datasets transformados de data/json
+replicados hasta N filas.
+
+Uso:
+    python -m reto_data_engineer.benchmarks.bench_materialize --rows 100000
+"""
+import argparse
+import time
+import pandas as pd
+
+from reto_data_engineer.etl.extract import extract_all
+from reto_data_engineer.etl.transform import transform_all
+from reto_data_engineer.etl.load import clean_value
+from reto_data_engineer.etl.materialize import materialize_rows, to_copy_buffer
+
+
+def scale(df: pd.DataFrame, rows: int) -> pd.DataFrame:
+    reps = rows // len(df) + 1
+    return pd.concat([df] * reps, ignore_index=True).head(rows)
+
+
+def per_cell(df: pd.DataFrame, cols: list) -> list:
+    return [tuple(clean_value(row[c]) for c in cols) for _, row in df.iterrows()]
+
+
+def timeit(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--datasets", default="orders,reviews,email_sends,inventory_adjustments")
+    args = parser.parse_args()
+
+    data = transform_all(extract_all())
+
+    print(f"{'dataset':24}{'filas':>10}{'iterrows':>12}{'vector':>12}{'copy':>12}{'speedup':>10}")
+    for name in args.datasets.split(","):
+        df = scale(data[name], args.rows)
+        cols = list(df.columns)
+
+        t_cell = timeit(per_cell, df, cols)
+        t_vec = timeit(materialize_rows, df, cols)
+        t_copy = timeit(to_copy_buffer, df, cols)
+
+        print(f"{name:24}{len(df):>10}{t_cell:>11.3f}s{t_vec:>11.3f}s{t_copy:>11.3f}s{t_cell / t_vec:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark de transform sobre datos sintéticos (1M+ filas).
+
+Compara las versiones fila a fila (apply / apply(axis=1) / zip) de las
+derivaciones de transform_customers, transform_orders y
+transform_campaigns contra las vectorizadas de etl/transform.py, y
+verifica que ambas den el mismo resultado.
+
+Uso:
+    python -m reto_data_engineer.benchmarks.bench_transform --rows 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from reto_data_engineer.etl.transform import (
+    normalize_email, nested_field, on_distinct, extract_age_range,
+    transform_customers, transform_orders, transform_campaigns
+)
+
+
+# ==============================
+# DATOS SINTÉTICOS
+# ==============================
+
+def synthetic_customers(rows: int, rng) -> pd.DataFrame:
+    countries = np.array(["MX", "BR", " Argentina ", "CO", "Chile"], dtype=object)
+    address = [{"street": "Calle 1", "city": "X", "country": c}
+               for c in countries[rng.integers(0, len(countries), rows)]]
+    for i in range(0, rows, 97):
+        address[i] = None
+    return pd.DataFrame({
+        "customer_id": [f"C{i:08d}" for i in range(rows)],
+        "name": "Nombre Apellido",
+        "email": [f"  User{i}@Mail.COM " for i in range(rows)],
+        "address": address,
+        "preferred_language": rng.choice(["ES", "pt ", "en"], rows),
+        "birth_date": pd.Timestamp("1990-01-01", tz="UTC"),
+        "registration_date": pd.Timestamp("2023-01-01", tz="UTC"),
+    })
+
+
+def synthetic_payments(rows: int, customers: int, rng) -> pd.DataFrame:
+    ids = rng.integers(0, customers, rows)
+    paypal = pd.Series([f"user{i}@mail.com" for i in ids], dtype=object)
+    paypal[rng.random(rows) < 0.3] = None
+    return pd.DataFrame({
+        "transaction_id": [f"T{i:09d}" for i in range(rows)],
+        "amount": rng.random(rows) * 100,
+        "currency": "USD",
+        "payment_date": pd.Timestamp("2024-01-15", tz="UTC"),
+        "status": "completed",
+        "paypal_email": paypal,
+    })
+
+
+def synthetic_campaigns(rows: int, rng) -> pd.DataFrame:
+    ranges = np.array(["18-25", "25-45", " 30 - 55", "65+", None], dtype=object)
+    audience = [{"age_range": r, "segments": ["a"]} for r in ranges[rng.integers(0, len(ranges), rows)]]
+    return pd.DataFrame({
+        "campaign_id": [f"CMP{i}" for i in range(rows)],
+        "name": "Campaña", "channel": "email",
+        "budget": 1000.0, "impressions": 10, "clicks": 1, "conversions": 0,
+        "revenue_generated": 0.0,
+        "start_date": pd.Timestamp("2024-01-01", tz="UTC"),
+        "end_date": pd.Timestamp("2024-02-01", tz="UTC"),
+        "target_audience": audience,
+    })
+
+
+# ==============================
+# VERSIONES FILA A FILA (referencia)
+# ==============================
+
+def _email_scalar(email):
+    if pd.isna(email):
+        return None
+    return str(email).strip().lower()
+
+
+def _age_scalar(text):
+    if text is None or pd.isna(text):
+        return (None, None)
+    try:
+        parts = str(text).split("-")
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return (None, None)
+
+
+def rowwise_country(df):
+    return df["address"].apply(lambda x: x["country"].strip() if isinstance(x, dict) and "country" in x else None)
+
+
+def rowwise_order_email(df):
+    def get_order_email(row):
+        if "paypal_email" in row and pd.notna(row["paypal_email"]):
+            return _email_scalar(row["paypal_email"])
+        if "email" in row and pd.notna(row["email"]):
+            return _email_scalar(row["email"])
+        return None
+    return df.apply(get_order_email, axis=1)
+
+
+def rowwise_age(df):
+    return list(zip(*df["target_audience"].apply(
+        lambda x: _age_scalar(x.get("age_range")) if isinstance(x, dict) else (None, None)
+    )))
+
+
+def vector_country(df):
+    return on_distinct(nested_field(df["address"], "country"), lambda u: u.astype("string").str.strip())
+
+
+def vector_order_email(df):
+    return normalize_email(df["paypal_email"].astype("string"))
+
+
+def vector_age(df):
+    return extract_age_range(nested_field(df["target_audience"], "age_range"))
+
+
+def timeit(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def same(a, b) -> bool:
+    a = pd.Series(a, dtype=object).where(pd.notna(pd.Series(a, dtype=object)), None)
+    b = pd.Series(b, dtype=object).where(pd.notna(pd.Series(b, dtype=object)), None)
+    return a.tolist() == b.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    t0 = time.perf_counter()
+    customers = synthetic_customers(args.rows, rng)
+    payments = synthetic_payments(args.rows, args.rows, rng)
+    campaigns = synthetic_campaigns(args.rows, rng)
+    print(f"datos sintéticos: {args.rows} filas por dataset en {time.perf_counter() - t0:.1f} s\n")
+
+    print(f"{'derivación':26}{'fila a fila':>13}{'vectorizado':>13}{'speedup':>10}{'igual':>7}")
+    cases = [
+        ("customers.country", rowwise_country, vector_country, customers),
+        ("orders.email", rowwise_order_email, vector_order_email, payments),
+        ("campaigns.age_min/max", rowwise_age, vector_age, campaigns),
+    ]
+    for label, slow, fast, df in cases:
+        ref, t_slow = timeit(slow, df)
+        out, t_fast = timeit(fast, df)
+        if label.startswith("campaigns"):
+            ok = same(ref[0], out[0]) and same(ref[1], out[1])
+        else:
+            ok = same(ref, out)
+        print(f"{label:26}{t_slow:>12.3f}s{t_fast:>12.3f}s{t_slow / t_fast:>9.1f}x{'sí' if ok else 'NO':>7}")
+
+    print("\ntransform completo (vectorizado):")
+    customers_df, t = timeit(transform_customers, customers)
+    print(f"{'transform_customers':26}{t:>12.3f}s")
+    _, t = timeit(transform_orders, payments, customers_df)
+    print(f"{'transform_orders':26}{t:>12.3f}s")
+    _, t = timeit(transform_campaigns, campaigns)
+    print(f"{'transform_campaigns':26}{t:>12.3f}s")
+
+
+if __name__ == "__main__":
+    main()
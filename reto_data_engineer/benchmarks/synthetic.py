@@ -0,0 +1,342 @@
+"""
+Generador de datasets sintéticos a escala a partir de data/json y data/csv.
+
+Cada archivo de muestra se usa como plantilla: la fila i copia el
+registro i % n de la muestra y reescribe sus campos conservando la forma
+de los datos reales:
+
+  - ids propios únicos (PAY-000000001, ...) con el prefijo de la muestra
+  - referencias (customer_id, transaction_id, campaign_id) dentro del
+    rango de ids generado para el dataset referenciado, para que los
+    joins de identidad / clientes sigan resolviendo
+  - fechas desplazadas unos días pero con el MISMO formato de la
+    plantilla (ISO con Z, dd/mm/aaaa, dd/mm/aaaa hh:mm:ss...); los
+    valores que no son fecha reconocible se copian tal cual
+  - emails de clientes con la suciedad de la muestra (mayúsculas) y
+    espacios alrededor en una fracción de las filas
+  - dicts anidados (address, target_audience) copiados de la plantilla
+  - montos float con ruido de ±50 %
+
+Los archivos se escriben por bloques (la memoria no depende de --rows) en
+benchmarks/data/<filas>/json|csv, la misma estructura que data/, así que
+el ETL los lee con RETO_DATA_DIR=<ese directorio>. Si el directorio ya
+existe con el mismo manifest no se regenera.
+
+Uso:
+    python -m reto_data_engineer.benchmarks.synthetic --rows 1000000
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# sube al cambiar la lógica de generación: invalida los directorios ya generados
+GENERATOR_VERSION = 1
+
+BLOCK_ROWS = 200_000
+
+# filas por dataset respecto de --rows
+SCALES = {
+    "facts": 1,
+    "customers": 0.1,
+    "campaigns": 0.001,
+}
+
+# archivo -> escala, ids propios, referencias campo -> dataset referenciado
+FILES = {
+    "customers_master.json": {"scale": "customers", "ids": ["customer_id"], "email_of": "self"},
+    "payment_transactions.json": {"scale": "facts", "ids": ["payment_id", "transaction_id"],
+                                  "email_of": "random"},
+    "customer_reviews_jan.json": {"scale": "facts", "ids": ["review_id"],
+                                  "refs": {"customer_id": "customers", "transaction_id": "payments"}},
+    "customer_reviews_feb.json": {"scale": "facts", "ids": ["review_id"],
+                                  "refs": {"customer_id": "customers", "transaction_id": "payments"}},
+    "customer_support_tickets.json": {"scale": "facts", "ids": ["ticket_id"],
+                                      "refs": {"customer_id": "customers", "transaction_id": "payments"}},
+    "email_marketing_sends.json": {"scale": "facts", "ids": ["send_id"], "email_of": "customer_id",
+                                   "refs": {"customer_id": "customers", "campaign_id": "campaigns"}},
+    "marketing_campaigns_q1.json": {"scale": "campaigns", "ids": ["campaign_id"]},
+    "competitor_pricing.json": {"scale": "facts", "ids": ["snapshot_id"]},
+    "inventory_adjustments_jan.json": {"scale": "facts", "ids": ["adjustment_id"]},
+    "inventory_adjustments_feb.json": {"scale": "facts", "ids": ["adjustment_id"]},
+    # data/csv: sólo escalan los que crecen con los clientes / órdenes;
+    # el resto (catálogos, tasas, agregados diarios) se copia tal cual
+    "customer_segments.csv": {"scale": "customers", "ids": ["customer_id"]},
+    "customers_legacy.csv": {"scale": "customers", "ids": ["customer_id"], "email_of": "self"},
+    "supplier_orders.csv": {"scale": "facts", "ids": ["order_id"]},
+}
+
+# dataset referenciado -> (archivo, campo id)
+KEYSPACES = {
+    "customers": ("customers_master.json", "customer_id"),
+    "payments": ("payment_transactions.json", "transaction_id"),
+    "campaigns": ("marketing_campaigns_q1.json", "campaign_id"),
+}
+
+# formatos de fecha presentes en las muestras (regex -> strptime)
+DATE_FORMATS = [
+    (re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$"), "%Y-%m-%dT%H:%M:%SZ"),
+    (re.compile(r"^\d{4}-\d{2}-\d{2}$"), "%Y-%m-%d"),
+    (re.compile(r"^\d{2}/\d{2}/\d{4}$"), "%d/%m/%Y"),
+    (re.compile(r"^\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}$"), "%d/%m/%Y %H:%M:%S"),
+]
+
+# formato -> piezas: slice de "AAAA-MM-DDTHH:MM:SS" o literal.
+# Series.dt.strftime formatea fila a fila (~6 µs/fila); armar los strings
+# por columnas de caracteres con NumPy es ~10x más rápido.
+_Y, _m, _d, _H, _M, _S = slice(0, 4), slice(5, 7), slice(8, 10), slice(11, 13), slice(14, 16), slice(17, 19)
+DATE_LAYOUTS = {
+    "%Y-%m-%dT%H:%M:%SZ": [_Y, "-", _m, "-", _d, "T", _H, ":", _M, ":", _S, "Z"],
+    "%Y-%m-%d": [_Y, "-", _m, "-", _d],
+    "%d/%m/%Y": [_d, "/", _m, "/", _Y],
+    "%d/%m/%Y %H:%M:%S": [_d, "/", _m, "/", _Y, " ", _H, ":", _M, ":", _S],
+}
+
+DATE_JITTER_DAYS = 14
+EMAIL_PADDED = 0.05
+
+
+def dataset_rows(rows: int, scale: str, samples: int) -> int:
+    return max(samples, int(rows * SCALES[scale]))
+
+
+def id_prefix(value) -> str:
+    """'PAY-001' -> 'PAY-'; sin guion se usa el valor completo como prefijo."""
+    text = str(value)
+    return text[:text.index("-") + 1] if "-" in text else text
+
+
+def _join_chars(chars: np.ndarray) -> np.ndarray:
+    """Matriz (n, w) de caracteres -> vector de n strings de ancho w."""
+    return np.ascontiguousarray(chars).view(f"U{chars.shape[1]}").ravel()
+
+
+def format_ids(prefix: str, numbers: np.ndarray, width: int = 9) -> np.ndarray:
+    digits = (np.asarray(numbers)[:, None] // 10 ** np.arange(width - 1, -1, -1)) % 10
+    padded = _join_chars((digits + ord("0")).astype(np.uint32).view("U1"))
+    return np.char.add(prefix, padded).astype(object)
+
+
+def render_dates(values: np.ndarray, fmt: str) -> np.ndarray:
+    """datetime64 -> strings con el formato `fmt` (uno de DATE_LAYOUTS)."""
+    iso = np.datetime_as_string(values.astype("datetime64[s]"), unit="s").astype("U19")
+    chars = iso.view("U1").reshape(-1, 19)
+    pieces = [
+        chars[:, p] if isinstance(p, slice) else np.full((len(iso), len(p)), list(p), dtype="U1")
+        for p in DATE_LAYOUTS[fmt]
+    ]
+    return _join_chars(np.concatenate(pieces, axis=1)).astype(object)
+
+
+def date_format(value):
+    if not isinstance(value, str):
+        return None
+    for pattern, fmt in DATE_FORMATS:
+        if pattern.match(value):
+            return fmt
+    return None
+
+
+def customer_email(numbers: np.ndarray) -> pd.Series:
+    return "user" + pd.Series(numbers).astype(str) + "@email.com"
+
+
+# ==============================
+# GENERACIÓN POR BLOQUE
+# ==============================
+
+def generate_block(samples: list, columns: list, spec: dict, start: int, stop: int,
+                   sizes: dict, prefixes: dict, rng, offset: int = 0) -> pd.DataFrame:
+    n = stop - start
+    rows = np.arange(start, stop)
+    template = rows % len(samples)
+    refs = spec.get("refs", {})
+    ids = spec.get("ids", [])
+
+    out = {}
+    picked = {}
+    for col in columns:
+        values = np.array([rec.get(col) for rec in samples], dtype=object)[template]
+
+        if col in ids:
+            out[col] = format_ids(id_prefix(samples[0][col]), offset + rows + 1)
+            picked[col] = offset + rows
+            continue
+
+        if col in refs:
+            target = refs[col]
+            numbers = rng.integers(0, sizes[target], n)
+            ref = pd.Series(format_ids(prefixes[target], numbers + 1), dtype=object)
+            # las referencias nulas de la muestra siguen nulas
+            out[col] = ref.where(pd.notna(pd.Series(values)), None).to_numpy(dtype=object)
+            picked[col] = numbers
+            continue
+
+        formats = [date_format(rec.get(col)) for rec in samples]
+        if any(formats):
+            col_out = values.copy()
+            base = pd.Series([pd.NaT if f is None else pd.to_datetime(rec[col], format=f)
+                              for rec, f in zip(samples, formats)])
+            shift = pd.to_timedelta(rng.integers(-DATE_JITTER_DAYS * 86400, DATE_JITTER_DAYS * 86400, n),
+                                    unit="s")
+            when = base.to_numpy(dtype="datetime64[ns]")[template] + shift.to_numpy()
+            tmpl_fmt = np.array(formats, dtype=object)[template]
+            for fmt in {f for f in formats if f}:
+                mask = tmpl_fmt == fmt
+                col_out[mask] = render_dates(when[mask], fmt)
+            out[col] = col_out
+            continue
+
+        out[col] = values
+        if values.size and any(isinstance(rec.get(col), float) for rec in samples):
+            floats = np.array([isinstance(v, float) for v in values])
+            noisy = pd.to_numeric(pd.Series(values[floats]), errors="coerce") * rng.uniform(0.5, 1.5, floats.sum())
+            col_out = values.copy()
+            col_out[floats] = noisy.round(2).to_numpy(dtype=object)
+            out[col] = col_out
+
+    df = pd.DataFrame(out, columns=columns)
+
+    email_of = spec.get("email_of")
+    for col in [c for c in columns if c == "email" or c.endswith("_email")]:
+        if email_of is None:
+            continue
+        if email_of == "self":
+            numbers = picked[ids[0]]
+        elif email_of == "random":
+            numbers = rng.integers(0, sizes["customers"], n)
+        else:
+            numbers = picked[email_of]
+        tmpl = np.array([rec.get(col) for rec in samples], dtype=object)[template]
+        email = customer_email(numbers + 1)
+        upper = np.array([isinstance(v, str) and v != v.lower() for v in tmpl])
+        email[upper] = email[upper].str.upper()
+        padded = rng.random(n) < EMAIL_PADDED
+        email[padded] = "  " + email[padded] + " "
+        df[col] = email.where(pd.notna(pd.Series(tmpl)), None).to_numpy(dtype=object)
+    return df
+
+
+# ==============================
+# ESCRITURA
+# ==============================
+
+def _write_json(path: str, blocks):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        first = True
+        for df in blocks:
+            text = df.to_json(orient="records", force_ascii=False)[1:-1]
+            if not text:
+                continue
+            f.write(text if first else "," + text)
+            first = False
+        f.write("]")
+
+
+def _write_csv(path: str, blocks):
+    header = True
+    for df in blocks:
+        df.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+def _read_samples(path: str) -> tuple:
+    if path.endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        records = [{k: (v if v != "" else None) for k, v in rec.items()} for rec in df.to_dict("records")]
+        return records, list(df.columns)
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    columns = []
+    for rec in records:
+        columns += [k for k in rec if k not in columns]
+    return records, columns
+
+
+def generate(rows: int, output_dir: str = None, seed: int = 42, force: bool = False) -> str:
+    """Genera (o reutiliza) el juego de datos de `rows` filas. Devuelve su directorio."""
+    output_dir = output_dir or os.path.join(OUTPUT_DIR, str(rows))
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    manifest = {"rows": rows, "seed": seed, "version": GENERATOR_VERSION}
+
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if {k: v for k, v in json.load(f).items() if k in manifest} == manifest:
+                return output_dir
+
+    rng = np.random.default_rng(seed)
+    for sub in ("json", "csv"):
+        os.makedirs(os.path.join(output_dir, sub), exist_ok=True)
+
+    samples = {}
+    for sub in ("json", "csv"):
+        for filename in sorted(os.listdir(os.path.join(SAMPLE_DIR, sub))):
+            samples[filename] = _read_samples(os.path.join(SAMPLE_DIR, sub, filename))
+
+    sizes, prefixes = {}, {}
+    for name, (filename, col) in KEYSPACES.items():
+        records = samples[filename][0]
+        sizes[name] = dataset_rows(rows, FILES[filename]["scale"], len(records))
+        prefixes[name] = id_prefix(records[0][col])
+
+    # ids de hechos repartidos entre archivos del mismo prefijo (reviews jan/feb...)
+    offsets = {}
+    files = {}
+    t0 = time.perf_counter()
+    for filename, (records, columns) in samples.items():
+        sub = "csv" if filename.endswith(".csv") else "json"
+        path = os.path.join(output_dir, sub, filename)
+        spec = FILES.get(filename)
+        if spec is None:
+            shutil.copyfile(os.path.join(SAMPLE_DIR, sub, filename), path)
+            files[filename] = len(records)
+            continue
+
+        total = dataset_rows(rows, spec["scale"], len(records))
+        # los que escalan con clientes reutilizan sus ids (mismo cliente en varios archivos)
+        offset = 0
+        if spec["scale"] == "facts":
+            prefix = id_prefix(records[0][spec["ids"][0]])
+            offset = offsets.get(prefix, 0)
+            offsets[prefix] = offset + total
+        blocks = (
+            generate_block(records, columns, spec, start, min(start + BLOCK_ROWS, total),
+                           sizes, prefixes, rng, offset)
+            for start in range(0, total, BLOCK_ROWS)
+        )
+        (_write_csv if sub == "csv" else _write_json)(path, blocks)
+        files[filename] = total
+        print(f"SINTÉTICO: {filename} → {total} filas ({time.perf_counter() - t0:.1f} s)")
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({**manifest, "files": files}, f, indent=2)
+    return output_dir
+
+
+def parse_rows(text: str) -> int:
+    """'10K' / '1M' / '10M' / '250000' -> filas."""
+    text = text.strip().upper()
+    factor = {"K": 10 ** 3, "M": 10 ** 6}.get(text[-1:], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="10K", help="filas por dataset de hechos: 10K, 1M, 10M...")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="regenera aunque exista")
+    args = parser.parse_args()
+    print(generate(parse_rows(args.rows), args.output, args.seed, args.force))
+
+
+if __name__ == "__main__":
+    main()
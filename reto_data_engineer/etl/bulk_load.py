@@ -0,0 +1,458 @@
+import pandas as pd
+
+from reto_data_engineer.etl.load import connection_scope
+from reto_data_engineer.utils.logger import timer
+from reto_data_engineer.etl.materialize import to_copy_buffer
+from reto_data_engineer.etl.csv_tables import CSV_TABLES, csv_columns, upsert_clause
+from reto_data_engineer.etl.partitions import PARTITIONED_TABLES, split_by_partition, ensure_partitions
+from reto_data_engineer.etl.rejects import reject, write_bisect
+
+# =======================================================
+#  Carga masiva: COPY -> staging temporal -> INSERT ... SELECT
+#
+#  Cada tabla declara:
+#   - staging:  columnas (y tipo) de la tabla temporal, en el
+#               mismo orden en que se escriben al buffer COPY. Cada
+#               fecha lleva el tipo de su columna destino (TIMESTAMP o
+#               DATE, nunca TIMESTAMPTZ): llegan en UTC sin zona
+#               (etl/dates.py) y el merge no las convierte según el
+#               TimeZone de la sesión
+#   - target:   columnas destino en la tabla final
+#   - select:   expresiones del SELECT sobre la staging (alias s)
+#   - conflict: cláusula ON CONFLICT (misma semántica que load.py)
+#   - customer_fk: la staging trae customer_id y el customer_pk se
+#               resuelve con JOIN a customers dentro del propio merge
+#
+#  Las tablas particionadas (etl/partitions.py) se cargan partición por
+#  partición: la fecha de partición va como TIMESTAMP en UTC y el
+#  ON CONFLICT sin columnas usa el índice único de cada partición. Ese
+#  índice incluye la fecha, así que el select descarta además los ids
+#  que ya están en otra partición (NOT EXISTS sobre la tabla padre).
+#  NOT EXISTS no ve las filas del mismo INSERT: DISTINCT ON sobre el id
+#  deja una sola por lote (transform ya rechaza los repetidos como
+#  duplicate_<id>, esto cubre a quien llame load_* con otro DataFrame).
+#
+#  Cada COPY + merge corre bajo write_bisect (etl/rejects.py): un lote
+#  que la BD rechaza por datos se parte hasta aislar las filas malas,
+#  que van a etl_rejects junto con las que no tienen cliente.
+# =======================================================
+BULK_SPECS = {
+    "customers": {
+        "staging": [
+            ("customer_id", "TEXT"), ("full_name", "TEXT"), ("email", "TEXT"),
+            ("country", "TEXT"), ("language", "TEXT"),
+            ("birth_date", "DATE"), ("registration_date", "TIMESTAMP"),
+        ],
+        "target": [
+            "customer_id", "full_name", "email", "country",
+            "language", "birth_date", "registration_date"
+        ],
+        "select": """
+            SELECT DISTINCT ON (s.customer_id)
+                s.customer_id, s.full_name, s.email, s.country,
+                s.language, s.birth_date, s.registration_date
+            FROM {staging} s
+            ORDER BY s.customer_id
+        """,
+        "conflict": """
+            ON CONFLICT (customer_id) DO UPDATE SET
+                full_name = EXCLUDED.full_name,
+                email = EXCLUDED.email,
+                country = EXCLUDED.country,
+                language = EXCLUDED.language,
+                birth_date = EXCLUDED.birth_date,
+                registration_date = EXCLUDED.registration_date
+            RETURNING customer_pk, customer_id
+        """,
+    },
+    "orders": {
+        "customer_fk": True,
+        "staging": [
+            ("order_id", "TEXT"), ("customer_id", "TEXT"),
+            ("total_amount", "NUMERIC"), ("currency", "TEXT"),
+            ("total_amount_reporting", "NUMERIC"), ("fx_rate", "NUMERIC"),
+            ("order_date", "TIMESTAMP"), ("status", "TEXT"),
+        ],
+        "target": [
+            "order_id", "customer_pk", "total_amount",
+            "currency", "total_amount_reporting", "fx_rate",
+            "order_date", "status"
+        ],
+        "select": """
+            SELECT DISTINCT ON (s.order_id) s.order_id, c.customer_pk, s.total_amount,
+                   s.currency, s.total_amount_reporting, s.fx_rate,
+                   s.order_date, s.status
+            FROM {staging} s
+            JOIN customers c ON c.customer_id = s.customer_id
+            WHERE NOT EXISTS (SELECT 1 FROM orders t WHERE t.order_id = s.order_id)
+            ORDER BY s.order_id
+        """,
+        "conflict": "ON CONFLICT DO NOTHING",
+    },
+    "reviews": {
+        "customer_fk": True,
+        "staging": [
+            ("review_id", "TEXT"), ("customer_id", "TEXT"), ("product_id", "TEXT"),
+            ("rating", "NUMERIC"), ("comment", "TEXT"), ("review_date", "TIMESTAMP"),
+            ("verified_purchase", "BOOLEAN"), ("helpful_votes", "NUMERIC"),
+            ("unhelpful_votes", "NUMERIC"),
+        ],
+        "target": [
+            "review_id", "customer_pk", "product_id",
+            "rating", "comment", "review_date",
+            "verified_purchase", "helpful_votes", "unhelpful_votes"
+        ],
+        "select": """
+            SELECT s.review_id, c.customer_pk, s.product_id,
+                   s.rating, s.comment, s.review_date,
+                   s.verified_purchase, s.helpful_votes, s.unhelpful_votes
+            FROM {staging} s
+            JOIN customers c ON c.customer_id = s.customer_id
+        """,
+        "conflict": "ON CONFLICT (review_id) DO NOTHING",
+    },
+    "competitor_pricing": {
+        "staging": [
+            ("product_id", "TEXT"), ("snapshot_date", "TIMESTAMP"),
+            ("our_price", "NUMERIC"), ("competitor_price", "NUMERIC"),
+            ("competitor_name", "TEXT"), ("in_stock", "BOOLEAN"),
+            ("num_reviews", "NUMERIC"), ("rating", "NUMERIC"),
+        ],
+        "target": [
+            "product_id", "snapshot_date", "our_price",
+            "competitor_price", "competitor_name",
+            "stock", "num_reviews", "rating"
+        ],
+        "select": """
+            SELECT s.product_id, s.snapshot_date, s.our_price,
+                   s.competitor_price, s.competitor_name,
+                   s.in_stock, s.num_reviews, s.rating
+            FROM {staging} s
+        """,
+        "conflict": "ON CONFLICT DO NOTHING",
+    },
+    "support_tickets": {
+        "customer_fk": True,
+        "staging": [
+            ("ticket_id", "TEXT"), ("customer_id", "TEXT"), ("transaction_id", "TEXT"),
+            ("subject", "TEXT"), ("description", "TEXT"), ("priority", "TEXT"),
+            ("status", "TEXT"), ("created_at", "TIMESTAMP"),
+            ("updated_at", "TIMESTAMP"), ("resolved_at", "TIMESTAMP"),
+        ],
+        "target": [
+            "ticket_id", "customer_pk", "transaction_id",
+            "subject", "description", "priority", "status",
+            "created_at", "updated_at", "resolved_at"
+        ],
+        "select": """
+            SELECT s.ticket_id, c.customer_pk, s.transaction_id,
+                   s.subject, s.description, s.priority, s.status,
+                   s.created_at, s.updated_at, s.resolved_at
+            FROM {staging} s
+            JOIN customers c ON c.customer_id = s.customer_id
+        """,
+        "conflict": "ON CONFLICT (ticket_id) DO NOTHING",
+    },
+    "marketing_sends": {
+        "customer_fk": True,
+        "staging": [
+            ("send_id", "TEXT"), ("customer_id", "TEXT"), ("campaign_id", "TEXT"),
+            ("sent_date", "TIMESTAMP"), ("open_date", "TIMESTAMP"),
+            ("click_date", "TIMESTAMP"), ("conversion_date", "TIMESTAMP"),
+            ("bounced", "BOOLEAN"), ("bounce_reason", "TEXT"),
+        ],
+        "target": [
+            "send_id", "customer_pk", "campaign_id",
+            "sent_date", "open_date", "click_date",
+            "conversion_date", "bounced", "bounce_reason"
+        ],
+        "select": """
+            SELECT DISTINCT ON (s.send_id) s.send_id, c.customer_pk, s.campaign_id,
+                   s.sent_date, s.open_date, s.click_date,
+                   s.conversion_date, s.bounced, s.bounce_reason
+            FROM {staging} s
+            JOIN customers c ON c.customer_id = s.customer_id
+            WHERE NOT EXISTS (SELECT 1 FROM marketing_sends t WHERE t.send_id = s.send_id)
+            ORDER BY s.send_id
+        """,
+        "conflict": "ON CONFLICT DO NOTHING",
+    },
+    "campaigns": {
+        "staging": [
+            ("campaign_id", "TEXT"), ("name", "TEXT"), ("channel", "TEXT"),
+            ("budget", "NUMERIC"), ("impressions", "NUMERIC"), ("clicks", "NUMERIC"),
+            ("conversions", "NUMERIC"), ("revenue_generated", "NUMERIC"),
+            ("start_date", "TIMESTAMP"), ("end_date", "TIMESTAMP"),
+        ],
+        "target": [
+            "campaign_id", "name", "channel", "budget",
+            "impressions", "clicks", "conversions",
+            "revenue_generated", "start_date", "end_date"
+        ],
+        "select": """
+            SELECT s.campaign_id, s.name, s.channel, s.budget,
+                   s.impressions, s.clicks, s.conversions,
+                   s.revenue_generated, s.start_date, s.end_date
+            FROM {staging} s
+        """,
+        "conflict": "ON CONFLICT (campaign_id) DO NOTHING",
+    },
+    "inventory_adjustments": {
+        "staging": [
+            ("adjustment_id", "TEXT"), ("product_id", "TEXT"), ("movement_type", "TEXT"),
+            ("quantity_change", "NUMERIC"), ("previous_stock", "NUMERIC"),
+            ("new_stock", "NUMERIC"), ("warehouse", "TEXT"),
+            ("adjustment_date", "TIMESTAMP"), ("user_name", "TEXT"),
+        ],
+        "target": [
+            "adjustment_id", "product_id", "movement_type",
+            "quantity_change", "previous_stock", "new_stock",
+            "warehouse", "adjustment_date", "user_name"
+        ],
+        "select": """
+            SELECT DISTINCT ON (s.adjustment_id) s.adjustment_id, s.product_id, s.movement_type,
+                   s.quantity_change, s.previous_stock, s.new_stock,
+                   s.warehouse, s.adjustment_date, s.user_name
+            FROM {staging} s
+            WHERE NOT EXISTS (SELECT 1 FROM inventory_adjustments t WHERE t.adjustment_id = s.adjustment_id)
+            ORDER BY s.adjustment_id
+        """,
+        "conflict": "ON CONFLICT DO NOTHING",
+    },
+}
+
+
+def _csv_table_spec(table: str) -> dict:
+    # DISTINCT ON: un upsert no puede tocar dos veces la misma fila en un INSERT
+    key = ", ".join(CSV_TABLES[table]["key"])
+    cols = csv_columns(table)
+    return {
+        "staging": CSV_TABLES[table]["columns"],
+        "target": cols,
+        "select": f"""
+            SELECT DISTINCT ON ({key}) {', '.join('s.' + c for c in cols)}
+            FROM {{staging}} s
+            ORDER BY {key}
+        """,
+        "conflict": upsert_clause(table),
+    }
+
+
+BULK_SPECS.update({table: _csv_table_spec(table) for table in CSV_TABLES})
+
+
+# =======================================================
+#  Helpers
+# =======================================================
+MISSING_CUSTOMERS_SQL = """
+    SELECT DISTINCT s.customer_id FROM {staging} s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM customers c WHERE c.customer_id = s.customer_id
+    )
+"""
+
+
+def missing_customers(df: pd.DataFrame, ids: list) -> pd.DataFrame:
+    """Filas de df cuyo customer_id está en ids (None = customer_id nulo)."""
+    if not ids:
+        return df.iloc[:0]
+    known = [i for i in ids if i is not None]
+    mask = df["customer_id"].isin(known)
+    if len(known) < len(ids):
+        mask |= df["customer_id"].isna()
+    return df[mask]
+
+
+def copy_merge(cur, table: str, df: pd.DataFrame, target: str = None) -> int:
+    """
+    Envía df con COPY a una staging temporal y la fusiona en la tabla
+    destino (`target`: una partición de `table`; por defecto la propia
+    tabla) con un único INSERT ... SELECT ... ON CONFLICT.
+    Devuelve las filas de df sin cliente en customers (vacío si la tabla
+    no depende de customers); el cursor queda tras el merge, con rowcount
+    / RETURNING disponibles.
+    """
+    spec = BULK_SPECS[table]
+    staging = f"stg_{table}"
+    cols = [c for c, _ in spec["staging"]]
+    col_defs = ", ".join(f"{c} {t}" for c, t in spec["staging"])
+
+    cur.execute(f"DROP TABLE IF EXISTS {staging}")
+    cur.execute(f"CREATE TEMP TABLE {staging} ({col_defs}) ON COMMIT DROP")
+    cur.execute(
+        f"COPY {staging} ({', '.join(cols)}) FROM STDIN",
+        stream=to_copy_buffer(df, cols)
+    )
+
+    missing = df.iloc[:0]
+    if spec.get("customer_fk"):
+        # sólo los ids (pocos) vuelven de la BD; las filas salen de df
+        cur.execute(MISSING_CUSTOMERS_SQL.format(staging=staging))
+        missing = missing_customers(df, [row[0] for row in cur.fetchall()])
+
+    query = f"""
+        INSERT INTO {target or table} ({', '.join(spec['target'])})
+        {spec['select'].format(staging=staging)}
+        {spec['conflict']};
+    """
+    cur.execute(query)
+    return missing
+
+
+def _merge_batch(table: str, target: str = None):
+    def write(cur, part):
+        missing = copy_merge(cur, table, part, target)
+        return max(cur.rowcount, 0), missing
+    return write
+
+
+def _bulk_load(table: str, df: pd.DataFrame, conn=None) -> dict:
+    if table in PARTITIONED_TABLES:
+        parts = split_by_partition(table, df)
+        # transacción corta propia, antes de la de carga (ver partitions.py)
+        ensure_partitions(table, [month for _, month, _ in parts])
+    else:
+        parts = [(table, None, df)]
+
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+
+        inserted, skipped, rejected = 0, 0, 0
+        for target, _, part in parts:
+            results, failed = write_bisect(cur, part, _merge_batch(table, target), table)
+            rejected += failed
+            for rows, missing in results:
+                inserted += rows
+                skipped += len(missing)
+                # sólo se registran los de lotes confirmados (sin duplicar en reintentos)
+                reject(missing, "load", table, "missing_customer")
+        cur.close()
+    if rejected:
+        print(f"{table}: {rejected} filas rechazadas por la BD (ver etl_rejects)")
+    return {"inserted": inserted, "skipped": skipped, "rejected": rejected}
+
+
+# =======================================================
+#  LOADERS BULK (misma firma que etl/load.py)
+#
+#  customer_map se acepta por compatibilidad con load.py, pero las
+#  tablas con FK resuelven customer_pk por JOIN en SQL, así que también
+#  enlazan clientes cargados en corridas anteriores.
+# =======================================================
+@timer("load_fn")
+def bulk_load_customers(df: pd.DataFrame, conn=None) -> dict:
+    if df.empty:
+        print("No hay customers.")
+        return {}
+
+    def write(cur, part):
+        copy_merge(cur, "customers", part)
+        return {cid: pk for pk, cid in cur.fetchall()}
+
+    customer_map = {}
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        results, _ = write_bisect(cur, df, write, "customers")
+        for part_map in results:
+            customer_map.update(part_map)
+        cur.close()
+
+    print(f"Customers insertados/actualizados (COPY): {len(customer_map)}")
+    return customer_map
+
+
+@timer("load_fn")
+def bulk_load_orders(df: pd.DataFrame, customer_map: dict = None, conn=None):
+    if df.empty:
+        print("No hay orders.")
+        return
+
+    result = _bulk_load("orders", df, conn)
+
+    print(f"Orders insertadas correctamente (COPY): {result['inserted']}")
+    if result["skipped"] > 0:
+        print(f"Orders descartadas por cliente inexistente: {result['skipped']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_reviews(df: pd.DataFrame, customer_map: dict = None, conn=None):
+    if df.empty:
+        print("No hay reviews.")
+        return
+
+    result = _bulk_load("reviews", df, conn)
+    print(f"Reviews cargadas (COPY): {result['inserted']}")
+    if result["skipped"] > 0:
+        print(f"Reviews descartadas por cliente inexistente: {result['skipped']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_competitor_pricing(df: pd.DataFrame, conn=None):
+    if df.empty:
+        print("⚠ No hay competitor pricing.")
+        return
+
+    result = _bulk_load("competitor_pricing", df, conn)
+    print(f"Competitor pricing cargado (COPY): {result['inserted']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_support_tickets(df: pd.DataFrame, customer_map: dict = None, conn=None):
+    if df.empty:
+        print("No hay tickets.")
+        return
+
+    result = _bulk_load("support_tickets", df, conn)
+    print(f"Support tickets cargados (COPY): {result['inserted']}")
+    if result["skipped"] > 0:
+        print(f"Support tickets descartados por cliente inexistente: {result['skipped']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_marketing_sends(df: pd.DataFrame, customer_map: dict = None, conn=None):
+    if df.empty:
+        print("No hay sends.")
+        return
+
+    result = _bulk_load("marketing_sends", df, conn)
+    print(f"Marketing sends cargados (COPY): {result['inserted']}")
+    if result["skipped"] > 0:
+        print(f"Marketing sends descartados por cliente inexistente: {result['skipped']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_campaigns(df: pd.DataFrame, conn=None):
+    if df.empty:
+        print("No hay campañas.")
+        return
+
+    result = _bulk_load("campaigns", df, conn)
+    print(f"Campaigns cargadas (COPY): {result['inserted']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_inventory(df: pd.DataFrame, conn=None):
+    if df.empty:
+        print("No hay inventario.")
+        return
+
+    result = _bulk_load("inventory_adjustments", df, conn)
+    print(f"Inventory adjustments cargados (COPY): {result['inserted']}")
+    return result
+
+
+@timer("load_fn")
+def bulk_load_csv_table(table: str, df: pd.DataFrame, conn=None):
+    if df.empty:
+        print(f"No hay {table}.")
+        return
+
+    result = _bulk_load(table, df, conn)
+    print(f"{table} cargado (COPY): {result['inserted']}")
+    return result
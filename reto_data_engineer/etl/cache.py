@@ -0,0 +1,201 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import pandas as pd
+
+from reto_data_engineer.etl import dates, schemas
+from reto_data_engineer.etl.extract import source_path
+from reto_data_engineer.etl.schemas import get_schema
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# =======================================================
+#  CACHÉ COLUMNAR DE DATASETS (Arrow IPC)
+#
+#  Clave = etapa + hash SHA-256 del contenido de los archivos origen +
+#  "sal" con lo que define el resultado (esquema del archivo para
+#  extract, código de etl/transform.py y de los módulos que usa para
+#  transform, y etl/dates.py y etl/schemas.py en ambos). Si cambia el archivo o el código, la clave cambia y la
+#  entrada vieja se evicta por LRU cuando el directorio supera max_bytes.
+#
+#  El archivo se abre con memory-map, pero to_pandas copia los datos a
+#  memoria propia (strings, nulos y categóricas no admiten zero-copy):
+#  split_blocks evita además la copia de consolidar columnas en bloques.
+#
+#  Junto al dataset se guarda (metadata "etl_dq") lo que su cálculo dejó
+#  en los reportes de calidad: rechazos, matching de identidad, montos
+#  sin convertir y fechas o enteros que no parsean. Un hit los reproduce (ver
+#  TransformGraph.get y extract_all), así el run_report de una corrida
+#  desde caché es el mismo que el de una corrida completa.
+# =======================================================
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+INDEX_FILE = "index.json"
+
+# columnas object con dict/list se guardan como JSON para no perder forma
+JSON_COLUMNS_META = b"etl_json_columns"
+DQ_META = b"etl_dq"
+
+
+class DatasetCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        if pa is None:
+            raise ImportError("La caché de datasets requiere pyarrow (pip install pyarrow)")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._read_index()
+
+    # ---------- índice ----------
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"entries": {}, "files": {}}
+
+    def _write_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self._index_path())
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.arrow")
+
+    # ---------- claves ----------
+    def file_hash(self, filename: str) -> str:
+        """Hash del contenido; se recalcula sólo si cambian mtime o tamaño."""
+        path = source_path(filename)
+        st = os.stat(path)
+        memo = self.index["files"].get(filename)
+        if memo and memo[0] == st.st_mtime and memo[1] == st.st_size:
+            return memo[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        with self._lock:
+            self.index["files"][filename] = [st.st_mtime, st.st_size, h.hexdigest()]
+        return h.hexdigest()
+
+    def key(self, stage: str, filenames: list, salt: str = "") -> str:
+        h = hashlib.sha256(stage.encode())
+        for f in filenames:
+            h.update(f.encode())
+            h.update(self.file_hash(f).encode())
+        h.update(salt.encode())
+        return h.hexdigest()
+
+    def extract_key(self, filename: str) -> str:
+        return self.key("extract", [filename], repr(get_schema(filename)) + inspect.getsource(schemas)
+                        + inspect.getsource(dates))
+
+    def transform_key(self, name: str, filenames: list) -> str:
+        from reto_data_engineer.etl import transform, identity, currency, csv_tables, compact
+        salt = "".join(inspect.getsource(m) for m in (transform, dates, schemas, identity, currency, csv_tables, compact))
+        return self.key(f"transform:{name}", filenames, salt)
+
+    # ---------- lectura / escritura ----------
+    def contains(self, key: str) -> bool:
+        return key in self.index["entries"] and os.path.exists(self._entry_path(key))
+
+    def get(self, key: str):
+        if not self.contains(key):
+            return None
+
+        with pa.memory_map(self._entry_path(key), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+
+        meta = (table.schema.metadata or {}).get(JSON_COLUMNS_META)
+        for col in json.loads(meta) if meta else []:
+            df[col] = df[col].map(lambda v: json.loads(v) if isinstance(v, str) else None)
+
+        with self._lock:
+            self.index["entries"][key]["atime"] = time.time()
+        return df
+
+    def dq(self, key: str) -> dict:
+        """Efectos de calidad de datos guardados con la entrada ({} si no hay)."""
+        if not self.contains(key):
+            return {}
+        with pa.memory_map(self._entry_path(key), "r") as source:
+            meta = (pa.ipc.open_file(source).schema.metadata or {}).get(DQ_META)
+        return json.loads(meta) if meta else {}
+
+    def put(self, key: str, df: pd.DataFrame, dq: dict = None) -> bool:
+        """Guarda df (y dq, ver banner); si Arrow no puede representarlo se omite (False)."""
+        df = df.copy()
+        json_cols = [
+            c for c in df.columns
+            if df[c].dtype == object and df[c].map(lambda v: isinstance(v, (dict, list))).any()
+        ]
+        for c in json_cols:
+            df[c] = df[c].map(lambda v: json.dumps(v) if isinstance(v, (dict, list)) else None)
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return False
+
+        metadata = dict(table.schema.metadata or {})
+        metadata[JSON_COLUMNS_META] = json.dumps(json_cols).encode()
+        if dq:
+            metadata[DQ_META] = json.dumps(dq, default=str).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        path = self._entry_path(key)
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.index["entries"][key] = {"bytes": os.path.getsize(path), "atime": time.time()}
+            self._evict()
+        return True
+
+    # ---------- mantenimiento ----------
+    def _evict(self):
+        entries = self.index["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["atime"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["bytes"]
+            del entries[key]
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        with self._lock:
+            self._write_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.index["entries"]):
+                try:
+                    os.remove(self._entry_path(key))
+                except FileNotFoundError:
+                    pass
+            self.index = {"entries": {}, "files": {}}
+            self._write_index()
+
+    def size_bytes(self) -> int:
+        return sum(e["bytes"] for e in self.index["entries"].values())
@@ -0,0 +1,102 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from reto_data_engineer.utils.logger import gauge_max
+
+try:
+    import pyarrow  # noqa: F401  (sólo para elegir el dtype de texto)
+    STRING_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    STRING_DTYPE = pd.StringDtype("python")
+
+# =======================================================
+#  REPRESENTACIÓN COMPACTA DE LOS FRAMES TRANSFORMADOS
+#
+#  transform_all mantiene todas las salidas en memoria a la vez; a
+#  decenas de millones de filas el costo lo dominan los textos repetidos
+#  y los numéricos de 64 bits. Después de cada transform_*:
+#
+#   - columnas de baja cardinalidad (CATEGORY_COLUMNS) -> category,
+#     si los valores distintos no superan MAX_CATEGORY_RATIO
+#   - el resto del texto -> string respaldado por Arrow (si hay pyarrow)
+#   - enteros -> el entero más chico que los contiene (nullable si había
+#     nulos); flotantes -> float32 sólo si la conversión no pierde nada
+#     (montos como 27.99 no son exactos en float32 y quedan en float64)
+#
+#  La carga usa los frames compactos tal cual: to_copy_buffer serializa
+#  las categorías una vez y las indexa con los códigos, y
+#  materialize_rows devuelve valores nativos de Python para cualquier
+#  dtype. La memoria antes / después por dataset queda en
+#  compaction_report() y en el gauge frame_memory_bytes.
+# =======================================================
+
+CATEGORY_COLUMNS = {
+    "currency", "status", "country", "language", "priority", "channel",
+    "movement_type", "warehouse", "competitor_name",
+}
+
+# con más distintos que esto (por fila) una categoría ocupa más que el texto
+MAX_CATEGORY_RATIO = 0.5
+
+_lock = threading.Lock()
+_report = {}
+
+
+def _is_text(s: pd.Series) -> bool:
+    if isinstance(s.dtype, pd.StringDtype):
+        return True
+    return s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) == "string"
+
+
+def _downcast_float(s: pd.Series) -> pd.Series:
+    target = "Float32" if isinstance(s.dtype, pd.Float64Dtype) else np.float32
+    small = s.astype(target)
+    # lossless: mismos valores (y mismos nulos) al volver a 64 bits
+    if small.astype(s.dtype).equals(s):
+        return small
+    return s
+
+
+def compact_column(name: str, s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(s):
+        return s
+    if _is_text(s):
+        if name in CATEGORY_COLUMNS and s.nunique(dropna=True) <= MAX_CATEGORY_RATIO * len(s):
+            return s.astype("category")
+        return s if s.dtype == STRING_DTYPE else s.astype(STRING_DTYPE)
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast="integer")
+    if pd.api.types.is_float_dtype(s) and s.dtype.itemsize > 4:
+        return _downcast_float(s)
+    return s
+
+
+def compact_frame(df: pd.DataFrame, dataset: str = None) -> pd.DataFrame:
+    """
+    Devuelve df con dtypes compactos (ver arriba). Si se indica dataset,
+    registra la memoria antes / después.
+    """
+    if df.empty:
+        return df
+    before = int(df.memory_usage(deep=True).sum())
+    out = pd.DataFrame({c: compact_column(c, df[c]) for c in df.columns}, index=df.index)
+    after = int(out.memory_usage(deep=True).sum())
+
+    if dataset is not None:
+        gauge_max("frame_memory_bytes", before, dataset=dataset, state="before")
+        gauge_max("frame_memory_bytes", after, dataset=dataset, state="after")
+        with _lock:
+            _report[dataset] = {"before": before, "after": after}
+    return out
+
+
+def compaction_report() -> dict:
+    """dataset -> {before, after} en bytes (memory_usage deep)."""
+    with _lock:
+        return {k: dict(v) for k, v in _report.items()}
+
+
+def reset_compaction_report():
+    with _lock:
+        _report.clear()
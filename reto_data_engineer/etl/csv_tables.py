@@ -0,0 +1,212 @@
+# =======================================================
+#  TABLAS DE LOS CSV (data/csv)
+#
+#  Registro declarativo de las tablas del warehouse alimentadas por los
+#  CSV. Cada tabla declara:
+#   - sources: datasets de extract (DATASET_FILES) que se concatenan
+#   - rename:  columnas origen -> columnas destino
+#   - key:     clave natural (PRIMARY KEY / UNIQUE en sql/ddl.sql);
+#              se usa en ON CONFLICT ... DO UPDATE
+#   - columns: columnas destino en orden, con el tipo de la staging
+#              COPY, el mismo de la columna destino
+#              (TEXT / NUMERIC / DATE / TIMESTAMP / BOOLEAN)
+#
+#  A partir de este registro se generan la transformación
+#  (transform.transform_csv_table), la spec COPY (bulk_load.BULK_SPECS)
+#  y el loader fila a fila (load.load_csv_table).
+# =======================================================
+
+CSV_TABLES = {
+    "countries": {
+        "sources": ["countries"],
+        "key": ["country_code"],
+        "columns": [
+            ("country_code", "TEXT"), ("country_name", "TEXT"), ("currency_code", "TEXT"),
+            ("tax_rate", "NUMERIC"), ("shipping_zone", "TEXT"), ("language", "TEXT"),
+            ("active", "BOOLEAN"),
+        ],
+    },
+    "exchange_rates": {
+        "sources": ["exchange_rates"],
+        "rename": {"date": "rate_date"},
+        "key": ["rate_date", "from_currency", "to_currency"],
+        "columns": [
+            ("rate_date", "DATE"), ("from_currency", "TEXT"), ("to_currency", "TEXT"),
+            ("exchange_rate", "NUMERIC"), ("source", "TEXT"),
+        ],
+    },
+    "customer_segments": {
+        "sources": ["customer_segments"],
+        "key": ["customer_id"],
+        "columns": [
+            ("customer_id", "TEXT"), ("segment", "TEXT"), ("total_lifetime_value", "NUMERIC"),
+            ("total_orders", "NUMERIC"), ("avg_order_value", "NUMERIC"),
+            ("last_order_date", "DATE"), ("days_since_last_order", "NUMERIC"), ("churn_risk", "TEXT"),
+        ],
+    },
+    "customer_service_metrics": {
+        "sources": ["service_metrics"],
+        "rename": {"date": "metric_date"},
+        "key": ["metric_date"],
+        "columns": [
+            ("metric_date", "DATE"), ("tickets_opened", "NUMERIC"), ("tickets_closed", "NUMERIC"),
+            ("tickets_pending", "NUMERIC"), ("avg_response_time_hours", "NUMERIC"),
+            ("avg_resolution_time_hours", "NUMERIC"), ("satisfaction_score", "NUMERIC"),
+        ],
+    },
+    "customers_legacy": {
+        "sources": ["customers_legacy"],
+        "key": ["customer_id"],
+        "columns": [
+            ("customer_id", "TEXT"), ("first_name", "TEXT"), ("last_name", "TEXT"),
+            ("email", "TEXT"), ("phone", "TEXT"), ("registration_date", "TIMESTAMP"),
+            ("country", "TEXT"), ("vip_status", "BOOLEAN"),
+        ],
+    },
+    "discount_codes": {
+        "sources": ["discount_codes"],
+        "key": ["code"],
+        "columns": [
+            ("code", "TEXT"), ("discount_type", "TEXT"), ("discount_value", "NUMERIC"),
+            ("min_purchase", "NUMERIC"), ("max_discount", "NUMERIC"),
+            ("start_date", "DATE"), ("end_date", "DATE"),
+            ("usage_limit", "NUMERIC"), ("times_used", "NUMERIC"), ("active", "BOOLEAN"),
+        ],
+    },
+    "employee_sales": {
+        "sources": ["employee_sales"],
+        "key": ["employee_id"],
+        "columns": [
+            ("employee_id", "TEXT"), ("employee_name", "TEXT"), ("role", "TEXT"),
+            ("region", "TEXT"), ("hire_date", "DATE"), ("sales_q1_2024", "NUMERIC"),
+            ("commission_earned", "NUMERIC"), ("active", "BOOLEAN"),
+        ],
+    },
+    "inventory_valuation": {
+        "sources": ["inventory_valuation"],
+        "key": ["product_id"],
+        "columns": [
+            ("product_id", "TEXT"), ("current_stock", "NUMERIC"), ("unit_cost", "NUMERIC"),
+            ("unit_price", "NUMERIC"), ("total_cost", "NUMERIC"), ("total_retail_value", "NUMERIC"),
+            ("margin_percentage", "NUMERIC"), ("turnover_rate", "NUMERIC"), ("days_of_supply", "NUMERIC"),
+        ],
+    },
+    "marketing_budget": {
+        "sources": ["marketing_budget"],
+        "key": ["year", "month", "channel"],
+        "columns": [
+            ("year", "NUMERIC"), ("month", "NUMERIC"), ("channel", "TEXT"),
+            ("allocated_budget", "NUMERIC"), ("spent_budget", "NUMERIC"),
+            ("target_conversions", "NUMERIC"), ("actual_conversions", "NUMERIC"),
+            ("target_roi", "NUMERIC"), ("actual_roi", "NUMERIC"),
+        ],
+    },
+    "payment_methods_monthly": {
+        "sources": ["payment_methods"],
+        "key": ["year", "month", "payment_method"],
+        "columns": [
+            ("year", "NUMERIC"), ("month", "NUMERIC"), ("payment_method", "TEXT"),
+            ("transaction_count", "NUMERIC"), ("total_amount", "NUMERIC"),
+            ("avg_transaction", "NUMERIC"), ("success_rate", "NUMERIC"), ("chargeback_count", "NUMERIC"),
+        ],
+    },
+    "product_categories": {
+        "sources": ["product_categories"],
+        "key": ["category_id"],
+        "columns": [
+            ("category_id", "TEXT"), ("category_name", "TEXT"), ("parent_category", "TEXT"),
+            ("description", "TEXT"), ("active", "BOOLEAN"), ("commission_rate", "NUMERIC"),
+        ],
+    },
+    "product_views_daily": {
+        "sources": ["product_views"],
+        "rename": {"date": "view_date"},
+        "key": ["view_date", "product_id"],
+        "columns": [
+            ("view_date", "DATE"), ("product_id", "TEXT"), ("views", "NUMERIC"),
+            ("unique_visitors", "NUMERIC"), ("add_to_cart", "NUMERIC"),
+            ("purchases", "NUMERIC"), ("conversion_rate", "NUMERIC"),
+        ],
+    },
+    "product_stock_daily": {
+        "sources": ["stock_jan", "stock_feb"],
+        "rename": {"date": "stock_date"},
+        "key": ["stock_date", "product_id", "warehouse"],
+        "columns": [
+            ("stock_date", "DATE"), ("product_id", "TEXT"), ("warehouse", "TEXT"),
+            ("opening_stock", "NUMERIC"), ("sales", "NUMERIC"), ("returns", "NUMERIC"),
+            ("adjustments", "NUMERIC"), ("closing_stock", "NUMERIC"),
+        ],
+    },
+    "sales_summary_daily": {
+        "sources": ["sales_daily"],
+        "rename": {"date": "summary_date"},
+        "key": ["summary_date"],
+        "columns": [
+            ("summary_date", "DATE"), ("total_transactions", "NUMERIC"), ("total_revenue", "NUMERIC"),
+            ("total_items_sold", "NUMERIC"), ("unique_customers", "NUMERIC"), ("avg_order_value", "NUMERIC"),
+        ],
+    },
+    "shipping_carriers": {
+        "sources": ["shipping_carriers"],
+        "key": ["carrier_id"],
+        "columns": [
+            ("carrier_id", "TEXT"), ("carrier_name", "TEXT"), ("country", "TEXT"),
+            ("domestic_rate", "NUMERIC"), ("international_rate", "NUMERIC"),
+            ("avg_delivery_days_domestic", "NUMERIC"), ("avg_delivery_days_intl", "NUMERIC"),
+            ("tracking_available", "BOOLEAN"), ("insurance_available", "BOOLEAN"),
+        ],
+    },
+    "shipping_zones": {
+        "sources": ["shipping_zones"],
+        "key": ["zone_id"],
+        "columns": [
+            ("zone_id", "TEXT"), ("zone_name", "TEXT"), ("countries", "TEXT"),
+            ("base_cost", "NUMERIC"), ("cost_per_kg", "NUMERIC"),
+            ("estimated_days_min", "NUMERIC"), ("estimated_days_max", "NUMERIC"), ("active", "BOOLEAN"),
+        ],
+    },
+    "social_media_daily": {
+        "sources": ["social_media"],
+        "rename": {"date": "activity_date"},
+        "key": ["activity_date", "platform"],
+        "columns": [
+            ("activity_date", "DATE"), ("platform", "TEXT"), ("followers", "NUMERIC"),
+            ("posts", "NUMERIC"), ("likes", "NUMERIC"), ("comments", "NUMERIC"),
+            ("shares", "NUMERIC"), ("clicks", "NUMERIC"), ("engagement_rate", "NUMERIC"),
+        ],
+    },
+    "supplier_orders": {
+        "sources": ["supplier_orders"],
+        "key": ["order_id"],
+        "columns": [
+            ("order_id", "TEXT"), ("supplier_id", "TEXT"), ("order_date", "DATE"),
+            ("expected_delivery", "DATE"), ("actual_delivery", "DATE"),
+            ("total_amount", "NUMERIC"), ("status", "TEXT"), ("products_count", "NUMERIC"),
+        ],
+    },
+    "website_sessions_daily": {
+        "sources": ["website_sessions"],
+        "rename": {"date": "session_date"},
+        "key": ["session_date"],
+        "columns": [
+            ("session_date", "DATE"), ("sessions", "NUMERIC"), ("unique_visitors", "NUMERIC"),
+            ("page_views", "NUMERIC"), ("bounce_rate", "NUMERIC"), ("avg_session_duration", "NUMERIC"),
+            ("conversions", "NUMERIC"), ("conversion_rate", "NUMERIC"),
+        ],
+    },
+}
+
+
+def csv_columns(table: str) -> list:
+    return [c for c, _ in CSV_TABLES[table]["columns"]]
+
+
+def upsert_clause(table: str) -> str:
+    """ON CONFLICT (clave) DO UPDATE SET col = EXCLUDED.col para el resto de columnas."""
+    spec = CSV_TABLES[table]
+    updates = [c for c in csv_columns(table) if c not in spec["key"]]
+    return (
+        f"ON CONFLICT ({', '.join(spec['key'])}) DO UPDATE SET "
+        + ", ".join(f"{c} = EXCLUDED.{c}" for c in updates)
+    )
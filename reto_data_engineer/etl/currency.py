@@ -0,0 +1,146 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from reto_data_engineer.etl.dates import parse_dates
+from reto_data_engineer.etl.extract import load_csv, source_path
+
+# =======================================================
+#  CONVERSIÓN A MONEDA DE REPORTE
+#
+#  Las órdenes llegan en la moneda del pago (MXN, ARS, BRL, COP...).
+#  Cada monto se convierte a REPORTING_CURRENCY con la última tasa
+#  publicada en o antes de la fecha de la orden (join "as-of" contra
+#  currency_exchange_rates.csv).
+#
+#  La tabla de tasas se normaliza a un factor moneda -> reporte por
+#  fecha: las cotizaciones directas (MXN -> USD) ganan sobre el inverso
+#  de las cotizaciones desde la moneda de reporte (USD -> MXN). El join
+#  usa las fechas ordenadas de cada moneda como índice: np.searchsorted
+#  ubica todas las órdenes de esa moneda de una vez, O(n log m) con m
+#  tasas, sin ordenar las órdenes (lo que domina en un pd.merge_asof).
+# =======================================================
+
+RATES_FILE = "currency_exchange_rates.csv"
+REPORTING_CURRENCY = "USD"
+
+# moneda -> órdenes sin tasa aplicable; se acumula durante la corrida
+_missing = {}
+_missing_lock = threading.Lock()
+
+
+def build_rate_table(rates: pd.DataFrame, reporting: str = REPORTING_CURRENCY) -> pd.DataFrame:
+    """
+    rates: currency_exchange_rates.csv tal como sale de extract
+    (date, from_currency, to_currency, exchange_rate).
+    Devuelve currency, rate_date, fx_rate (monto * fx_rate = monto en
+    `reporting`), ordenado por rate_date dentro de cada moneda.
+    """
+    df = rates.rename(columns={"date": "rate_date"})
+    df = df.assign(
+        rate_date=pd.to_datetime(parse_dates(df["rate_date"]), utc=True),
+        from_currency=df["from_currency"].astype("string").str.strip().str.upper(),
+        to_currency=df["to_currency"].astype("string").str.strip().str.upper(),
+        exchange_rate=pd.to_numeric(df["exchange_rate"], errors="coerce"),
+    )
+    df = df[df["rate_date"].notna() & (df["exchange_rate"] > 0)]
+
+    direct = df[(df["to_currency"] == reporting) & (df["from_currency"] != reporting)]
+    direct = pd.DataFrame({
+        "currency": direct["from_currency"], "rate_date": direct["rate_date"],
+        "fx_rate": direct["exchange_rate"], "priority": 0,
+    })
+    inverse = df[(df["from_currency"] == reporting) & (df["to_currency"] != reporting)]
+    inverse = pd.DataFrame({
+        "currency": inverse["to_currency"], "rate_date": inverse["rate_date"],
+        "fx_rate": 1 / inverse["exchange_rate"], "priority": 1,
+    })
+
+    table = pd.concat([direct, inverse], ignore_index=True)
+    table = (
+        table.sort_values(["currency", "rate_date", "priority"])
+        .drop_duplicates(subset=["currency", "rate_date"], keep="first")
+        .drop(columns="priority")
+        .reset_index(drop=True)
+    )
+    table["currency"] = table["currency"].astype(str)
+    table["fx_rate"] = table["fx_rate"].astype("float64")
+    return table
+
+
+def load_rate_table(reporting: str = REPORTING_CURRENCY) -> pd.DataFrame:
+    if not os.path.exists(source_path(RATES_FILE)):
+        return build_rate_table(
+            pd.DataFrame(columns=["date", "from_currency", "to_currency", "exchange_rate"]), reporting
+        )
+    return build_rate_table(load_csv(RATES_FILE), reporting)
+
+
+def convert_amounts(amounts: pd.Series, currencies: pd.Series, dates: pd.Series,
+                    rate_table: pd.DataFrame, reporting: str = REPORTING_CURRENCY):
+    """
+    Devuelve (monto convertido, tasa aplicada), alineados al índice de
+    `amounts`. La moneda de reporte usa tasa 1; sin tasa previa a la
+    fecha (o moneda desconocida) quedan NaN y se suman al reporte.
+    """
+    # moneda normalizada sobre los valores distintos (un puñado)
+    codes, uniques = pd.factorize(currencies, use_na_sentinel=True)
+    uniques = pd.Index(uniques).astype("string").str.strip().str.upper()
+
+    when = pd.to_datetime(parse_dates(dates), utc=True)
+    ts = when.dt.tz_convert("UTC").to_numpy(dtype="datetime64[ns]", na_value=np.datetime64("NaT"))
+
+    fx = np.full(len(codes), np.nan)
+    by_currency = dict(tuple(rate_table.groupby("currency", sort=False)))
+    for code, currency in enumerate(uniques):
+        rows = codes == code
+        if currency == reporting:
+            fx[rows] = 1.0
+            continue
+        rates = by_currency.get(currency)
+        if rates is None:
+            continue
+        rate_dates = rates["rate_date"].dt.tz_convert("UTC").to_numpy(dtype="datetime64[ns]")
+        # última tasa con rate_date <= fecha de la orden
+        pos = np.searchsorted(rate_dates, ts[rows], side="right") - 1
+        hit = (pos >= 0) & ~np.isnat(ts[rows])
+        out = np.full(len(pos), np.nan)
+        out[hit] = rates["fx_rate"].to_numpy()[pos[hit]]
+        fx[rows] = out
+
+    fx = pd.Series(fx, index=amounts.index, name="fx_rate")
+    converted = (pd.to_numeric(amounts, errors="coerce") * fx).round(2)
+
+    failed = np.bincount(codes[(codes >= 0) & np.isnan(fx.to_numpy())], minlength=len(uniques))
+    missing = {str(uniques[i]): int(n) for i, n in enumerate(failed) if n}
+    if (codes < 0).any():
+        missing["<sin moneda>"] = int((codes < 0).sum())
+    _record(missing)
+    return converted, fx
+
+
+# ==============================
+# REPORTE DE CONVERSIÓN
+# ==============================
+
+def _record(counts: dict):
+    with _missing_lock:
+        for k, v in counts.items():
+            _missing[k] = _missing.get(k, 0) + int(v)
+
+
+def merge_conversion_report(report: dict):
+    """Suma conteos guardados (salida de transform leída de la caché)."""
+    _record(report)
+
+
+def conversion_report() -> dict:
+    """moneda -> órdenes que quedaron sin monto convertido."""
+    with _missing_lock:
+        return dict(_missing)
+
+
+def reset_conversion_report():
+    with _missing_lock:
+        _missing.clear()
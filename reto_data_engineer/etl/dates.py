@@ -0,0 +1,149 @@
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+# =======================================================
+#  NORMALIZACIÓN DE FECHAS CON FORMATOS MEZCLADOS
+#
+#  Los JSON traen en una misma columna ISO 8601 con zona
+#  (2024-01-15T14:32:00Z), fechas ISO (2024-01-15) y dd/mm/yyyy
+#  (15/01/2024, 01/01/2024 08:00:00). pd.to_datetime infiere el formato
+#  del primer valor y deja NaT el resto; con format="mixed" parsea
+#  elemento a elemento. Aquí se detecta el formato de cada valor con
+#  una regex y cada grupo se parsea con su formato explícito.
+#
+#  Los valores se deduplican antes de parsear (pd.factorize): cada
+#  string distinto se parsea una sola vez y el resultado se reparte.
+#  Todo se devuelve en UTC sin zona (datetime64[ns]), el mismo tipo que
+#  las columnas TIMESTAMP del warehouse: los valores con zona se llevan
+#  a UTC y los sin zona se asumen UTC. Así ningún cast TIMESTAMPTZ ->
+#  TIMESTAMP en la BD depende del TimeZone de la sesión.
+# =======================================================
+
+# nombre -> (regex del valor completo, formato para pd.to_datetime)
+DATE_FORMATS = {
+    "iso_datetime": (
+        r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?",
+        "ISO8601",
+    ),
+    "iso_date": (r"\d{4}-\d{2}-\d{2}", "%Y-%m-%d"),
+    "dmy": (r"\d{1,2}/\d{1,2}/\d{4}", "%d/%m/%Y"),
+    "dmy_hm": (r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}", "%d/%m/%Y %H:%M"),
+    "dmy_hms": (r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2}", "%d/%m/%Y %H:%M:%S"),
+}
+
+DATETIME_DTYPE = "datetime64[ns]"
+MAX_FAILURE_SAMPLES = 5
+
+# columna -> {"type", "total", "failed", "samples"}; se acumula durante la
+# corrida. type "date" (parse_dates) o "integer" (schemas.parse_integers):
+# ambos viajan juntos por la caché y el ProcessPoolExecutor del extract
+_failures = {}
+_failures_lock = threading.Lock()
+_capture = threading.local()  # reporte propio del hilo, ver capture_date_failures
+
+
+def parse_dates(values, name: str = None) -> pd.Series:
+    """
+    Convierte una columna de fechas en texto a datetime UTC sin zona.
+    Valores con formato desconocido o fecha inválida (31/02/2024)
+    quedan NaT y se contabilizan en el reporte bajo `name`.
+    Columnas que ya son datetime se devuelven sin cambios (las con zona,
+    llevadas a UTC sin zona).
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return utc_naive(s)
+
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    blank = text.eq("")
+
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns, UTC]")
+    pending = ~blank
+    for pattern, fmt in DATE_FORMATS.values():
+        if not pending.any():
+            break
+        match = pending & text.str.fullmatch(pattern)
+        if match.any():
+            parsed[match] = pd.to_datetime(text[match], format=fmt, utc=True, errors="coerce")
+            pending &= ~match
+
+    if name is not None:
+        # strings vacíos cuentan como nulos, no como error de formato
+        failed = (parsed.isna() & ~blank).to_numpy()
+        used = codes[codes >= 0]
+        record_failures(
+            name,
+            total=int((~blank).to_numpy()[used].sum()),
+            failed=int(failed[used].sum()),
+            samples=text[failed].head(MAX_FAILURE_SAMPLES).tolist(),
+        )
+
+    out = utc_naive(parsed).array.take(codes, allow_fill=True)
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+def utc_naive(s: pd.Series) -> pd.Series:
+    """datetime con zona -> UTC sin zona; sin zona se devuelve igual (ya es UTC)."""
+    if getattr(s.dtype, "tz", None) is not None:
+        return s.dt.tz_convert("UTC").dt.tz_localize(None)
+    return s
+
+
+# ==============================
+# REPORTE DE FALLOS
+# ==============================
+
+def _add(report: dict, name: str, total: int, failed: int, samples: list, kind: str = "date"):
+    entry = report.setdefault(name, {"type": kind, "total": 0, "failed": 0, "samples": []})
+    entry["total"] += total
+    entry["failed"] += failed
+    room = MAX_FAILURE_SAMPLES - len(entry["samples"])
+    entry["samples"].extend(samples[:max(room, 0)])
+
+
+def record_failures(name: str, total: int, failed: int, samples: list, kind: str = "date"):
+    """Suma valores de la columna `name` que no se pudieron convertir a `kind`."""
+    with _failures_lock:
+        _add(_failures, name, total, failed, samples, kind)
+    captured = getattr(_capture, "report", None)
+    if captured is not None:
+        _add(captured, name, total, failed, samples, kind)
+
+
+@contextmanager
+def capture_date_failures():
+    """
+    Junta además en un dict aparte los fallos que registra este hilo
+    dentro del bloque (lo que la caché guarda junto a un dataset).
+    """
+    report, prev = {}, getattr(_capture, "report", None)
+    _capture.report = report
+    try:
+        yield report
+    finally:
+        _capture.report = prev
+
+
+def date_failure_report(kind: str = None) -> dict:
+    """
+    Copia del reporte: columna -> tipo, total de valores, fallidos y
+    ejemplos. kind ("date" / "integer") filtra por tipo; None, todos.
+    """
+    with _failures_lock:
+        return {
+            k: {**v, "samples": list(v["samples"])} for k, v in _failures.items()
+            if kind is None or v.get("type", "date") == kind
+        }
+
+
+def merge_date_failures(report: dict):
+    """Suma un reporte generado en otro proceso (extract con ProcessPoolExecutor)."""
+    for name, entry in report.items():
+        record_failures(name, entry["total"], entry["failed"], entry["samples"], entry.get("type", "date"))
+
+
+def reset_date_failures():
+    with _failures_lock:
+        _failures.clear()
@@ -1,46 +1,385 @@
 import os
 import json
+import time
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-BASE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "json")
+from reto_data_engineer.etl.schemas import apply_schema
+from reto_data_engineer.etl.dates import (
+    date_failure_report, merge_date_failures, reset_date_failures, capture_date_failures
+)
+from reto_data_engineer.utils.logger import observe, count
 
-def load_json(filename: str) -> pd.DataFrame:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow.json as pa_json
+except ImportError:
+    pa_json = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+# RETO_DATA_DIR permite apuntar a otro juego de datos con la misma
+# estructura json/ + csv/ (p. ej. los sintéticos de benchmarks/synthetic.py)
+DATA_DIR = os.environ.get("RETO_DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+BASE_PATH = os.path.join(DATA_DIR, "json")
+CSV_BASE_PATH = os.path.join(DATA_DIR, "csv")
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+# ==============================
+# BACKENDS DE PARSEO
+# orjson / pyarrow son opcionales: si no están instalados se usa json
+# ==============================
+
+def _parse_stdlib(file_path: str):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _parse_orjson(file_path: str):
+    with open(file_path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+PARSERS = {"stdlib": _parse_stdlib}
+if orjson is not None:
+    PARSERS["orjson"] = _parse_orjson
+if pa_json is not None:
+    # pyarrow.json sólo lee NDJSON: load_json lo rechaza para arrays JSON
+    PARSERS["pyarrow"] = None
+
+DEFAULT_PARSER = "orjson" if orjson is not None else "stdlib"
+
+
+def load_json(filename: str, parser: str = None, typed: bool = True) -> pd.DataFrame:
     """
     Carga un archivo JSON desde /data/json y lo devuelve como DataFrame.
     Valida que exista y que tenga formato correcto.
+
+    parser: "stdlib", "orjson" o "pyarrow" (sólo NDJSON; None = el más rápido disponible).
+    typed:  aplica el esquema declarado en etl/schemas.py.
     """
     file_path = os.path.join(BASE_PATH, filename)
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
 
+    parser = parser or DEFAULT_PARSER
+    if parser not in PARSERS:
+        raise ValueError(f"Parser JSON no disponible: {parser} (disponibles: {sorted(PARSERS)})")
+    if parser == "pyarrow" and not file_path.endswith(NDJSON_EXTENSIONS):
+        raise ValueError(f"El parser pyarrow sólo lee NDJSON ({', '.join(NDJSON_EXTENSIONS)}): {filename}")
+
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
+        if parser == "pyarrow":
+            df = pa_json.read_json(file_path).to_pandas()
+        else:
+            data = PARSERS[parser](file_path)
+            # Convertir lista de dicts -> DataFrame
+            df = pd.DataFrame(data) if isinstance(data, list) else pd.DataFrame([data])
+    except ValueError as e:
+        # json.JSONDecodeError, orjson.JSONDecodeError y ArrowInvalid heredan de ValueError
         raise ValueError(f"Error leyendo JSON {filename}: {e}")
 
-    # Convertir lista de dicts -> DataFrame
-    if isinstance(data, list):
-        return pd.DataFrame(data)
+    return apply_schema(df, os.path.basename(filename)) if typed else df
+
+# ==============================
+# STREAMING (arrays JSON grandes y NDJSON)
+# ==============================
+
+DEFAULT_CHUNK_SIZE = 50_000
+READ_SIZE = 1 << 20  # 1 MiB por lectura
+
+
+def iter_json_records(filename: str, read_size: int = READ_SIZE):
+    """
+    Itera los registros de un archivo JSON sin cargarlo completo.
+    Soporta un array top-level ([{...}, {...}]) y secuencias de objetos
+    separados por espacios/saltos de línea (NDJSON / JSON Lines).
+    """
+    file_path = os.path.join(BASE_PATH, filename)
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
+
+    decoder = json.JSONDecoder()
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        buf = f.read(read_size).lstrip()
+        eof = len(buf) == 0
+        in_array = buf.startswith("[")
+        pos = 1 if in_array else 0
+
+        while True:
+            # saltar separadores entre registros
+            while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ",")):
+                pos += 1
+
+            if pos < len(buf) and in_array and buf[pos] == "]":
+                return
+
+            if pos >= len(buf):
+                if eof:
+                    if in_array:
+                        raise ValueError(f"Error leyendo JSON {filename}: array sin cerrar")
+                    return
+                more = f.read(read_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Error leyendo JSON {filename}: {e}")
+                more = f.read(read_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+
+            yield obj
+            pos = end
+
+
+def iter_json_chunks(filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE, part: int = 0, parts: int = 1):
+    """
+    Agrupa los registros de iter_json_records en DataFrames de chunk_size
+    filas. Con parts > 1 sólo devuelve los chunks i con i % parts == part
+    (los demás se descartan sin armar el DataFrame).
+
+    Cada part recorre y parsea igual el archivo completo: partir por
+    offsets de bytes sólo sirve para NDJSON, no para un array JSON. Con
+    parts > 1 se reparten transformación y carga; la lectura se repite
+    parts veces.
+    """
+    batch, index = [], 0
+    for record in iter_json_records(filename):
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            if index % parts == part:
+                yield apply_schema(pd.DataFrame(batch), os.path.basename(filename))
+            batch, index = [], index + 1
+    if batch and index % parts == part:
+        yield apply_schema(pd.DataFrame(batch), os.path.basename(filename))
+
+
+# ==============================
+# CSV (data/csv)
+#
+# Todas las columnas se leen como texto y el esquema (etl/schemas.py)
+# las tipa: así las fechas mezcladas y los booleanos Yes/No/1/0 pasan
+# por el mismo parseo que los JSON. Con pyarrow instalado se usa su
+# lector CSV (multihilo) con todas las columnas declaradas string: el
+# engine="pyarrow" de pandas infiere tipos antes de aplicar dtype y
+# convierte teléfonos como +525551234567 a float. La lectura por chunks
+# usa el motor C de pandas.
+# ==============================
+
+# "NA" no se trata como nulo: es un código de país válido (Namibia)
+CSV_NA_VALUES = ["", "NULL", "null"]
+
+
+def _csv_path(filename: str) -> str:
+    file_path = os.path.join(CSV_BASE_PATH, filename)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
+    return file_path
+
+
+def _read_csv_arrow(file_path: str) -> pd.DataFrame:
+    names = pd.read_csv(file_path, nrows=0).columns
+    table = pa_csv.read_csv(
+        file_path,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in names},
+            null_values=CSV_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas().astype("string")
+
+
+def load_csv(filename: str, typed: bool = True, engine: str = None) -> pd.DataFrame:
+    """
+    Carga un CSV de /data/csv como DataFrame (tipado según su esquema).
+    engine: "pyarrow" o "c" (None = pyarrow si está instalado).
+    """
+    file_path = _csv_path(filename)
+    engine = engine or ("pyarrow" if pa_csv is not None else "c")
+    try:
+        if engine == "pyarrow":
+            df = _read_csv_arrow(file_path)
+        else:
+            df = pd.read_csv(file_path, dtype="string", keep_default_na=False, na_values=CSV_NA_VALUES)
+    except (ValueError, pd.errors.ParserError) as e:
+        # ArrowInvalid hereda de ValueError
+        raise ValueError(f"Error leyendo CSV {filename}: {e}")
+
+    return apply_schema(df, filename) if typed else df
+
+
+def iter_csv_chunks(filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE, part: int = 0, parts: int = 1):
+    """
+    Lee el CSV en DataFrames de chunk_size filas, ya tipados (ver part /
+    parts en iter_json_chunks: cada part también lee el archivo completo).
+    """
+    reader = pd.read_csv(
+        _csv_path(filename), dtype="string", keep_default_na=False,
+        na_values=CSV_NA_VALUES, chunksize=chunk_size
+    )
+    with reader:
+        for index, chunk in enumerate(reader):
+            if index % parts == part:
+                yield apply_schema(chunk, filename)
+
+
+# ==============================
+# DATASETS (JSON + CSV)
+# ==============================
+
+def source_path(filename: str) -> str:
+    """Ruta completa de un archivo origen según su extensión."""
+    base = CSV_BASE_PATH if filename.endswith(".csv") else BASE_PATH
+    return os.path.join(base, filename)
+
+
+def load_dataset(filename: str, parser: str = None) -> pd.DataFrame:
+    if filename.endswith(".csv"):
+        return load_csv(filename)
+    return load_json(filename, parser=parser)
+
+
+def iter_dataset_chunks(filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE, part: int = 0, parts: int = 1):
+    if filename.endswith(".csv"):
+        return iter_csv_chunks(filename, chunk_size, part, parts)
+    return iter_json_chunks(filename, chunk_size, part, parts)
+
+
+# dataset -> archivo en /data/json o /data/csv
+DATASET_FILES = {
+    "customers": "customers_master.json",
+    "reviews_jan": "customer_reviews_jan.json",
+    "reviews_feb": "customer_reviews_feb.json",
+    "competitor": "competitor_pricing.json",
+    "support": "customer_support_tickets.json",
+    "email_sends": "email_marketing_sends.json",
+    "inv_jan": "inventory_adjustments_jan.json",
+    "inv_feb": "inventory_adjustments_feb.json",
+    "campaigns": "marketing_campaigns_q1.json",
+    "payments": "payment_transactions.json",
+    # data/csv
+    "countries": "countries_reference.csv",
+    "exchange_rates": "currency_exchange_rates.csv",
+    "customer_segments": "customer_segments.csv",
+    "service_metrics": "customer_service_metrics.csv",
+    "customers_legacy": "customers_legacy.csv",
+    "discount_codes": "discount_codes.csv",
+    "employee_sales": "employee_sales.csv",
+    "inventory_valuation": "inventory_valuation.csv",
+    "marketing_budget": "marketing_budget.csv",
+    "payment_methods": "payment_methods_summary.csv",
+    "product_categories": "product_categories.csv",
+    "product_views": "product_views.csv",
+    "stock_jan": "products_stock_daily_jan.csv",
+    "stock_feb": "products_stock_daily_feb.csv",
+    "sales_daily": "sales_summary_daily.csv",
+    "shipping_carriers": "shipping_carriers.csv",
+    "shipping_zones": "shipping_zones.csv",
+    "social_media": "social_media_engagement.csv",
+    "supplier_orders": "supplier_orders.csv",
+    "website_sessions": "website_sessions.csv",
+}
+
+
+def _timed_load(filename: str, parser: str = None):
+    # nivel módulo para poder enviarse a un ProcessPoolExecutor; devuelve
+    # también los fallos de fecha del archivo (se guardan con la caché)
+    t0 = time.perf_counter()
+    with capture_date_failures() as report:
+        df = load_dataset(filename, parser=parser)
+    return df, time.perf_counter() - t0, report
+
+
+def _timed_load_process(filename: str, parser: str = None):
+    # en un proceso hijo el reporte de fechas no llega al padre: se devuelve
+    reset_date_failures()
+    df, seconds, _ = _timed_load(filename, parser)
+    return df, seconds, date_failure_report()
+
+
+def extract_all(executor: str = None, max_workers: int = None, parser: str = None, cache=None,
+                names: list = None):
+    """
+    Carga los datasets necesarios para el ETL: todos los de DATASET_FILES,
+    o sólo los de names (claves de DATASET_FILES) si se indica.
+
+    executor: None (secuencial), "thread" (almacenamiento I/O-bound) o
+    "process" (parseo CPU-bound, escala con los núcleos disponibles).
+    parser: backend JSON (ver load_json).
+    cache: DatasetCache (etl/cache.py); los archivos sin cambios se leen
+    de la caché columnar y sólo se parsean los que no están.
+    """
+    if executor not in (None, "thread", "process"):
+        raise ValueError(f"Executor no soportado: {executor}")
+    selected = list(DATASET_FILES) if names is None else list(names)
+    unknown = [n for n in selected if n not in DATASET_FILES]
+    if unknown:
+        raise ValueError(f"Datasets desconocidos: {', '.join(unknown)}")
+
+    datasets = {}
+    if cache is not None:
+        for name in selected:
+            filename = DATASET_FILES[name]
+            t0 = time.perf_counter()
+            key = cache.extract_key(filename)
+            df = cache.get(key)
+            if df is not None:
+                datasets[name] = df
+                merge_date_failures(cache.dq(key).get("dates", {}))
+                seconds = time.perf_counter() - t0
+                observe("extract_dataset", seconds, dataset=filename, source="cache")
+                count("rows_read", len(df), dataset=filename)
+                print(f"EXTRACT: {filename} → {len(df)} filas en {seconds:.3f} s (caché)")
+
+    names = [n for n in selected if n not in datasets]
+    files = [DATASET_FILES[n] for n in names]
+
+    if not files:
+        loaded = []
+    elif executor is None:
+        loaded = [_timed_load(f, parser) for f in files]
+    elif executor == "thread":
+        workers = max_workers or min(len(files), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(_timed_load, files, [parser] * len(files)))
     else:
-        return pd.DataFrame([data])
-
-def extract_all():
-    """Carga todos los datasets necesarios para el ETL."""
-
-    datasets = {
-        "customers": load_json("customers_master.json"),
-        "reviews_jan": load_json("customer_reviews_jan.json"),
-        "reviews_feb": load_json("customer_reviews_feb.json"),
-        "competitor": load_json("competitor_pricing.json"),
-        "support": load_json("customer_support_tickets.json"),
-        "email_sends": load_json("email_marketing_sends.json"),
-        "inv_jan": load_json("inventory_adjustments_jan.json"),
-        "inv_feb": load_json("inventory_adjustments_feb.json"),
-        "campaigns": load_json("marketing_campaigns_q1.json"),
-        "payments": load_json("payment_transactions.json"),
-    }
-
-    print("EXTRACT: JSON cargados correctamente")
+        workers = max_workers or min(len(files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = []
+            for df, seconds, report in pool.map(_timed_load_process, files, [parser] * len(files)):
+                merge_date_failures(report)
+                loaded.append((df, seconds, report))
+
+    for name, filename, (df, seconds, report) in zip(names, files, loaded):
+        datasets[name] = df
+        # medido en el hilo / proceso que leyó el archivo
+        observe("extract_dataset", seconds, dataset=filename, source="file")
+        count("rows_read", len(df), dataset=filename)
+        print(f"EXTRACT: {filename} → {len(df)} filas en {seconds:.3f} s")
+        if cache is not None:
+            cache.put(cache.extract_key(filename), df, dq={"dates": report})
+
+    if cache is not None:
+        cache.flush()
+
+    print(f"EXTRACT: {len(datasets)} de {len(DATASET_FILES)} datasets cargados correctamente")
     return datasets
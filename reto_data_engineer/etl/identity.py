@@ -0,0 +1,168 @@
+import os
+import threading
+import pandas as pd
+
+from reto_data_engineer.etl.extract import load_csv, source_path
+
+# =======================================================
+#  ÍNDICE DE IDENTIDAD DE CLIENTES
+#
+#  Resuelve a qué customer_id pertenece cada orden. Sólo los pagos
+#  PayPal traen email; el resto se resuelve con otras claves:
+#
+#    email          email normalizado (customers_master + customers_legacy.csv)
+#    transaction_id reviews / tickets de soporte: la transacción ya
+#                   viene asociada a un cliente
+#    phone          teléfono normalizado (últimos PHONE_DIGITS dígitos)
+#
+#  Cada clave es un dict; para resolver se compila una vez a pd.Index
+#  (tabla hash) + array de customer_id y se busca con get_indexer, O(1)
+#  por orden. Series.map(dict) reconstruye el dict como Series en cada
+#  llamada, lo que en modo streaming se pagaría por chunk. Las órdenes
+#  se resuelven en cascada en ese orden y sólo se busca en la estrategia
+#  siguiente lo que quedó sin resolver. Ante una clave repetida gana el
+#  primer cliente agregado (master antes que legacy).
+# =======================================================
+
+LEGACY_CUSTOMERS_FILE = "customers_legacy.csv"
+
+STRATEGIES = ("email", "transaction_id", "phone")
+
+# ignora prefijos de país / área distintos entre fuentes (+52 555... vs 555...)
+PHONE_DIGITS = 10
+MIN_PHONE_DIGITS = 7
+
+# estrategia -> órdenes resueltas; se acumula durante la corrida
+_match_counts = {}
+_match_lock = threading.Lock()
+
+
+def normalize_email(s: pd.Series) -> pd.Series:
+    return s.astype("string").str.strip().str.lower()
+
+
+def normalize_phone(s: pd.Series) -> pd.Series:
+    digits = s.astype("string").str.replace(r"\D", "", regex=True)
+    return digits.where(digits.str.len() >= MIN_PHONE_DIGITS).str[-PHONE_DIGITS:]
+
+
+def _first_wins(keys: pd.Series, ids: pd.Series) -> dict:
+    pairs = pd.DataFrame({"key": keys.to_numpy(), "id": ids.astype("string").to_numpy()})
+    pairs = pairs.dropna().drop_duplicates(subset="key", keep="first")
+    return dict(zip(pairs["key"], pairs["id"]))
+
+
+class CustomerIndex:
+    def __init__(self):
+        self.by_email = {}
+        self.by_phone = {}
+        self.by_transaction = {}
+        self._compiled = {}
+
+    def add_customers(self, df: pd.DataFrame):
+        """Agrega email / teléfono -> customer_id (columnas opcionales)."""
+        self._compiled.clear()
+        if "email" in df.columns:
+            self.by_email = {**_first_wins(normalize_email(df["email"]), df["customer_id"]), **self.by_email}
+        if "phone" in df.columns:
+            self.by_phone = {**_first_wins(normalize_phone(df["phone"]), df["customer_id"]), **self.by_phone}
+        return self
+
+    def add_transactions(self, df: pd.DataFrame):
+        """Agrega transaction_id -> customer_id desde reviews / tickets."""
+        if {"transaction_id", "customer_id"} <= set(df.columns):
+            self._compiled.clear()
+            keys = df["transaction_id"].astype("string").str.strip()
+            self.by_transaction = {**_first_wins(keys, df["customer_id"]), **self.by_transaction}
+        return self
+
+    def _lookup(self, strategy: str):
+        if strategy not in self._compiled:
+            mapping = {"email": self.by_email, "transaction_id": self.by_transaction,
+                       "phone": self.by_phone}[strategy]
+            self._compiled[strategy] = (
+                pd.Index(list(mapping), dtype=object),
+                pd.array(list(mapping.values()), dtype="string"),
+            )
+        return self._compiled[strategy]
+
+    def resolve(self, df: pd.DataFrame, email: pd.Series = None) -> pd.Series:
+        """
+        Devuelve customer_id por fila (NA si no se resolvió) y suma al
+        reporte cuántas filas resolvió cada estrategia.
+        `email` permite pasar el email ya coalescido de la orden.
+        """
+        keys = {
+            "email": email if email is not None else (
+                normalize_email(df["email"]) if "email" in df.columns else None),
+            "transaction_id": df["transaction_id"].astype("string").str.strip()
+            if "transaction_id" in df.columns else None,
+            "phone": normalize_phone(df["phone"]) if "phone" in df.columns else None,
+        }
+
+        customer_id = pd.Series(pd.NA, index=df.index, dtype="string")
+        counts = {"orders": len(df)}
+        for strategy in STRATEGIES:
+            pending = customer_id.isna()
+            key = keys[strategy]
+            known, ids = self._lookup(strategy)
+            if key is None or not pending.any() or len(known) == 0:
+                counts[strategy] = 0
+                continue
+            key = key[pending]
+            pos = known.get_indexer(key.to_numpy(dtype=object, na_value=None))
+            found = pd.Series(ids.take(pos, allow_fill=True), index=key.index)
+            customer_id = customer_id.fillna(found)
+            counts[strategy] = int(found.notna().sum())
+        counts["unmatched"] = int(customer_id.isna().sum())
+
+        _record(counts)
+        return customer_id
+
+    @classmethod
+    def from_customers(cls, customers_df: pd.DataFrame):
+        return cls().add_customers(customers_df)
+
+
+def load_legacy_customers() -> pd.DataFrame:
+    if not os.path.exists(source_path(LEGACY_CUSTOMERS_FILE)):
+        return pd.DataFrame(columns=["customer_id", "email", "phone"])
+    return load_csv(LEGACY_CUSTOMERS_FILE)
+
+
+def build_customer_index(customers_raw: pd.DataFrame, linked=(), legacy: pd.DataFrame = None):
+    """
+    customers_raw: customers_master tal como sale de extract.
+    linked: DataFrames con transaction_id + customer_id (reviews, tickets).
+    legacy: customers_legacy.csv ya extraído (None = se lee del disco).
+    """
+    index = CustomerIndex().add_customers(customers_raw)
+    index.add_customers(legacy if legacy is not None else load_legacy_customers())
+    for df in linked:
+        index.add_transactions(df)
+    return index
+
+
+# ==============================
+# REPORTE DE MATCHING
+# ==============================
+
+def _record(counts: dict):
+    with _match_lock:
+        for k, v in counts.items():
+            _match_counts[k] = _match_counts.get(k, 0) + v
+
+
+def merge_match_report(report: dict):
+    """Suma conteos guardados (salida de transform leída de la caché)."""
+    _record(report)
+
+
+def match_report() -> dict:
+    with _match_lock:
+        return dict(_match_counts)
+
+
+def reset_match_report():
+    with _match_lock:
+        _match_counts.clear()
@@ -0,0 +1,183 @@
+import threading
+import pandas as pd
+
+from reto_data_engineer.etl.load import connection_scope
+
+# =======================================================
+#  TABLAS KPI MATERIALIZADAS (ver sql/ddl.sql, sección 7)
+#
+#  Las vistas vw_* leen de tablas kpi_* pre-agregadas en vez de
+#  re-agregar orders / reviews completos en cada consulta del
+#  dashboard. Después de cada carga sólo se recalculan las claves
+#  tocadas en la corrida:
+#
+#    kpi_sales_by_customer  clientes cargados + clientes de las órdenes
+#    kpi_sales_by_country   países de esos clientes (actual y anterior,
+#                           por si el cliente cambió de país)
+#    kpi_sales_by_date      días de las órdenes cargadas
+#    kpi_reviews_by_product productos de las reviews cargadas
+#
+#  total_orders cuenta todas las órdenes; priced_orders sólo las que
+#  tienen monto en moneda de reporte (total_amount_reporting NULL = sin
+#  tasa de cambio, ver etl/currency.py). Los tickets promedio dividen
+#  total_sales por priced_orders: las órdenes sin monto no suman ventas
+#  y tampoco deben sumar al denominador.
+#
+#  Cada refresco es DELETE de las claves + INSERT ... SELECT ... GROUP BY
+#  filtrado por esas mismas claves, en una transacción. Con full=True se
+#  vacían y recalculan completas. Las filas sin clave (órdenes sin fecha,
+#  que van a la partición DEFAULT, y reviews sin producto) se excluyen en
+#  ambos caminos: la clave de kpi_* es NOT NULL.
+# =======================================================
+
+# tabla cargada -> columnas cuyas claves se registran
+KPI_SOURCES = {
+    "customers": ["customer_id"],
+    "orders": ["order_id", "customer_id"],
+    "reviews": ["product_id"],
+}
+
+# país de los clientes sin país (la clave de kpi_sales_by_country no admite NULL)
+UNKNOWN_COUNTRY = "N/D"
+
+# kpi -> (columna clave en kpi_*, INSERT ... SELECT con {where},
+#         expresión de la clave en el SELECT, condición siempre aplicada o None)
+KPI_TABLES = {
+    "kpi_sales_by_customer": ("customer_id", f"""
+        INSERT INTO kpi_sales_by_customer (
+            customer_pk, customer_id, full_name, email, country,
+            total_sales, total_orders, priced_orders, avg_ticket, first_order_date, last_order_date
+        )
+        SELECT
+            c.customer_pk, c.customer_id, c.full_name, c.email,
+            COALESCE(c.country, '{UNKNOWN_COUNTRY}'),
+            SUM(o.total_amount_reporting), COUNT(o.order_pk), COUNT(o.total_amount_reporting),
+            AVG(o.total_amount_reporting),
+            MIN(o.order_date), MAX(o.order_date)
+        FROM orders o
+        JOIN customers c ON c.customer_pk = o.customer_pk
+        {{where}}
+        GROUP BY c.customer_pk, c.customer_id, c.full_name, c.email, c.country
+    """, "c.customer_id", None),
+    "kpi_sales_by_country": ("country", f"""
+        INSERT INTO kpi_sales_by_country (country, total_sales, total_orders, priced_orders, avg_ticket)
+        SELECT
+            COALESCE(c.country, '{UNKNOWN_COUNTRY}'),
+            SUM(o.total_amount_reporting), COUNT(o.order_pk), COUNT(o.total_amount_reporting),
+            AVG(o.total_amount_reporting)
+        FROM orders o
+        JOIN customers c ON c.customer_pk = o.customer_pk
+        {{where}}
+        GROUP BY COALESCE(c.country, '{UNKNOWN_COUNTRY}')
+    """, f"COALESCE(c.country, '{UNKNOWN_COUNTRY}')", None),
+    "kpi_sales_by_date": ("date_pk", """
+        INSERT INTO kpi_sales_by_date (
+            date_pk, year, month, month_name, week_of_year, day_of_month,
+            total_sales, total_orders, priced_orders
+        )
+        SELECT
+            DATE(o.order_date), d.year, d.month, d.month_name, d.week_of_year, d.day_of_month,
+            SUM(o.total_amount_reporting), COUNT(o.order_pk), COUNT(o.total_amount_reporting)
+        FROM orders o
+        LEFT JOIN dim_date d ON d.date_pk = DATE(o.order_date)
+        {where}
+        GROUP BY DATE(o.order_date), d.year, d.month, d.month_name, d.week_of_year, d.day_of_month
+    """, "DATE(o.order_date)", "o.order_date IS NOT NULL"),
+    "kpi_reviews_by_product": ("product_id", """
+        INSERT INTO kpi_reviews_by_product (product_id, total_reviews, avg_rating)
+        SELECT r.product_id, COUNT(r.review_pk), AVG(r.rating)
+        FROM reviews r
+        {where}
+        GROUP BY r.product_id
+    """, "r.product_id", "r.product_id IS NOT NULL"),
+}
+
+
+class KpiTracker:
+    """
+    Acumula las claves cargadas durante la corrida (las tareas de carga
+    corren en hilos) y al final refresca sólo esas claves en kpi_*.
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self._lock = threading.Lock()
+
+    def add(self, table: str, df: pd.DataFrame):
+        cols = [c for c in KPI_SOURCES.get(table, ()) if c in df.columns]
+        if not cols or df.empty:
+            return
+        values = {c: set(df[c].dropna().astype(str).unique()) for c in cols}
+        with self._lock:
+            entry = self.keys.setdefault(table, {})
+            for c, v in values.items():
+                entry.setdefault(c, set()).update(v)
+
+    def _collected(self, table: str, col: str, tables) -> list:
+        if tables is not None and table not in tables:
+            return []
+        return sorted(self.keys.get(table, {}).get(col, ()))
+
+    def refresh(self, tables=None, full: bool = False, conn=None) -> dict:
+        """
+        tables: tablas cuya carga se confirmó (None = todas). Las claves
+        de tablas revertidas se ignoran. Devuelve kpi -> filas escritas.
+        """
+        customer_ids = sorted(set(self._collected("customers", "customer_id", tables))
+                              | set(self._collected("orders", "customer_id", tables)))
+        order_ids = self._collected("orders", "order_id", tables)
+        product_ids = self._collected("reviews", "product_id", tables)
+
+        written = {}
+        with connection_scope(conn) as conn:
+            cur = conn.cursor()
+
+            if full:
+                keys = {kpi: None for kpi in KPI_TABLES}
+            else:
+                keys = {
+                    "kpi_sales_by_customer": customer_ids,
+                    "kpi_sales_by_country": _touched_countries(cur, customer_ids),
+                    "kpi_sales_by_date": _touched_dates(cur, order_ids),
+                    "kpi_reviews_by_product": product_ids,
+                }
+
+            for kpi, (key_col, insert, key_expr, required) in KPI_TABLES.items():
+                values = keys[kpi]
+                conditions = [required] if required else []
+                if values is None:
+                    cur.execute(f"TRUNCATE {kpi}")
+                    cur.execute(insert.format(where=_where(conditions)))
+                elif values:
+                    cur.execute(f"DELETE FROM {kpi} WHERE {key_col} = ANY(%s)", (values,))
+                    conditions.append(f"{key_expr} = ANY(%s)")
+                    cur.execute(insert.format(where=_where(conditions)), (values,))
+                else:
+                    continue
+                written[kpi] = max(cur.rowcount, 0)
+
+            cur.close()
+        return written
+
+
+def _where(conditions: list) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def _touched_countries(cur, customer_ids: list) -> list:
+    if not customer_ids:
+        return []
+    # país actual del cliente + el que tenía en la última agregación
+    cur.execute(f"""
+        SELECT COALESCE(country, '{UNKNOWN_COUNTRY}') FROM customers WHERE customer_id = ANY(%s)
+        UNION
+        SELECT country FROM kpi_sales_by_customer WHERE customer_id = ANY(%s)
+    """, (customer_ids, customer_ids))
+    return sorted({row[0] for row in cur.fetchall() if row[0] is not None})
+
+
+def _touched_dates(cur, order_ids: list) -> list:
+    if not order_ids:
+        return []
+    cur.execute("SELECT DISTINCT DATE(order_date) FROM orders WHERE order_id = ANY(%s)", (order_ids,))
+    return sorted({row[0] for row in cur.fetchall() if row[0] is not None})
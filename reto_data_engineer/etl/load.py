@@ -2,6 +2,12 @@ import pandas as pd
 import os
 import yaml
 import pg8000
+from contextlib import contextmanager
+from reto_data_engineer.etl.materialize import materialize_rows
+from reto_data_engineer.etl.csv_tables import csv_columns, upsert_clause
+from reto_data_engineer.etl.partitions import PARTITIONED_TABLES, split_by_partition, ensure_partitions
+from reto_data_engineer.etl.rejects import reject, write_bisect
+from reto_data_engineer.utils.logger import count, timer
 from pathlib import Path
 
 # =======================================================
@@ -24,15 +30,85 @@ DB_PARAMS = {
     "password": str(db_cfg["password"]).strip()
 }
 
+# Conexiones máximas que mantiene abiertas el pool de etl/session.py
+POOL_SIZE = int(db_cfg.get("pool_size", 4))
+
+
+class CountingCursor:
+    """
+    Cursor que cuenta round trips a la BD (métrica db_round_trips).
+    pg8000 ejecuta executemany sentencia por sentencia: cuenta una por
+    fila; un COPY con stream cuenta uno.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        count("db_round_trips", kind="execute")
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, operation, param_sets):
+        param_sets = list(param_sets)
+        count("db_round_trips", len(param_sets), kind="executemany")
+        return self._cursor.executemany(operation, param_sets)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return CountingCursor(self._conn.cursor())
+
+    def commit(self):
+        count("db_round_trips", kind="commit")
+        return self._conn.commit()
+
+    def rollback(self):
+        count("db_round_trips", kind="rollback")
+        return self._conn.rollback()
+
+    def run(self, *args, **kwargs):
+        count("db_round_trips", kind="execute")
+        return self._conn.run(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
 
 def get_connection():
-    return pg8000.connect(
+    return CountingConnection(pg8000.connect(
         host=DB_PARAMS["host"],
         port=DB_PARAMS["port"],
         database=DB_PARAMS["database"],
         user=DB_PARAMS["user"],
         password=DB_PARAMS["password"]
-    )
+    ))
+
+
+@contextmanager
+def connection_scope(conn=None):
+    """
+    Usa la conexión recibida (p. ej. de un LoadSession) sin hacer commit
+    ni cerrarla, o abre una propia que se confirma y cierra al salir.
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    conn = get_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 # =======================================================
@@ -48,10 +124,72 @@ def clean_value(v):
     return v
 
 
+# =======================================================
+#  RESOLUCIÓN customer_id -> customer_pk
+# =======================================================
+def with_customer_pk(df: pd.DataFrame, customer_map: dict, table: str):
+    """
+    Añade customer_pk desde customer_map; los registros sin cliente van
+    a etl_rejects (etl/rejects.py).
+    """
+    known = df["customer_id"].isin(list(customer_map))
+    reject(df[~known], "load", table, "missing_customer")
+    df = df[known].assign(customer_pk=df.loc[known, "customer_id"].map(customer_map))
+    return df, int((~known).sum())
+
+
+def _executemany_batch(query: str, columns: list):
+    def write(cur, part):
+        cur.executemany(query, materialize_rows(part, columns))
+        # filas escritas de verdad: ON CONFLICT DO NOTHING / NOT EXISTS cuentan 0
+        return max(cur.rowcount, 0)
+    return write
+
+
+def insert_rows(cur, table: str, query: str, df: pd.DataFrame, columns: list) -> tuple:
+    """
+    executemany bajo write_bisect (las filas que la BD rechaza van a
+    etl_rejects). Las tablas particionadas (etl/partitions.py) se
+    insertan partición por partición: `query` lleva {target} en lugar
+    del nombre de la tabla. Devuelve (insertadas, rechazadas).
+    """
+    if table in PARTITIONED_TABLES:
+        parts = split_by_partition(table, df)
+        # transacción corta propia, antes de insertar (ver partitions.py)
+        ensure_partitions(table, [month for _, month, _ in parts])
+    else:
+        parts = [(table, None, df)]
+
+    inserted, rejected = 0, 0
+    for target, _, part in parts:
+        results, failed = write_bisect(cur, part, _executemany_batch(query.format(target=target), columns), table)
+        inserted += sum(results)
+        rejected += failed
+    if rejected:
+        print(f"{table}: {rejected} filas rechazadas por la BD (ver etl_rejects)")
+    return inserted, rejected
+
+
+def fetch_customer_map(cur, customer_ids: list = None) -> dict:
+    """
+    Devuelve el mapa customer_id -> customer_pk en una sola consulta.
+    Sin customer_ids trae la tabla completa.
+    """
+    if customer_ids is None:
+        cur.execute("SELECT customer_id, customer_pk FROM customers")
+    else:
+        cur.execute(
+            "SELECT customer_id, customer_pk FROM customers WHERE customer_id = ANY(%s)",
+            (list(customer_ids),)
+        )
+    return {cid: pk for cid, pk in cur.fetchall()}
+
+
 # =======================================================
 #  LOAD CUSTOMERS
 # =======================================================
-def load_customers(df: pd.DataFrame) -> dict:
+@timer("load_fn")
+def load_customers(df: pd.DataFrame, conn=None) -> dict:
     if df.empty:
         print("No hay customers.")
         return {}
@@ -68,28 +206,21 @@ def load_customers(df: pd.DataFrame) -> dict:
             country = EXCLUDED.country,
             language = EXCLUDED.language,
             birth_date = EXCLUDED.birth_date,
-            registration_date = EXCLUDED.registration_date
-        RETURNING customer_pk, customer_id;
+            registration_date = EXCLUDED.registration_date;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
-    customer_map = {}
+    cols = [
+        "customer_id", "full_name", "email", "country",
+        "language", "birth_date", "registration_date"
+    ]
 
-    for _, row in df.iterrows():
-        values = tuple(clean_value(row[col]) for col in [
-            "customer_id", "full_name", "email", "country",
-            "language", "birth_date", "registration_date"
-        ])
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-        cur.execute(query, values)
-        result = cur.fetchone()
-        if result:
-            customer_map[result[1]] = result[0]
+        insert_rows(cur, "customers", query, df, cols)
+        customer_map = fetch_customer_map(cur, df["customer_id"].dropna().unique().tolist())
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.close()
 
     print(f"Customers insertados/actualizados: {len(customer_map)}")
     return customer_map
@@ -98,60 +229,47 @@ def load_customers(df: pd.DataFrame) -> dict:
 # =======================================================
 # LOAD ORDERS — FK customer_id real
 # =======================================================
-def load_orders(df: pd.DataFrame, customer_map: dict):
+@timer("load_fn")
+def load_orders(df: pd.DataFrame, customer_map: dict, conn=None):
     if df.empty:
         print("No hay orders.")
         return
 
     query = """
-        INSERT INTO orders (
+        INSERT INTO {target} (
             order_id, customer_pk, total_amount,
-            currency, order_date, status
+            currency, total_amount_reporting, fx_rate,
+            order_date, status
         )
-        VALUES (%s,%s,%s,%s,%s,%s)
-        ON CONFLICT (order_id) DO NOTHING;
+        SELECT %s,%s,%s,%s,%s,%s,%s,%s
+        -- la clave única de la partición incluye la fecha (ver sql/ddl.sql)
+        WHERE NOT EXISTS (SELECT 1 FROM orders WHERE order_id = %s)
+        ON CONFLICT DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    inserted = 0
-    skipped = 0
-
-    for _, row in df.iterrows():
-
-        cid = row["customer_id"]
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-        if cid not in customer_map:
-            skipped += 1
-            print(f"Orden {row['order_id']} descartada — customer_id no existe: {cid}")
-            continue
-
-        values = tuple(clean_value(v) for v in [
-            row["order_id"],             # PK orden
-            customer_map[cid],           # FK customers
-            row["total_amount"],         # monto
-            row["currency"],             # moneda
-            row["order_date"],           # fecha
-            row["status"]                # estado
+        df, skipped = with_customer_pk(df, customer_map, "orders")
+        inserted, rejected = insert_rows(cur, "orders", query, df, [
+            "order_id", "customer_pk", "total_amount",
+            "currency", "total_amount_reporting", "fx_rate",
+            "order_date", "status", "order_id"
         ])
 
-        cur.execute(query, values)
-        inserted += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.close()
 
     print(f"Orders insertadas correctamente: {inserted}")
     if skipped > 0:
         print(f"Orders descartadas por cliente inexistente: {skipped}")
+    return {"inserted": inserted, "skipped": skipped, "rejected": rejected}
 
 
 # =======================================================
 # LOAD REVIEWS
 # =======================================================
-def load_reviews(df: pd.DataFrame, customer_map: dict):
+@timer("load_fn")
+def load_reviews(df: pd.DataFrame, customer_map: dict, conn=None):
     if df.empty:
         print("No hay reviews.")
         return
@@ -166,32 +284,28 @@ def load_reviews(df: pd.DataFrame, customer_map: dict):
         ON CONFLICT (review_id) DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-    for _, row in df.iterrows():
-        cid = row["customer_id"]
-        if cid not in customer_map:
-            continue
-
-        values = tuple(clean_value(v) for v in [
-            row["review_id"], customer_map[cid], row["product_id"],
-            row["rating"], row["comment"], row["review_date"],
-            row["verified_purchase"], row["helpful_votes"], row["unhelpful_votes"]
+        df, skipped = with_customer_pk(df, customer_map, "reviews")
+        inserted, rejected = insert_rows(cur, "reviews", query, df, [
+            "review_id", "customer_pk", "product_id",
+            "rating", "comment", "review_date",
+            "verified_purchase", "helpful_votes", "unhelpful_votes"
         ])
 
-        cur.execute(query, values)
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("Reviews cargadas.")
+        cur.close()
+    print(f"Reviews cargadas: {inserted}")
+    if skipped > 0:
+        print(f"Reviews descartadas por cliente inexistente: {skipped}")
+    return {"inserted": inserted, "skipped": skipped, "rejected": rejected}
 
 
 # =======================================================
 # LOAD COMPETITOR PRICING
 # =======================================================
-def load_competitor_pricing(df: pd.DataFrame):
+@timer("load_fn")
+def load_competitor_pricing(df: pd.DataFrame, conn=None):
     if df.empty:
         print("⚠ No hay competitor pricing.")
         return
@@ -206,28 +320,25 @@ def load_competitor_pricing(df: pd.DataFrame):
         ON CONFLICT DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-    for _, row in df.iterrows():
-        values = tuple(clean_value(v) for v in [
-            row["product_id"], row["snapshot_date"], row["our_price"],
-            row["competitor_price"], row["competitor_name"], row["in_stock"],
-            row["num_reviews"], row["rating"]
+        inserted, rejected = insert_rows(cur, "competitor_pricing", query, df, [
+            "product_id", "snapshot_date", "our_price",
+            "competitor_price", "competitor_name", "in_stock",
+            "num_reviews", "rating"
         ])
 
-        cur.execute(query, values)
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.close()
     print("Competitor pricing cargado.")
+    return {"inserted": inserted, "skipped": 0, "rejected": rejected}
 
 
 # =======================================================
 # LOAD SUPPORT TICKETS
 # =======================================================
-def load_support_tickets(df: pd.DataFrame, customer_map: dict):
+@timer("load_fn")
+def load_support_tickets(df: pd.DataFrame, customer_map: dict, conn=None):
     if df.empty:
         print("No hay tickets.")
         return
@@ -242,72 +353,65 @@ def load_support_tickets(df: pd.DataFrame, customer_map: dict):
         ON CONFLICT (ticket_id) DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
-
-    for _, row in df.iterrows():
-        cid = row["customer_id"]
-        if cid not in customer_map:
-            continue
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-        values = tuple(clean_value(v) for v in [
-            row["ticket_id"], customer_map[cid], row["transaction_id"],
-            row["subject"], row["description"], row["priority"], row["status"],
-            row["created_at"], row["updated_at"], row["resolved_at"]
+        df, skipped = with_customer_pk(df, customer_map, "support_tickets")
+        inserted, rejected = insert_rows(cur, "support_tickets", query, df, [
+            "ticket_id", "customer_pk", "transaction_id",
+            "subject", "description", "priority", "status",
+            "created_at", "updated_at", "resolved_at"
         ])
 
-        cur.execute(query, values)
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("Support tickets cargados.")
+        cur.close()
+    print(f"Support tickets cargados: {inserted}")
+    if skipped > 0:
+        print(f"Support tickets descartados por cliente inexistente: {skipped}")
+    return {"inserted": inserted, "skipped": skipped, "rejected": rejected}
 
 
 # =======================================================
 # LOAD MARKETING SENDS
 # =======================================================
-def load_marketing_sends(df: pd.DataFrame, customer_map: dict):
+@timer("load_fn")
+def load_marketing_sends(df: pd.DataFrame, customer_map: dict, conn=None):
     if df.empty:
         print("No hay sends.")
         return
 
     query = """
-        INSERT INTO marketing_sends (
+        INSERT INTO {target} (
             send_id, customer_pk, campaign_id,
             sent_date, open_date, click_date,
             conversion_date, bounced, bounce_reason
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        ON CONFLICT (send_id) DO NOTHING;
+        SELECT %s,%s,%s,%s,%s,%s,%s,%s,%s
+        WHERE NOT EXISTS (SELECT 1 FROM marketing_sends WHERE send_id = %s)
+        ON CONFLICT DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-    for _, row in df.iterrows():
-        cid = row["customer_id"]
-        if cid not in customer_map:
-            continue
-
-        values = tuple(clean_value(v) for v in [
-            row["send_id"], customer_map[cid], row["campaign_id"],
-            row["sent_date"], row["open_date"], row["click_date"],
-            row["conversion_date"], row["bounced"], row["bounce_reason"]
+        df, skipped = with_customer_pk(df, customer_map, "marketing_sends")
+        inserted, rejected = insert_rows(cur, "marketing_sends", query, df, [
+            "send_id", "customer_pk", "campaign_id",
+            "sent_date", "open_date", "click_date",
+            "conversion_date", "bounced", "bounce_reason", "send_id"
         ])
 
-        cur.execute(query, values)
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("Marketing sends cargados.")
+        cur.close()
+    print(f"Marketing sends cargados: {inserted}")
+    if skipped > 0:
+        print(f"Marketing sends descartados por cliente inexistente: {skipped}")
+    return {"inserted": inserted, "skipped": skipped, "rejected": rejected}
 
 
 # =======================================================
 # LOAD CAMPAIGNS
 # =======================================================
-def load_campaigns(df: pd.DataFrame):
+@timer("load_fn")
+def load_campaigns(df: pd.DataFrame, conn=None):
     if df.empty:
         print("No hay campañas.")
         return
@@ -322,55 +426,74 @@ def load_campaigns(df: pd.DataFrame):
         ON CONFLICT (campaign_id) DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-    for _, row in df.iterrows():
-        values = tuple(clean_value(v) for v in [
-            row["campaign_id"], row["name"], row["channel"], row["budget"],
-            row["impressions"], row["clicks"], row["conversions"],
-            row["revenue_generated"], row["start_date"], row["end_date"]
+        inserted, rejected = insert_rows(cur, "campaigns", query, df, [
+            "campaign_id", "name", "channel", "budget",
+            "impressions", "clicks", "conversions",
+            "revenue_generated", "start_date", "end_date"
         ])
 
-        cur.execute(query, values)
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.close()
     print("Campaigns cargadas.")
+    return {"inserted": inserted, "skipped": 0, "rejected": rejected}
 
 
 # =======================================================
 # LOAD INVENTORY
 # =======================================================
-def load_inventory(df: pd.DataFrame):
+@timer("load_fn")
+def load_inventory(df: pd.DataFrame, conn=None):
     if df.empty:
         print("No hay inventario.")
         return
 
     query = """
-        INSERT INTO inventory_adjustments (
+        INSERT INTO {target} (
             adjustment_id, product_id, movement_type,
             quantity_change, previous_stock, new_stock,
             warehouse, adjustment_date, user_name
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        ON CONFLICT (adjustment_id) DO NOTHING;
+        SELECT %s,%s,%s,%s,%s,%s,%s,%s,%s
+        WHERE NOT EXISTS (SELECT 1 FROM inventory_adjustments WHERE adjustment_id = %s)
+        ON CONFLICT DO NOTHING;
     """
 
-    conn = get_connection()
-    cur = conn.cursor()
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
 
-    for _, row in df.iterrows():
-        values = tuple(clean_value(v) for v in [
-            row["adjustment_id"], row["product_id"], row["movement_type"],
-            row["quantity_change"], row["previous_stock"], row["new_stock"],
-            row["warehouse"], row["adjustment_date"], row["user_name"]
+        inserted, rejected = insert_rows(cur, "inventory_adjustments", query, df, [
+            "adjustment_id", "product_id", "movement_type",
+            "quantity_change", "previous_stock", "new_stock",
+            "warehouse", "adjustment_date", "user_name", "adjustment_id"
         ])
 
-        cur.execute(query, values)
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        cur.close()
     print("Inventory adjustments cargados.")
+    return {"inserted": inserted, "skipped": 0, "rejected": rejected}
+
+
+# =======================================================
+# LOAD TABLAS CSV (etl/csv_tables.py)
+# =======================================================
+@timer("load_fn")
+def load_csv_table(table: str, df: pd.DataFrame, conn=None):
+    if df.empty:
+        print(f"No hay {table}.")
+        return
+
+    cols = csv_columns(table)
+    query = f"""
+        INSERT INTO {table} ({', '.join(cols)})
+        VALUES ({','.join(['%s'] * len(cols))})
+        {upsert_clause(table)};
+    """
+
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        inserted, rejected = insert_rows(cur, table, query, df, cols)
+        cur.close()
+
+    print(f"{table} cargado: {inserted}")
+    return {"inserted": inserted, "skipped": 0, "rejected": rejected}
@@ -0,0 +1,95 @@
+import io
+import numpy as np
+import pandas as pd
+
+from reto_data_engineer.etl.dates import utc_naive
+
+# =======================================================
+#  Materialización vectorizada DataFrame -> filas para la BD
+#
+#  Equivale a aplicar load.clean_value celda a celda, pero trabaja
+#  columna a columna con máscaras NumPy (sin iterrows ni Series por fila).
+# =======================================================
+
+COPY_NULL = r"\N"
+
+
+def materialize_column(s: pd.Series) -> np.ndarray:
+    """
+    Convierte una columna a un array object con valores nativos de Python:
+    NaN/NaT/None -> None, Timestamp -> datetime (UTC sin zona), bool -> int.
+    """
+    mask = s.isna().to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(s):
+        values = np.asarray(utc_naive(s).dt.to_pydatetime(), dtype=object)
+    elif pd.api.types.is_bool_dtype(s):
+        values = s.to_numpy(dtype=bool, na_value=False).astype(np.int64).astype(object)
+    else:
+        values = s.to_numpy(dtype=object)
+
+    if mask.any():
+        values = values.copy()
+        values[mask] = None
+    return values
+
+
+def materialize_rows(df: pd.DataFrame, columns: list) -> list:
+    """Devuelve la lista de tuplas lista para executemany."""
+    if df.empty:
+        return []
+    cols = [materialize_column(df[c]) for c in columns]
+    return list(zip(*cols))
+
+
+# =======================================================
+#  Buffer COPY (formato text de PostgreSQL)
+# =======================================================
+def _copy_text_column(s: pd.Series) -> np.ndarray:
+    mask = s.isna().to_numpy()
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # frames compactos (etl/compact.py): cada categoría se serializa una
+        # vez y se indexa con los códigos (los -1 son nulos, se pisan abajo)
+        categories = _copy_text_column(pd.Series(s.cat.categories))
+        if len(categories) == 0:
+            return np.full(len(s), COPY_NULL, dtype=object)
+        values = categories[s.cat.codes.to_numpy()]
+    elif pd.api.types.is_bool_dtype(s):
+        values = np.where(s.to_numpy(dtype=bool, na_value=False), "t", "f").astype(object)
+    elif pd.api.types.is_datetime64_any_dtype(s):
+        # astype(str) sobre datetime naive es mucho más rápido que strftime;
+        # las columnas con zona se escriben en UTC sin zona, igual que
+        # parse_dates (las columnas destino son TIMESTAMP)
+        values = utc_naive(s).astype(str).to_numpy(dtype=object)
+    elif pd.api.types.is_numeric_dtype(s):
+        values = s.astype(str).to_numpy(dtype=object)
+    else:
+        # texto / objetos (fechas date, valores mixtos): escapar separadores
+        values = (
+            s.astype(str)
+            .str.replace("\\", "\\\\", regex=False)
+            .str.replace("\t", "\\t", regex=False)
+            .str.replace("\n", "\\n", regex=False)
+            .str.replace("\r", "\\r", regex=False)
+            .to_numpy(dtype=object)
+        )
+
+    if mask.any():
+        values = values.copy()
+        values[mask] = COPY_NULL
+    return values
+
+
+def to_copy_buffer(df: pd.DataFrame, columns: list) -> io.StringIO:
+    """
+    Serializa las columnas indicadas en formato text de COPY
+    (tab como separador, \\N como NULL), columna a columna.
+    """
+    buf = io.StringIO()
+    if not df.empty:
+        cols = [_copy_text_column(df[c]) for c in columns]
+        buf.write("\n".join(map("\t".join, zip(*cols))))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
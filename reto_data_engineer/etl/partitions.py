@@ -0,0 +1,180 @@
+import threading
+import pandas as pd
+
+from reto_data_engineer.etl.dates import utc_naive
+
+# =======================================================
+#  PARTICIONES MENSUALES DE LAS TABLAS DE HECHOS
+#
+#  orders, marketing_sends e inventory_adjustments están particionadas
+#  por rango mensual sobre su fecha (ver sql/ddl.sql, sección 2b). El
+#  DDL sólo crea la tabla padre y la partición DEFAULT (filas sin fecha);
+#  las mensuales se crean aquí a medida que el loader ve meses nuevos.
+#
+#  Cada chunk se parte por mes y cada parte se inserta directo en su
+#  partición (orders_p202401, ...): no hay ruteo fila a fila en el
+#  padre, y el ON CONFLICT sólo revisa el índice de ese mes.
+#
+#  Las particiones que faltan se crean ANTES de la carga, en una
+#  transacción corta y propia que se confirma enseguida: CREATE TABLE
+#  ... PARTITION OF toma un lock fuerte sobre la tabla padre y, dentro
+#  de la transacción de carga, lo retendría hasta el commit (bloqueando
+#  a los demás escritores y a los lectores de KPI). Un advisory lock por
+#  tabla serializa a las sesiones que crean meses a la vez, y bajo ese
+#  lock se vuelve a leer pg_inherits antes de crear: IF NOT EXISTS no
+#  alcanza para dos CREATE concurrentes del mismo mes. Las particiones
+#  conocidas quedan en una caché del proceso (sin round trip por chunk).
+#
+#  Ese CREATE espera a toda transacción que haya leído o escrito la tabla
+#  padre, incluida la de carga del propio proceso si ya está abierta: la
+#  BD no ve ese ciclo (son dos conexiones) y la carga quedaría colgada.
+#  Por eso los meses se crean antes de abrir la transacción de carga
+#  (main_etl y el plan de shards: create_source_partitions en stream.py)
+#  y la creación corre con lock_timeout: un mes imprevisto en medio de
+#  una transacción abierta falla con error en vez de colgarse.
+#
+#  La fecha de partición llega en UTC sin zona (etl/dates.py) para que
+#  el mes calculado aquí coincida con el rango de la partición sin
+#  importar la zona horaria de la sesión.
+# =======================================================
+
+# tabla -> columna de partición
+PARTITIONED_TABLES = {
+    "orders": "order_date",
+    "marketing_sends": "sent_date",
+    "inventory_adjustments": "adjustment_date",
+}
+
+
+def partition_name(table: str, month: pd.Timestamp = None) -> str:
+    if month is None:
+        return f"{table}_default"
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def split_by_partition(table: str, df: pd.DataFrame) -> list:
+    """
+    Parte df por mes de la columna de partición. Devuelve
+    [(partición, primer día del mes o None, sub-DataFrame)], con la
+    columna de partición ya en UTC sin zona.
+    """
+    col = PARTITIONED_TABLES[table]
+    df = df.copy()
+    df[col] = utc_naive(pd.to_datetime(df[col]))
+
+    # año * 12 + mes: clave entera, agrupa sin formatear fechas
+    dates = df[col]
+    month_key = (dates.dt.year * 12 + dates.dt.month - 1).astype("Int64")
+
+    parts = []
+    for key, part in df.groupby(month_key, sort=True, dropna=False):
+        if pd.isna(key):
+            parts.append((partition_name(table), None, part))
+            continue
+        month = pd.Timestamp(year=int(key) // 12, month=int(key) % 12 + 1, day=1)
+        parts.append((partition_name(table, month), month, part))
+    return parts
+
+
+EXISTING_PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = %s::regclass
+"""
+
+
+# la clave es "partitions:<tabla>"
+PARTITION_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+
+# espera máxima del CREATE ... PARTITION OF por el lock de la tabla padre
+PARTITION_LOCK_TIMEOUT = "10s"
+PARTITION_TIMEOUT_SQL = f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"
+
+_lock = threading.Lock()
+_known = {}  # tabla -> particiones que existen (leídas o creadas por este proceso)
+
+
+def partition_lock_key(table: str) -> str:
+    return f"partitions:{table}"
+
+
+def missing_partitions(table: str, months: list) -> dict:
+    """partición -> mes, de los meses cuya partición este proceso todavía no vio."""
+    with _lock:
+        known = _known.get(table, set())
+        return {
+            partition_name(table, m): m
+            for m in months if m is not None and partition_name(table, m) not in known
+        }
+
+
+def remember_partitions(table: str, names):
+    with _lock:
+        _known.setdefault(table, set()).update(names)
+
+
+def forget_partitions(table: str, names=None):
+    """Olvida particiones (todas si names es None), p. ej. tras un DROP."""
+    with _lock:
+        if names is None:
+            _known.pop(table, None)
+        else:
+            _known.get(table, set()).difference_update(names)
+
+
+def create_partition_sql(table: str, month: pd.Timestamp) -> str:
+    upper = month + pd.offsets.MonthBegin(1)
+    return f"""
+        CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table}
+        FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')
+    """
+
+
+def existing_partitions(cur, table: str) -> set:
+    cur.execute(EXISTING_PARTITIONS_SQL, (table,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def ensure_partitions(table: str, months: list, conn=None) -> list:
+    """
+    Crea las particiones mensuales que falten en una transacción propia
+    (confirmada al volver). No pasar la conexión de la carga: el lock
+    sobre la tabla padre duraría toda la carga. Devuelve las creadas.
+    """
+    missing = missing_partitions(table, months)
+    if not missing:
+        return []
+
+    # import diferido: load.py usa este módulo
+    from reto_data_engineer.etl.load import connection_scope
+
+    created = []
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(PARTITION_TIMEOUT_SQL)
+        cur.execute(PARTITION_LOCK_SQL, (partition_lock_key(table),))
+        known = existing_partitions(cur, table)
+        for name, month in sorted(missing.items()):
+            if name not in known:
+                cur.execute(create_partition_sql(table, month))
+                created.append(name)
+        cur.close()
+    remember_partitions(table, known | set(created))
+    return created
+
+
+def drop_partitions_before(cur, table: str, month: pd.Timestamp) -> list:
+    """
+    Retención: elimina las particiones de meses anteriores a `month`.
+    DROP de una partición es instantáneo frente a un DELETE por fecha.
+    """
+    cutoff = partition_name(table, month)
+    dropped = sorted(
+        name for name in existing_partitions(cur, table)
+        if name != partition_name(table) and name < cutoff
+    )
+    for name in dropped:
+        cur.execute(f"DROP TABLE {name}")
+    forget_partitions(table, dropped)
+    return dropped
@@ -0,0 +1,154 @@
+import threading
+import pandas as pd
+
+from reto_data_engineer.etl.load import connection_scope
+from reto_data_engineer.utils.logger import count
+
+# =======================================================
+#  DIMENSIÓN PRODUCTS (ver sql/ddl.sql, sección 3)
+#
+#  reviews, competitor_pricing e inventory_adjustments tienen FK a
+#  products, así que cada producto tiene que existir antes que sus
+#  hechos. En vez de rellenar products en el DDL recorriendo las tablas
+#  de hechos, el ETL junta los product_id distintos de cada chunk
+#  transformado y, antes de cargarlo, hace un único upsert con los que
+#  todavía no conoce.
+#
+#  Los ids (y atributos) ya escritos quedan en una caché del proceso:
+#  un id conocido no vuelve a la BD, ni en la misma corrida ni en las
+#  siguientes del mismo proceso. El upsert usa su propia conexión y se
+#  confirma al momento (una dimensión no se revierte con la tabla de
+#  hechos que la trajo).
+#
+#  Atributos: inventory_valuation aporta costo y precio unitario. La
+#  categoría se resuelve contra product_categories por category_id;
+#  ningún archivo actual trae category_id por producto, así que queda
+#  NULL hasta que alguna fuente lo declare en PRODUCT_ATTRIBUTES.
+# =======================================================
+
+# dataset transformado -> columna con el id de producto
+PRODUCT_SOURCES = {
+    "reviews": "product_id",
+    "competitor_pricing": "product_id",
+    "inventory_adjustments": "product_id",
+    "product_views_daily": "product_id",
+    "product_stock_daily": "product_id",
+    "inventory_valuation": "product_id",
+}
+
+# dataset transformado -> {columna del dataset: columna de products}
+PRODUCT_ATTRIBUTES = {
+    "inventory_valuation": {"unit_cost": "unit_cost", "unit_price": "unit_price"},
+}
+
+# atributos de products que escribe el ETL (y su tipo en el upsert)
+ATTRIBUTE_COLUMNS = [("category_id", "TEXT"), ("unit_cost", "NUMERIC"), ("unit_price", "NUMERIC")]
+
+_attr_names = [c for c, _ in ATTRIBUTE_COLUMNS]
+
+# un NULL (fuente sin ese atributo) no pisa el valor ya guardado
+_set_clause = ",\n        ".join(
+    f"{c} = COALESCE(EXCLUDED.{c}, products.{c})" for c in _attr_names + ["category", "subcategory"]
+)
+
+UPSERT_SQL = f"""
+    INSERT INTO products (product_id, {', '.join(_attr_names)}, category, subcategory)
+    SELECT s.product_id, {', '.join('s.' + c for c in _attr_names)},
+           COALESCE(pc.parent_category, pc.category_name),
+           CASE WHEN pc.parent_category IS NOT NULL THEN pc.category_name END
+    FROM json_to_recordset(%s::json)
+         AS s(product_id TEXT, {', '.join(f'{c} {t}' for c, t in ATTRIBUTE_COLUMNS)})
+    LEFT JOIN product_categories pc ON pc.category_id = s.category_id
+    ORDER BY s.product_id
+    ON CONFLICT (product_id) DO UPDATE SET
+        {_set_clause},
+        updated_at = NOW()
+    WHERE {' OR '.join(f'EXCLUDED.{c} IS NOT NULL' for c in _attr_names)}
+"""
+
+_lock = threading.Lock()
+_known = {}  # product_id -> atributos ya escritos (tupla en el orden de ATTRIBUTE_COLUMNS)
+
+
+def product_rows(frames: dict) -> pd.DataFrame:
+    """
+    Una fila por product_id distinto de frames (dataset -> DataFrame),
+    con los atributos que aporten; si un id viene de varios datasets se
+    queda la fila con más atributos.
+    """
+    parts = []
+    for key, df in frames.items():
+        col = PRODUCT_SOURCES.get(key)
+        if col is None or df is None or df.empty or col not in df.columns:
+            continue
+        attrs = {c: a for c, a in PRODUCT_ATTRIBUTES.get(key, {}).items() if c in df.columns}
+        if attrs:
+            part = df[[col, *attrs]].rename(columns={col: "product_id", **attrs})
+        else:
+            # hechos: sólo los ids distintos (pocos frente a las filas)
+            part = pd.DataFrame({"product_id": df[col].dropna().unique()})
+        parts.append(part)
+
+    columns = ["product_id", *_attr_names]
+    if not parts:
+        return pd.DataFrame(columns=columns)
+
+    rows = pd.concat(parts, ignore_index=True).reindex(columns=columns)
+    rows = rows[rows["product_id"].notna()]
+    rows["product_id"] = rows["product_id"].astype(str)
+    filled = rows[_attr_names].notna().sum(axis=1)
+    rows = rows.loc[filled.sort_values(ascending=False, kind="stable").index]
+    return rows.drop_duplicates("product_id").sort_values("product_id", ignore_index=True)
+
+
+def _merge(values: tuple, previous) -> tuple:
+    # mismo COALESCE que el upsert
+    if previous is None:
+        return values
+    return tuple(v if v is not None else p for v, p in zip(values, previous))
+
+
+def _attributes(rows: pd.DataFrame):
+    attrs = rows[_attr_names].astype(object).where(rows[_attr_names].notna(), None)
+    return zip(rows["product_id"], attrs.itertuples(index=False, name=None))
+
+
+def _unseen(rows: pd.DataFrame) -> pd.DataFrame:
+    keep = [
+        pid not in _known or _merge(values, _known[pid]) != _known[pid]
+        for pid, values in _attributes(rows)
+    ]
+    return rows[keep]
+
+
+def ensure_products(frames: dict, conn=None) -> int:
+    """
+    Upsert en products de los ids de frames (dataset -> DataFrame) que
+    la caché no conoce, o cuyos atributos cambiaron, en una sola
+    sentencia. Devuelve la cantidad de productos enviados a la BD.
+    """
+    rows = product_rows(frames)
+    if rows.empty:
+        return 0
+
+    # un upsert a la vez: sin esperas cruzadas entre tareas por el mismo id
+    with _lock:
+        pending = _unseen(rows)
+        if pending.empty:
+            return 0
+        with connection_scope(conn) as conn:
+            cur = conn.cursor()
+            cur.execute(UPSERT_SQL, (pending.to_json(orient="records"),))
+            cur.close()
+
+        for pid, values in _attributes(pending):
+            _known[pid] = _merge(values, _known.get(pid))
+
+    count("products_upserted", len(pending))
+    return len(pending)
+
+
+def reset_product_cache():
+    """Olvida los productos conocidos (p. ej. tras recrear el esquema)."""
+    with _lock:
+        _known.clear()
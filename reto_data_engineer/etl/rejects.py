@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+
+from reto_data_engineer.etl.materialize import to_copy_buffer
+from reto_data_engineer.utils.logger import count
+
+try:
+    import pyarrow  # noqa: F401  (sólo para elegir el formato del sink "file")
+except ImportError:
+    pyarrow = None
+
+# =======================================================
+#  REGISTROS RECHAZADOS (DEAD-LETTER)
+#
+#  Toda fila que el ETL descarta queda registrada con la corrida, la
+#  etapa, la tabla, el motivo y el registro original (JSON):
+#
+#    TRANSFORM  reglas de calidad (sin email, sin cliente, clave nula...)
+#    LOAD       sin cliente en customers, o rechazada por la BD
+#
+#  Los rechazos se acumulan en memoria y se escriben por lotes de
+#  REJECT_BATCH_ROWS (COPY a etl_rejects, ver sql/ddl.sql sección 8b, o
+#  archivos Parquet / JSONL en rejects/<run_id>/). Si la tabla no está
+#  disponible el lote cae al sink de archivo: nunca se pierde.
+#
+#  write_bisect: si un lote falla por un error de DATOS de la BD (clase
+#  SQLSTATE 22 / 23), se revierte a un SAVEPOINT y se reintenta en dos
+#  mitades hasta aislar las filas culpables; una fila mala cuesta
+#  ~2·log2(n) reintentos en vez de la tabla completa. Otros errores
+#  (tabla inexistente, conexión...) se propagan como antes.
+# =======================================================
+
+REJECT_BATCH_ROWS = 5_000
+REJECTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "rejects")
+SINKS = ("table", "file")
+
+# clases SQLSTATE atribuibles a la fila: data_exception, integrity_constraint_violation
+ROW_ERROR_CLASSES = ("22", "23")
+
+# más rechazos que esto en un mismo lote = error sistemático: se propaga
+MAX_BISECT_REJECTS = 1_000
+
+COLUMNS = ["run_id", "stage", "table_name", "reason", "record"]
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_state = {"run_id": None, "sink": None, "path": REJECTS_DIR, "files": 0}
+_pending = []
+_pending_rows = 0
+_totals = {}
+_listeners = []  # fn(df, stage, table, reason) por cada reject(); se vacía en start_run
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def start_run(run_id: str = None, sink: str = "table", path: str = REJECTS_DIR) -> str:
+    """
+    Inicia el registro de una corrida. sink None: sólo se cuentan los
+    rechazos (uso como librería / benchmarks). Devuelve el run_id.
+    """
+    global _pending_rows
+    if sink not in SINKS + (None,):
+        raise ValueError(f"Sink de rechazos no soportado: {sink}")
+    with _lock:
+        _state.update(run_id=run_id or new_run_id(), sink=sink, path=path, files=0)
+        _pending.clear()
+        _pending_rows = 0
+        _totals.clear()
+        _listeners.clear()
+        return _state["run_id"]
+
+
+def add_listener(fn):
+    """fn(df, stage, table, reason) se llama con cada lote rechazado de la corrida."""
+    with _lock:
+        _listeners.append(fn)
+
+
+def remove_listener(fn):
+    with _lock:
+        if fn in _listeners:
+            _listeners.remove(fn)
+
+
+def current_run_id():
+    return _state["run_id"]
+
+
+def reject(df: pd.DataFrame, stage: str, table: str, reason: str):
+    """Registra las filas de df como rechazadas (se escriben por lotes)."""
+    global _pending_rows
+    if df is None or df.empty:
+        return
+    count("rows_rejected", len(df), stage=stage, table=table, reason=reason)
+
+    for fn in list(_listeners):
+        fn(df, stage, table, reason)
+
+    batch = None
+    with _lock:
+        key = (stage, table, reason)
+        _totals[key] = _totals.get(key, 0) + len(df)
+        if _state["sink"] is None:
+            return
+        records = df.to_json(orient="records", lines=True, date_format="iso",
+                             default_handler=str, force_ascii=False).splitlines()
+        _pending.append(pd.DataFrame({
+            "run_id": _state["run_id"], "stage": stage, "table_name": table,
+            "reason": reason, "record": records,
+        }))
+        _pending_rows += len(df)
+        if _pending_rows >= REJECT_BATCH_ROWS:
+            batch = _take_pending()
+
+    if batch is not None:
+        _write(batch)
+
+
+def _take_pending() -> pd.DataFrame:
+    global _pending_rows
+    batch = pd.concat(_pending, ignore_index=True)
+    _pending.clear()
+    _pending_rows = 0
+    return batch
+
+
+def flush():
+    """Escribe los rechazos pendientes (al final de la corrida)."""
+    with _lock:
+        batch = _take_pending() if _pending else None
+    if batch is not None:
+        _write(batch)
+
+
+def _write(batch: pd.DataFrame):
+    # un lote a la vez: el orden de los archivos / COPY sigue al de los rechazos
+    with _flush_lock:
+        if _state["sink"] == "table":
+            try:
+                _write_table(batch)
+                return
+            except Exception as e:
+                print(f"REJECTS: no se pudo escribir en etl_rejects ({e}); se usa archivo")
+        _write_file(batch)
+
+
+def _write_table(batch: pd.DataFrame):
+    # import diferido: load.py usa este módulo
+    from reto_data_engineer.etl.load import connection_scope
+
+    # conexión propia: los rechazos persisten aunque la carga se revierta
+    with connection_scope() as conn:
+        cur = conn.cursor()
+        cur.execute(f"COPY etl_rejects ({', '.join(COLUMNS)}) FROM STDIN",
+                    stream=to_copy_buffer(batch, COLUMNS))
+        cur.close()
+
+
+def _write_file(batch: pd.DataFrame):
+    folder = os.path.join(_state["path"], _state["run_id"])
+    os.makedirs(folder, exist_ok=True)
+    _state["files"] += 1
+    name = os.path.join(folder, f"rejects_{_state['files']:05d}")
+    if pyarrow is not None:
+        batch.to_parquet(f"{name}.parquet", index=False)
+    else:
+        batch.to_json(f"{name}.jsonl", orient="records", lines=True, force_ascii=False)
+
+
+def reject_report() -> dict:
+    """(etapa, tabla, motivo) -> filas rechazadas en la corrida."""
+    with _lock:
+        return dict(_totals)
+
+
+# ==============================
+# ESCRITURA CON BISECCIÓN
+# ==============================
+
+def sqlstate(error: Exception):
+    """Código SQLSTATE de un error de pg8000 (dict en args)."""
+    code = getattr(error, "sqlstate", None)
+    if code is None and error.args and isinstance(error.args[0], dict):
+        code = error.args[0].get("C")
+    return code
+
+
+def is_row_error(error: Exception) -> bool:
+    code = sqlstate(error)
+    return code is not None and code[:2] in ROW_ERROR_CLASSES
+
+
+def error_reason(error: Exception) -> str:
+    if error.args and isinstance(error.args[0], dict):
+        return f"{error.args[0].get('C')}: {error.args[0].get('M')}"
+    return f"{sqlstate(error) or type(error).__name__}: {error}"
+
+
+def write_bisect(cur, df: pd.DataFrame, write, table: str, stage: str = "load") -> tuple:
+    """
+    Ejecuta write(cur, parte) dentro de un SAVEPOINT. Si falla por un
+    error de datos, revierte la parte y la reintenta en dos mitades;
+    las filas que fallan solas se registran como rechazadas.
+    Devuelve (resultados de write de las partes confirmadas, filas rechazadas).
+    """
+    results = []
+    pending = [df]
+    rejected = 0
+    while pending:
+        part = pending.pop()
+        cur.execute("SAVEPOINT etl_batch")
+        try:
+            result = write(cur, part)
+        except Exception as e:
+            if not is_row_error(e):
+                raise
+            cur.execute("ROLLBACK TO SAVEPOINT etl_batch")
+            if len(part) > 1:
+                mid = len(part) // 2
+                pending += [part.iloc[mid:], part.iloc[:mid]]
+                continue
+            rejected += 1
+            if rejected > MAX_BISECT_REJECTS:
+                raise
+            reject(part, stage, table, error_reason(e))
+            continue
+        cur.execute("RELEASE SAVEPOINT etl_batch")
+        results.append(result)
+    return results, rejected
+
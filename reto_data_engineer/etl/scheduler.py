@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from reto_data_engineer.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _validate_dag(tasks: dict, dependencies: dict):
+    unknown = {d for deps in dependencies.values() for d in deps} - set(tasks)
+    if unknown:
+        raise ValueError(f"Dependencias desconocidas en el DAG: {sorted(unknown)}")
+
+    # detección de ciclos (Kahn)
+    pending = {t: set(dependencies.get(t, ())) for t in tasks}
+    while pending:
+        ready = [t for t, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"Ciclo detectado en el DAG: {sorted(pending)}")
+        for t in ready:
+            del pending[t]
+        for deps in pending.values():
+            deps.difference_update(ready)
+
+
+def run_dag(tasks: dict, dependencies: dict, max_workers: int = 4) -> dict:
+    """
+    Ejecuta un DAG de tareas sobre un pool de hilos.
+
+    tasks:        nombre -> callable(results) donde results contiene el
+                  valor devuelto por cada tarea ya completada
+    dependencies: nombre -> lista de tareas que deben terminar antes
+
+    Las tareas listas se lanzan en paralelo; si una falla, sus dependientes
+    se marcan como 'skipped'. Devuelve nombre -> {status, result, error, seconds}.
+    """
+    _validate_dag(tasks, dependencies)
+
+    results = {}
+    outcome = {}
+    remaining = {t: set(dependencies.get(t, ())) for t in tasks}
+    running = {}
+
+    def timed(name):
+        t0 = time.time()
+        value = tasks[name](results)
+        return value, time.time() - t0
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while remaining or running:
+            # descartar tareas cuyo prerequisito falló u omitió
+            for name, deps in list(remaining.items()):
+                blocked = [d for d in deps if outcome.get(d, {}).get("status") in ("failed", "skipped")]
+                if blocked:
+                    del remaining[name]
+                    outcome[name] = {"status": "skipped", "result": None,
+                                     "error": f"dependencia no disponible: {blocked}", "seconds": 0.0}
+                    logger.warning(f"Tarea {name} omitida — dependencia fallida: {blocked}")
+
+            ready = [t for t, deps in remaining.items() if all(d in results for d in deps)]
+            for name in ready:
+                del remaining[name]
+                running[pool.submit(timed, name)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    value, seconds = fut.result()
+                    results[name] = value
+                    outcome[name] = {"status": "ok", "result": value, "error": None, "seconds": seconds}
+                    logger.info(f"Tarea {name} completada en {seconds:.3f} s")
+                except Exception as e:
+                    outcome[name] = {"status": "failed", "result": None, "error": e, "seconds": 0.0}
+                    logger.error(f"Error {name.upper()}: {e}", exc_info=e)
+
+    return outcome
+
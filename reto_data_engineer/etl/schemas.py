@@ -0,0 +1,313 @@
+import os
+import pandas as pd
+
+from reto_data_engineer.etl.dates import parse_dates, record_failures, DATETIME_DTYPE, MAX_FAILURE_SAMPLES
+
+# ==============================
+# ESQUEMAS POR ARCHIVO ORIGEN
+#
+# dtypes: tipo explícito por columna (nullable: string / Int64 /
+#         Float64 / boolean) para no depender de la inferencia de pandas
+# dates:  columnas que se convierten a datetime UTC al extraer
+#         (etl/dates.py: formatos mezclados ISO / dd/mm/yyyy)
+# Columnas declaradas que no vengan en el archivo (o en un chunk) se
+# crean vacías, así todos los chunks de un mismo origen tienen la misma forma.
+# ==============================
+
+SCHEMAS = {
+    "customers_master.json": {
+        "dtypes": {
+            "customer_id": "string", "name": "string", "email": "string",
+            "phone": "string", "gender": "string", "preferred_language": "string",
+        },
+        "dates": ["registration_date", "birth_date"],
+    },
+    "customer_reviews_jan.json": {
+        "dtypes": {
+            "review_id": "string", "product_id": "string", "customer_id": "string",
+            "transaction_id": "string", "rating": "Float64", "title": "string",
+            "comment": "string", "verified_purchase": "boolean",
+            "helpful_votes": "Int64", "unhelpful_votes": "Int64",
+        },
+        "dates": ["review_date"],
+    },
+    "competitor_pricing.json": {
+        "dtypes": {
+            "snapshot_id": "string", "our_product_id": "string", "our_price": "Float64",
+            "competitor": "string", "competitor_price": "Float64", "competitor_url": "string",
+            "in_stock": "boolean", "rating": "Float64", "num_reviews": "Int64",
+        },
+        "dates": ["snapshot_date"],
+    },
+    "customer_support_tickets.json": {
+        "dtypes": {
+            "ticket_id": "string", "customer_id": "string", "transaction_id": "string",
+            "subject": "string", "description": "string", "priority": "string",
+            "status": "string", "category": "string", "assigned_to": "string",
+            "resolution": "string",
+        },
+        "dates": ["created_at", "updated_at", "resolved_at"],
+    },
+    "email_marketing_sends.json": {
+        "dtypes": {
+            "send_id": "string", "campaign_id": "string", "customer_id": "string",
+            "email": "string", "opened": "boolean", "clicked": "boolean",
+            "converted": "boolean", "bounced": "boolean", "unsubscribed": "boolean",
+            "bounce_reason": "string",
+        },
+        "dates": ["sent_date", "open_date", "click_date", "conversion_date"],
+    },
+    "inventory_adjustments_jan.json": {
+        "dtypes": {
+            "adjustment_id": "string", "product_id": "string", "type": "string",
+            "quantity_change": "Int64", "previous_stock": "Int64", "new_stock": "Int64",
+            "reason": "string", "warehouse": "string", "user": "string",
+        },
+        "dates": ["date"],
+    },
+    "marketing_campaigns_q1.json": {
+        "dtypes": {
+            "campaign_id": "string", "name": "string", "channel": "string",
+            "budget": "Float64", "impressions": "Int64", "clicks": "Int64",
+            "conversions": "Int64", "revenue_generated": "Float64",
+        },
+        "dates": ["start_date", "end_date"],
+    },
+    "payment_transactions.json": {
+        "dtypes": {
+            "payment_id": "string", "transaction_id": "string", "payment_method": "string",
+            "amount": "Float64", "currency": "string", "status": "string",
+            "gateway": "string", "card_last4": "string", "card_brand": "string",
+            "fees": "Float64", "paypal_email": "string", "bank_name": "string",
+        },
+        "dates": ["payment_date", "refund_date"],
+    },
+}
+
+# ------------------------------
+# data/csv: se leen como texto y se tipan aquí (booleanos Yes/No/Y/N/1/0/TRUE)
+# ------------------------------
+SCHEMAS.update({
+    "countries_reference.csv": {
+        "dtypes": {
+            "country_code": "string", "country_name": "string", "currency_code": "string",
+            "tax_rate": "Float64", "shipping_zone": "string", "language": "string",
+            "active": "boolean",
+        },
+        "dates": [],
+    },
+    "currency_exchange_rates.csv": {
+        "dtypes": {
+            "from_currency": "string", "to_currency": "string",
+            "exchange_rate": "Float64", "source": "string",
+        },
+        "dates": ["date"],
+    },
+    "customer_segments.csv": {
+        "dtypes": {
+            "customer_id": "string", "segment": "string", "total_lifetime_value": "Float64",
+            "total_orders": "Int64", "avg_order_value": "Float64",
+            "days_since_last_order": "Int64", "churn_risk": "string",
+        },
+        "dates": ["last_order_date"],
+    },
+    "customer_service_metrics.csv": {
+        "dtypes": {
+            "tickets_opened": "Int64", "tickets_closed": "Int64", "tickets_pending": "Int64",
+            "avg_response_time_hours": "Float64", "avg_resolution_time_hours": "Float64",
+            "satisfaction_score": "Float64",
+        },
+        "dates": ["date"],
+    },
+    "customers_legacy.csv": {
+        "dtypes": {
+            "customer_id": "string", "first_name": "string", "last_name": "string",
+            "email": "string", "phone": "string", "country": "string",
+            "vip_status": "boolean",
+        },
+        "dates": ["registration_date"],
+    },
+    "discount_codes.csv": {
+        "dtypes": {
+            "code": "string", "discount_type": "string", "discount_value": "Float64",
+            "min_purchase": "Float64", "max_discount": "Float64",
+            "usage_limit": "Int64", "times_used": "Int64", "active": "boolean",
+        },
+        "dates": ["start_date", "end_date"],
+    },
+    "employee_sales.csv": {
+        "dtypes": {
+            "employee_id": "string", "employee_name": "string", "role": "string",
+            "region": "string", "sales_q1_2024": "Float64", "commission_earned": "Float64",
+            "active": "boolean",
+        },
+        "dates": ["hire_date"],
+    },
+    "inventory_valuation.csv": {
+        "dtypes": {
+            "product_id": "string", "current_stock": "Int64", "unit_cost": "Float64",
+            "unit_price": "Float64", "total_cost": "Float64", "total_retail_value": "Float64",
+            "margin_percentage": "Float64", "turnover_rate": "Float64", "days_of_supply": "Float64",
+        },
+        "dates": [],
+    },
+    "marketing_budget.csv": {
+        "dtypes": {
+            "month": "string", "year": "Int64", "channel": "string",
+            "allocated_budget": "Float64", "spent_budget": "Float64",
+            "target_conversions": "Int64", "actual_conversions": "Int64",
+            "target_roi": "Float64", "actual_roi": "Float64",
+        },
+        "dates": [],
+    },
+    "payment_methods_summary.csv": {
+        "dtypes": {
+            "month": "string", "year": "Int64", "payment_method": "string",
+            "transaction_count": "Int64", "total_amount": "Float64", "avg_transaction": "Float64",
+            "success_rate": "Float64", "chargeback_count": "Int64",
+        },
+        "dates": [],
+    },
+    "product_categories.csv": {
+        "dtypes": {
+            "category_id": "string", "category_name": "string", "parent_category": "string",
+            "description": "string", "active": "boolean", "commission_rate": "Float64",
+        },
+        "dates": [],
+    },
+    "product_views.csv": {
+        "dtypes": {
+            "product_id": "string", "views": "Int64", "unique_visitors": "Int64",
+            "add_to_cart": "Int64", "purchases": "Int64", "conversion_rate": "Float64",
+        },
+        "dates": ["date"],
+    },
+    "products_stock_daily_jan.csv": {
+        "dtypes": {
+            "product_id": "string", "warehouse": "string", "opening_stock": "Int64",
+            "sales": "Int64", "returns": "Int64", "adjustments": "Int64", "closing_stock": "Int64",
+        },
+        "dates": ["date"],
+    },
+    "sales_summary_daily.csv": {
+        "dtypes": {
+            "total_transactions": "Int64", "total_revenue": "Float64", "total_items_sold": "Int64",
+            "unique_customers": "Int64", "avg_order_value": "Float64",
+        },
+        "dates": ["date"],
+    },
+    "shipping_carriers.csv": {
+        "dtypes": {
+            "carrier_id": "string", "carrier_name": "string", "country": "string",
+            "domestic_rate": "Float64", "international_rate": "Float64",
+            "avg_delivery_days_domestic": "Float64", "avg_delivery_days_intl": "Float64",
+            "tracking_available": "boolean", "insurance_available": "boolean",
+        },
+        "dates": [],
+    },
+    "shipping_zones.csv": {
+        "dtypes": {
+            "zone_id": "string", "zone_name": "string", "countries": "string",
+            "base_cost": "Float64", "cost_per_kg": "Float64",
+            "estimated_days_min": "Int64", "estimated_days_max": "Int64", "active": "boolean",
+        },
+        "dates": [],
+    },
+    "social_media_engagement.csv": {
+        "dtypes": {
+            "platform": "string", "followers": "Int64", "posts": "Int64", "likes": "Int64",
+            "comments": "Int64", "shares": "Int64", "clicks": "Int64", "engagement_rate": "Float64",
+        },
+        "dates": ["date"],
+    },
+    "supplier_orders.csv": {
+        "dtypes": {
+            "order_id": "string", "supplier_id": "string", "total_amount": "Float64",
+            "status": "string", "products_count": "Int64",
+        },
+        "dates": ["order_date", "expected_delivery", "actual_delivery"],
+    },
+    "website_sessions.csv": {
+        "dtypes": {
+            "sessions": "Int64", "unique_visitors": "Int64", "page_views": "Int64",
+            "bounce_rate": "Float64", "avg_session_duration": "Float64",
+            "conversions": "Int64", "conversion_rate": "Float64",
+        },
+        "dates": ["date"],
+    },
+})
+
+# los archivos mensuales comparten esquema
+SCHEMAS["customer_reviews_feb.json"] = SCHEMAS["customer_reviews_jan.json"]
+SCHEMAS["inventory_adjustments_feb.json"] = SCHEMAS["inventory_adjustments_jan.json"]
+SCHEMAS["products_stock_daily_feb.csv"] = SCHEMAS["products_stock_daily_jan.csv"]
+
+# texto -> booleano para columnas "boolean" que no vienen como bool nativo
+BOOL_VALUES = {
+    "yes": True, "y": True, "true": True, "t": True, "1": True, "si": True, "sí": True,
+    "no": False, "n": False, "false": False, "f": False, "0": False,
+}
+
+
+def get_schema(filename: str) -> dict:
+    # la variante NDJSON / JSON Lines de un origen usa el mismo esquema
+    filename = os.path.basename(filename)
+    stem, ext = os.path.splitext(filename)
+    if ext in (".ndjson", ".jsonl"):
+        filename = stem + ".json"
+    return SCHEMAS.get(filename, {"dtypes": {}, "dates": []})
+
+
+def parse_bools(s: pd.Series) -> pd.Series:
+    """Yes/No, Y/N, 1/0, TRUE/FALSE (sin distinguir mayúsculas); lo demás queda NA."""
+    if pd.api.types.is_bool_dtype(s):
+        return s.astype("boolean")
+    return s.astype("string").str.strip().str.lower().map(BOOL_VALUES).astype("boolean")
+
+
+def parse_integers(values: pd.Series, name: str = None) -> pd.Series:
+    """
+    Texto / números -> Int64. Valores no numéricos o con decimales (2.5)
+    quedan NA en vez de abortar el cast, y con `name` se informan como
+    los fallos de fecha (tipo "integer").
+    """
+    num = pd.to_numeric(values, errors="coerce")
+    # inf % 1 es NaN: también queda como fraccional
+    fractional = num.notna() & (num % 1 != 0)
+    if name is not None:
+        text = values.astype("string").str.strip()
+        present = text.notna() & text.ne("")
+        failed = present & (num.isna() | fractional)
+        record_failures(
+            name, total=int(present.sum()), failed=int(failed.sum()),
+            samples=text[failed].head(MAX_FAILURE_SAMPLES).tolist(), kind="integer",
+        )
+    if pd.api.types.is_float_dtype(num):
+        num = num.mask(fractional)
+    return num.astype("Int64")
+
+
+def apply_schema(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+    """Aplica dtypes y fechas declaradas; archivos sin esquema se devuelven igual."""
+    schema = get_schema(filename)
+    source = os.path.basename(filename)
+
+    for col, dtype in schema["dtypes"].items():
+        if col not in df.columns:
+            df[col] = pd.Series(pd.NA, index=df.index, dtype=dtype)
+        elif dtype == "Int64":
+            df[col] = parse_integers(df[col], name=f"{source}:{col}")
+        elif dtype == "Float64":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+        elif dtype == "boolean":
+            df[col] = parse_bools(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+
+    for col in schema["dates"]:
+        if col not in df.columns:
+            df[col] = pd.Series(pd.NaT, index=df.index, dtype=DATETIME_DTYPE)
+        else:
+            df[col] = parse_dates(df[col], name=f"{source}:{col}")
+
+    return df
@@ -0,0 +1,152 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from reto_data_engineer.etl.load import get_connection, POOL_SIZE
+
+# Modos de transacción soportados por LoadSession:
+#   per_table -> cada tabla confirma por separado (comportamiento clásico)
+#   single    -> todas las tablas en una única transacción (todo o nada)
+#   savepoint -> una transacción con SAVEPOINT por tabla: la tabla que
+#                falla se revierte y el resto se confirma al final
+TRANSACTION_MODES = ("per_table", "single", "savepoint")
+
+
+# =======================================================
+#  POOL DE CONEXIONES
+# =======================================================
+class ConnectionPool:
+    """
+    Pool mínimo de conexiones pg8000. Las conexiones se crean bajo
+    demanda hasta max_size y se reutilizan entre tablas; una conexión
+    nunca se comparte entre dos hilos a la vez.
+    """
+
+    def __init__(self, max_size: int = POOL_SIZE):
+        self.max_size = max_size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return get_connection()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        return self._idle.get()
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except Exception:
+                pass
+        with self._lock:
+            self._created = 0
+
+
+# =======================================================
+#  SESIÓN DE CARGA
+# =======================================================
+class LoadSession:
+    """
+    Ejecuta la fase LOAD sobre conexiones reutilizadas del pool.
+
+    Uso:
+        with LoadSession(mode="single") as session:
+            with session.table("orders") as conn:
+                load_orders(df, customer_map, conn=conn)
+    """
+
+    def __init__(self, pool: ConnectionPool = None, mode: str = "per_table"):
+        if mode not in TRANSACTION_MODES:
+            raise ValueError(f"Modo de transacción no soportado: {mode}")
+        self.pool = pool or ConnectionPool()
+        self._owns_pool = pool is None
+        self.mode = mode
+        self.conn = None
+        self.failed = []
+
+    @property
+    def aborted(self) -> bool:
+        """En modo single, cualquier fallo invalida el resto de la carga."""
+        return self.mode == "single" and bool(self.failed)
+
+    def __enter__(self):
+        if self.mode != "per_table":
+            self.conn = self.pool.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.conn is not None:
+                if exc_type is None and not self.aborted:
+                    self.conn.commit()
+                else:
+                    self.conn.rollback()
+                self.pool.release(self.conn)
+                self.conn = None
+        finally:
+            if self._owns_pool:
+                self.pool.close_all()
+        return False
+
+    @contextmanager
+    def table(self, name: str):
+        """Entrega la conexión a usar para cargar una tabla."""
+        if self.aborted:
+            raise RuntimeError(
+                f"Carga de '{name}' omitida: la transacción única ya falló en {self.failed}"
+            )
+
+        if self.mode == "per_table":
+            conn = self.pool.acquire()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                self.failed.append(name)
+                raise
+            finally:
+                self.pool.release(conn)
+            return
+
+        if self.mode == "single":
+            try:
+                yield self.conn
+            except Exception:
+                self.failed.append(name)
+                raise
+            return
+
+        # savepoint
+        cur = self.conn.cursor()
+        savepoint = f"sp_{name}"
+        cur.execute(f"SAVEPOINT {savepoint}")
+        try:
+            yield self.conn
+            cur.execute(f"RELEASE SAVEPOINT {savepoint}")
+        except Exception:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+            self.failed.append(name)
+            raise
+        finally:
+            cur.close()
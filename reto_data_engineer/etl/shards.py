@@ -0,0 +1,311 @@
+import json
+import os
+import socket
+import time
+
+from reto_data_engineer.etl.extract import iter_dataset_chunks, DEFAULT_CHUNK_SIZE
+from reto_data_engineer.etl.load import connection_scope
+from reto_data_engineer.etl.stream import SOURCE_FILES, CHUNK_TRANSFORMS, orders_context
+from reto_data_engineer.utils.logger import timer, count
+
+# =======================================================
+#  EJECUCIÓN POR SHARDS (varios procesos / hosts, una BD)
+#
+#  El coordinador parte la carga en unidades de trabajo: una por
+#  (tabla, archivo origen, rango de chunks) en la tabla de control
+#  etl_work_units (sql/ddl.sql, sección 8c). Los exports por mes /
+#  región ya vienen en archivos separados (reviews_jan / _feb...); con
+#  parts > 1 cada archivo se reparte además en rangos: la unidad `part`
+#  toma los chunks i con i % parts == part (pero lee y parsea el archivo
+#  completo: se reparte la transformación y la carga, no la lectura).
+#
+#  Cada worker:
+#   1. reclama una unidad con SELECT ... FOR UPDATE SKIP LOCKED (dos
+#      workers nunca toman la misma) y la marca 'running'
+#   2. en una transacción propia bloquea la fila de la unidad, extrae,
+#      transforma y carga vía COPY (bulk_load.py) chunk a chunk, y la
+#      marca 'done' antes del commit: o queda cargada y 'done', o nada
+#   3. si falla, la unidad vuelve a 'pending' (hasta MAX_ATTEMPTS) o
+#      queda 'failed' con el error
+#
+#  Una unidad 'running' cuya fila ya no está bloqueada es de un worker
+#  que murió: pasados STALE_SECONDS cualquier otro la vuelve a tomar
+#  (los upserts son idempotentes).
+#
+#  Particiones: el coordinador crea al planificar (transacción propia,
+#  confirmada, ver create_source_partitions en stream.py) los meses de
+#  todos los archivos de las tablas particionadas. Si cada worker creara los suyos, el CREATE ... PARTITION
+#  OF esperaría el lock de la tabla padre que retienen las transacciones
+#  de unidad abiertas de los demás workers (y estos, a su vez, el del
+#  primero): los workers quedarían en fila o en un deadlock que la BD no
+#  ve, porque cada worker espera en otra conexión. Con los meses ya
+#  creados, ensure_partitions en el worker sólo relee pg_inherits.
+#
+#  Dimensión customers: las unidades de tablas con depends_on (orders,
+#  reviews, support_tickets, marketing_sends) no se reclaman hasta que
+#  todas las de customers del lote están 'done'. customers se carga
+#  siempre en una sola unidad (transform_customers deduplica el archivo
+#  completo) y cada worker que procesa orders arma una vez el índice de
+#  identidad (orders_context).
+# =======================================================
+
+# reintentos de una unidad antes de quedar 'failed'
+MAX_ATTEMPTS = 3
+
+# gracia entre el claim y el bloqueo de la fila por el worker
+STALE_SECONDS = 60
+
+# espera entre intentos cuando sólo quedan unidades en curso de otros workers
+POLL_SECONDS = 2.0
+
+# datasets que se transforman con el archivo completo (una unidad)
+WHOLE_FILE_KEYS = {"customers"}
+WHOLE_FILE_CHUNK = 10 ** 9
+
+PLAN_SQL = """
+    INSERT INTO etl_work_units (batch_id, table_name, source, part, parts, depends_on)
+    SELECT %s, u.table_name, u.source, u.part, u.parts,
+           ARRAY(SELECT json_array_elements_text(u.depends_on))
+    FROM json_to_recordset(%s::json)
+         AS u(table_name TEXT, source TEXT, part INT, parts INT, depends_on JSON)
+    ON CONFLICT (batch_id, table_name, source, part) DO NOTHING
+"""
+
+CLAIM_SQL = """
+    WITH next AS (
+        SELECT u.unit_id
+        FROM etl_work_units u
+        WHERE u.batch_id = %s
+          AND (u.status = 'pending'
+               OR (u.status = 'running' AND u.claimed_at < NOW() - make_interval(secs => %s)))
+          AND NOT EXISTS (
+              SELECT 1 FROM etl_work_units d
+              WHERE d.batch_id = u.batch_id
+                AND d.table_name = ANY(u.depends_on)
+                AND d.status <> 'done'
+          )
+        ORDER BY u.unit_id
+        LIMIT 1
+        FOR UPDATE OF u SKIP LOCKED
+    )
+    UPDATE etl_work_units w
+    SET status = 'running', worker = %s, attempts = w.attempts + 1,
+        claimed_at = NOW(), finished_at = NULL, error = NULL
+    FROM next
+    WHERE w.unit_id = next.unit_id
+    RETURNING w.unit_id, w.table_name, w.source, w.part, w.parts, w.attempts
+"""
+
+LOCK_SQL = """
+    SELECT unit_id FROM etl_work_units
+    WHERE unit_id = %s AND worker = %s AND status = 'running'
+    FOR UPDATE
+"""
+
+DONE_SQL = """
+    UPDATE etl_work_units
+    SET status = 'done', rows_read = %s, rows_inserted = %s, rows_skipped = %s, rows_rejected = %s,
+        finished_at = NOW()
+    WHERE unit_id = %s
+"""
+
+FAIL_SQL = """
+    UPDATE etl_work_units
+    SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+        error = %s, finished_at = NOW()
+    WHERE unit_id = %s AND worker = %s
+"""
+
+RUNNING_SQL = """
+    SELECT COUNT(*) FROM etl_work_units
+    WHERE batch_id = %s AND status = 'running'
+"""
+
+STATUS_SQL = """
+    SELECT table_name, status, COUNT(*), COALESCE(SUM(rows_read), 0), COALESCE(SUM(rows_inserted), 0),
+           COALESCE(SUM(rows_skipped), 0), COALESCE(SUM(rows_rejected), 0),
+           MAX(array_to_string(depends_on, ','))
+    FROM etl_work_units
+    WHERE batch_id = %s
+    GROUP BY table_name, status
+"""
+
+_orders = {}  # chunk_size -> (índice, tasas), una vez por proceso
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def plan_units(tables: dict, dependencies: dict, batch_id: str, parts: int = 1, conn=None) -> int:
+    """
+    Registra las unidades del lote batch_id. tables: tabla -> clave de
+    SOURCE_FILES; dependencies: tabla -> tablas que la preceden. Un lote
+    ya planificado no se duplica. Devuelve la cantidad de unidades.
+    """
+    units = [
+        {
+            "table_name": table, "source": source, "part": part,
+            "parts": 1 if data_key in WHOLE_FILE_KEYS else parts,
+            "depends_on": [d for d in dependencies.get(table, ()) if d in tables],
+        }
+        for table, data_key in tables.items()
+        for source in SOURCE_FILES[data_key][0]
+        for part in range(1 if data_key in WHOLE_FILE_KEYS else parts)
+    ]
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(PLAN_SQL, (batch_id, json.dumps(units)))
+        cur.close()
+    count("shard_units_planned", len(units))
+    return len(units)
+
+
+def claim_unit(batch_id: str, worker: str, conn=None):
+    """Reclama la próxima unidad disponible del lote (dict) o None."""
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(CLAIM_SQL, (batch_id, STALE_SECONDS, worker))
+        row = cur.fetchone()
+        cur.close()
+    if not row:
+        return None
+    keys = ("unit_id", "table", "source", "part", "parts", "attempts")
+    return dict(zip(keys, row))
+
+
+def _transform(data_key: str, chunk_size: int):
+    if data_key != "orders":
+        return CHUNK_TRANSFORMS[data_key]
+    if chunk_size not in _orders:
+        _orders[chunk_size] = orders_context(chunk_size)
+    index, rates = _orders[chunk_size]
+    return lambda chunk: CHUNK_TRANSFORMS["orders"](chunk, index, rates)
+
+
+def process_unit(unit: dict, worker: str, loaders: dict, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 before_load=None) -> tuple:
+    """
+    Extrae, transforma y carga una unidad en una sola transacción que
+    también la marca 'done'. loaders: tabla -> (clave de SOURCE_FILES,
+    loader bulk). Devuelve (filas, {inserted, skipped, rejected}).
+    """
+    table = unit["table"]
+    data_key, loader = loaders[table]
+    transform = _transform(data_key, chunk_size)
+    size = WHOLE_FILE_CHUNK if data_key in WHOLE_FILE_KEYS else chunk_size
+
+    rows, stats = 0, {"inserted": 0, "skipped": 0, "rejected": 0}
+    with connection_scope() as conn:
+        cur = conn.cursor()
+        # la fila queda bloqueada hasta el commit: nadie la reclama mientras tanto
+        cur.execute(LOCK_SQL, (unit["unit_id"], worker))
+        if not cur.fetchall():
+            raise RuntimeError(f"la unidad {unit['unit_id']} fue reasignada a otro worker")
+
+        for chunk in iter_dataset_chunks(unit["source"], size, unit["part"], unit["parts"]):
+            count("rows_read", len(chunk), dataset=unit["source"])
+            with timer("transform_dataset", dataset=data_key):
+                out = transform(chunk)
+            count("rows_transformed", len(out), dataset=data_key)
+            if out.empty:
+                continue
+            if before_load is not None:
+                before_load(table, out)
+            result = loader(out, conn=conn)
+            rows += len(out)
+            if table == "customers":
+                # el loader de customers devuelve el mapa de los upserts
+                stats["inserted"] += len(result or {})
+                continue
+            for k in stats:
+                stats[k] += (result or {}).get(k, 0)
+
+        cur.execute(DONE_SQL, (rows, stats["inserted"], stats["skipped"], stats["rejected"], unit["unit_id"]))
+        cur.close()
+    return rows, stats
+
+
+def fail_unit(unit: dict, worker: str, error: str, conn=None):
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(FAIL_SQL, (MAX_ATTEMPTS, error[:2000], unit["unit_id"], worker))
+        cur.close()
+
+
+def _running(batch_id: str, conn=None) -> int:
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(RUNNING_SQL, (batch_id,))
+        n = cur.fetchone()[0]
+        cur.close()
+    return n
+
+
+def run_worker(batch_id: str, loaders: dict, chunk_size: int = DEFAULT_CHUNK_SIZE, before_load=None,
+               after_unit=None, worker: str = None, max_units: int = None,
+               poll_seconds: float = POLL_SECONDS) -> dict:
+    """
+    Procesa unidades del lote hasta que no quede ninguna reclamable ni
+    en curso en otros workers. after_unit(unit) corre tras cada unidad
+    (confirmada o no). Devuelve tabla -> {units, rows, inserted, skipped, rejected, failed}.
+    """
+    worker = worker or worker_id()
+    stats = {}
+    processed = 0
+    while max_units is None or processed < max_units:
+        unit = claim_unit(batch_id, worker)
+        if unit is None:
+            # las que siguen 'pending' esperan a unidades de otros workers
+            # (o a una dependencia que falló: ver batch_status)
+            if not _running(batch_id):
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        entry = stats.setdefault(unit["table"], {
+            "units": 0, "rows": 0, "inserted": 0, "skipped": 0, "rejected": 0, "failed": 0,
+        })
+        try:
+            with timer("shard_unit", table=unit["table"]) as t:
+                rows, counts = process_unit(unit, worker, loaders, chunk_size, before_load)
+            entry["units"] += 1
+            entry["rows"] += rows
+            for k, v in counts.items():
+                entry[k] += v
+            count("shard_units_done", table=unit["table"])
+            print(f"SHARDS: {unit['table']} {unit['source']} [{unit['part'] + 1}/{unit['parts']}] "
+                  f"→ {rows} filas en {t.seconds:.3f} s")
+        except Exception as e:
+            entry["failed"] += 1
+            count("shard_units_failed", table=unit["table"])
+            print(f"SHARDS: falló la unidad {unit['unit_id']} ({unit['table']} {unit['source']}, "
+                  f"intento {unit['attempts']}/{MAX_ATTEMPTS}): {e}")
+            fail_unit(unit, worker, str(e))
+        finally:
+            if after_unit is not None:
+                after_unit(unit)
+        processed += 1
+    return stats
+
+
+def batch_status(batch_id: str, conn=None) -> dict:
+    """
+    tabla -> {"depends_on": [...], "status": {estado -> {units, rows, inserted, skipped, rejected}}}
+    para las unidades del lote.
+    """
+    with connection_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(STATUS_SQL, (batch_id,))
+        rows = cur.fetchall()
+        cur.close()
+
+    out = {}
+    for table, status, units, read, inserted, skipped, rejected, depends_on in rows:
+        entry = out.setdefault(table, {"depends_on": [], "status": {}})
+        entry["status"][status] = {
+            "units": units, "rows": int(read), "inserted": int(inserted),
+            "skipped": int(skipped), "rejected": int(rejected),
+        }
+        entry["depends_on"] = [d for d in (depends_on or "").split(",") if d]
+    return out
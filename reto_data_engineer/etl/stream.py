@@ -0,0 +1,163 @@
+from functools import partial
+import pandas as pd
+from reto_data_engineer.etl.extract import (
+    load_json, iter_json_chunks, iter_dataset_chunks, DATASET_FILES, DEFAULT_CHUNK_SIZE
+)
+from reto_data_engineer.etl.csv_tables import CSV_TABLES
+from reto_data_engineer.etl.identity import build_customer_index
+from reto_data_engineer.utils.logger import timer, count
+from reto_data_engineer.etl.currency import load_rate_table
+from reto_data_engineer.etl.dates import parse_dates
+from reto_data_engineer.etl.partitions import PARTITIONED_TABLES, split_by_partition, ensure_partitions
+from reto_data_engineer.etl.transform import (
+    transform_customers, transform_orders, transform_reviews, transform_competitor,
+    transform_inventory, transform_support, transform_email_sends, transform_campaigns,
+    transform_csv_table
+)
+
+# ==============================
+# PIPELINE STREAMING
+#
+# Cada fuente devuelve un generador de DataFrames ya transformados,
+# con las mismas claves que transform_all. Sólo customers (dimensión)
+# se materializa completo, junto con el índice de identidad y la tabla
+# de tasas de cambio que usa transform_orders (de reviews / tickets sólo
+# se guardan las columnas transaction_id + customer_id).
+# ==============================
+
+# clave transform_all -> (archivos origen, columna fecha para carga incremental)
+SOURCE_FILES = {
+    "customers": (["customers_master.json"], None),
+    "orders": (["payment_transactions.json"], "order_date"),
+    "reviews": (["customer_reviews_jan.json", "customer_reviews_feb.json"], "review_date"),
+    "competitor_pricing": (["competitor_pricing.json"], None),
+    "inventory_adjustments": (["inventory_adjustments_jan.json", "inventory_adjustments_feb.json"], "adjustment_date"),
+    "support_tickets": (["customer_support_tickets.json"], None),
+    "email_sends": (["email_marketing_sends.json"], "sent_date"),
+    "campaigns": (["marketing_campaigns_q1.json"], None),
+}
+# tablas de data/csv: dimensiones / agregados diarios que se upsertean
+# completos, sin filtro por fecha
+SOURCE_FILES.update({
+    table: ([DATASET_FILES[src] for src in spec["sources"]], None)
+    for table, spec in CSV_TABLES.items()
+})
+
+
+# tabla particionada -> columna de partición en el archivo crudo (ya
+# tipada por el esquema, antes de transformar)
+RAW_PARTITION_COLUMNS = {
+    "orders": "payment_date",
+    "marketing_sends": "sent_date",
+    "inventory_adjustments": "date",
+}
+
+# clave -> transformación de un chunk crudo (orders recibe además el
+# índice de identidad y las tasas de orders_context)
+CHUNK_TRANSFORMS = {
+    "customers": transform_customers,
+    "orders": transform_orders,
+    "reviews": transform_reviews,
+    "competitor_pricing": transform_competitor,
+    "inventory_adjustments": transform_inventory,
+    "support_tickets": transform_support,
+    "email_sends": transform_email_sends,
+    "campaigns": transform_campaigns,
+    **{table: partial(transform_csv_table, table) for table in CSV_TABLES},
+}
+
+
+def orders_context(chunk_size: int = DEFAULT_CHUNK_SIZE, customers_raw=None) -> tuple:
+    """
+    (índice de identidad, tabla de tasas) que transform_orders necesita
+    para cada chunk. De reviews / tickets sólo se leen transaction_id +
+    customer_id.
+    """
+    if customers_raw is None:
+        customers_raw = load_json("customers_master.json")
+    linked = [
+        chunk[["transaction_id", "customer_id"]]
+        for f in SOURCE_FILES["reviews"][0] + SOURCE_FILES["support_tickets"][0]
+        for chunk in iter_json_chunks(f, chunk_size)
+    ]
+    return build_customer_index(customers_raw, linked), load_rate_table()
+
+
+def create_source_partitions(tables: dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list:
+    """
+    Crea, antes de la carga, los meses de las tablas particionadas de
+    tables (tabla -> clave de SOURCE_FILES) leyendo sólo la columna de
+    fecha de sus archivos: en streaming los chunks llegan durante la
+    carga y la transacción de la tabla no puede esperar a un CREATE ...
+    PARTITION OF (ver etl/partitions.py). Los meses de filas que la
+    transformación descarta quedan como particiones vacías. Devuelve las
+    particiones creadas.
+    """
+    created = []
+    for table, data_key in tables.items():
+        if table not in PARTITIONED_TABLES:
+            continue
+        raw, col = RAW_PARTITION_COLUMNS[table], PARTITIONED_TABLES[table]
+        months = set()
+        for f in SOURCE_FILES[data_key][0]:
+            for chunk in iter_dataset_chunks(f, chunk_size):
+                # sin name: la lectura previa no suma al reporte de fechas
+                dates = pd.DataFrame({col: parse_dates(chunk[raw])})
+                months.update(month for _, month, _ in split_by_partition(table, dates) if month is not None)
+        created += ensure_partitions(table, sorted(months))
+    return created
+
+
+def stream_sources(chunk_size: int = DEFAULT_CHUNK_SIZE, tracker=None, keys=None) -> dict:
+    """
+    Devuelve clave -> callable sin argumentos que genera los chunks
+    transformados de ese dataset. La memoria pico queda acotada por
+    chunk_size y no por el tamaño de los archivos.
+
+    Con un tracker (etl/watermark.py) se omiten los archivos sin cambios
+    y se descartan los registros ya cargados según la marca de agua.
+    keys limita las fuentes (None = todas): customers, el índice de
+    identidad y las tasas sólo se leen si customers u orders están entre ellas.
+    """
+    keys = list(SOURCE_FILES) if keys is None else list(keys)
+
+    customers_raw = customers_df = None
+    if "customers" in keys or "orders" in keys:
+        customers_raw = load_json("customers_master.json")
+    if "customers" in keys:
+        customers_df = transform_customers(customers_raw)
+
+    index = rates = None
+    if "orders" in keys:
+        index, rates = orders_context(chunk_size, customers_raw)
+
+    def transformed(key, fn, *extra):
+        files, date_col = SOURCE_FILES[key]
+
+        def gen():
+            for f in files:
+                if tracker is not None and not tracker.should_read(f):
+                    continue
+                for chunk in iter_dataset_chunks(f, chunk_size):
+                    count("rows_read", len(chunk), dataset=f)
+                    with timer("transform_dataset", dataset=key):
+                        out = fn(chunk, *extra)
+                    if tracker is not None:
+                        out = tracker.filter_new(f, out, date_col)
+                    count("rows_transformed", len(out), dataset=key)
+                    if not out.empty:
+                        yield out
+        return gen
+
+    def customers():
+        if tracker is None or tracker.should_read("customers_master.json"):
+            yield customers_df
+
+    def source(key):
+        if key == "customers":
+            return customers
+        if key == "orders":
+            return transformed(key, transform_orders, index, rates)
+        return transformed(key, CHUNK_TRANSFORMS[key])
+
+    return {key: source(key) for key in keys}
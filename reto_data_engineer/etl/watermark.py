@@ -0,0 +1,205 @@
+import hashlib
+import os
+import threading
+import pandas as pd
+
+from reto_data_engineer.etl.extract import source_path
+from reto_data_engineer.etl.load import connection_scope
+
+# =======================================================
+#  MARCAS DE AGUA PARA CARGA INCREMENTAL
+#
+#  Tabla de control etl_watermarks (ver sql/ddl.sql): por archivo
+#  origen guarda mtime, tamaño, hash SHA-256 y la fecha máxima cargada
+#  (payment_date / review_date / sent_date / adjustment_date).
+#
+#  Sólo se releen los archivos que cambiaron, y de ellos las filas con
+#  fecha >= marca - WATERMARK_LOOKBACK: la ventana recoge registros
+#  tardíos o corregidos con fecha anterior a la marca, y los repetidos
+#  (incluidos los de la misma fecha que la marca) los descarta el ON
+#  CONFLICT de la carga. Para reprocesar archivos completos: --full-refresh.
+#
+#  La marca no avanza más allá de filas que la carga descartó (sin
+#  cliente) o que la BD rechazó: queda en la fecha más vieja de esas
+#  filas (hold_back) y el archivo se marca como cambiado, así la próxima
+#  corrida lo relee desde ahí. Los rechazos de TRANSFORM (reglas de
+#  calidad) no la frenan: dependen sólo del contenido del archivo.
+#
+#  La retención tiene límite: un cliente que nunca llega fijaría la
+#  marca para siempre y obligaría a releer el archivo en cada corrida.
+#  Tras MAX_HOLD_RUNS corridas retenida, o HOLD_BACK_MAX_AGE desde la
+#  primera, la marca se libera: esas filas quedan sólo en etl_rejects
+#  (donde ya se registraron) y se guarda la huella del archivo.
+# =======================================================
+
+# ventana de relectura hacia atrás desde la marca de agua
+WATERMARK_LOOKBACK = pd.Timedelta(days=7)
+
+# límite de la retención por filas no cargadas (lo que ocurra primero)
+MAX_HOLD_RUNS = 5
+HOLD_BACK_MAX_AGE = pd.Timedelta(days=7)
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _to_utc_naive(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo is not None else ts
+
+
+class WatermarkTracker:
+    """
+    Decide qué archivos y registros procesar en una corrida incremental
+    y acumula las nuevas marcas de agua hasta que la carga se confirma.
+    Con full_refresh se procesa todo y sólo se reescriben las marcas.
+    """
+
+    def __init__(self, stored: dict, full_refresh: bool = False, base_path: str = None,
+                 lookback: pd.Timedelta = WATERMARK_LOOKBACK, max_hold_runs: int = MAX_HOLD_RUNS,
+                 max_hold_age: pd.Timedelta = HOLD_BACK_MAX_AGE):
+        self.stored = stored
+        self.full_refresh = full_refresh
+        self.base_path = base_path
+        self.lookback = lookback
+        self.max_hold_runs = max_hold_runs
+        self.max_hold_age = max_hold_age
+        self.pending = {}
+        self.released = set()  # archivos cuya retención venció en esta corrida
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, full_refresh: bool = False, conn=None):
+        with connection_scope(conn) as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT source, file_mtime, file_size, file_hash, max_value, held_runs, held_since
+                FROM etl_watermarks
+            """)
+            stored = {
+                row[0]: {"file_mtime": row[1], "file_size": row[2],
+                         "file_hash": row[3], "max_value": row[4],
+                         "held_runs": row[5], "held_since": row[6]}
+                for row in cur.fetchall()
+            }
+            cur.close()
+        return cls(stored, full_refresh=full_refresh)
+
+    # ---------- nivel archivo ----------
+    def should_read(self, filename: str) -> bool:
+        """False si el archivo no cambió desde la última carga confirmada."""
+        # sin base_path: data/json o data/csv según la extensión
+        path = source_path(filename) if self.base_path is None else os.path.join(self.base_path, filename)
+        st = os.stat(path)
+        prev = self.stored.get(filename, {})
+        state = {"file_mtime": st.st_mtime, "file_size": st.st_size}
+
+        if not self.full_refresh and prev.get("file_mtime") == st.st_mtime and prev.get("file_size") == st.st_size:
+            return False
+
+        # mtime distinto: el hash decide si realmente cambió el contenido
+        state["file_hash"] = file_hash(path)
+        changed = self.full_refresh or state["file_hash"] != prev.get("file_hash")
+
+        with self._lock:
+            entry = self.pending.setdefault(filename, {"max_value": None if changed else prev.get("max_value")})
+            entry.update(state)
+        return changed
+
+    # ---------- nivel registro ----------
+    def filter_new(self, filename: str, df: pd.DataFrame, date_col: str = None) -> pd.DataFrame:
+        """
+        Descarta filas con fecha < marca de agua - lookback y registra la
+        nueva máxima (las demás ya cargadas las descarta el ON CONFLICT).
+        """
+        if date_col is None or df.empty:
+            return df
+
+        prev = None if self.full_refresh else self.stored.get(filename, {}).get("max_value")
+        dates = df[date_col]
+        if prev is not None:
+            cutoff = pd.Timestamp(prev) - self.lookback
+            if getattr(dates.dt, "tz", None) is not None:
+                cutoff = cutoff.tz_localize("UTC")
+            df = df[dates.isna() | (dates >= cutoff)]
+            dates = df[date_col]
+
+        current = dates.max()
+        if pd.notna(current):
+            current = _to_utc_naive(current)
+            with self._lock:
+                entry = self.pending.setdefault(filename, {})
+                if entry.get("max_value") is None or current > pd.Timestamp(entry["max_value"]):
+                    entry["max_value"] = current.to_pydatetime()
+        return df
+
+    def hold_expired(self, filename: str) -> bool:
+        """True si la marca de filename ya estuvo retenida el máximo permitido."""
+        prev = self.stored.get(filename, {})
+        if (prev.get("held_runs") or 0) >= self.max_hold_runs:
+            return True
+        since = prev.get("held_since")
+        return since is not None and pd.Timestamp.now() - pd.Timestamp(since) >= self.max_hold_age
+
+    def hold_back(self, filenames: list, dates: pd.Series):
+        """
+        Filas de filenames que no se cargaron: la marca de agua de esos
+        archivos no pasa de la fecha más vieja de dates, salvo que su
+        retención haya vencido (hold_expired).
+        """
+        oldest = dates.min()
+        if pd.isna(oldest):
+            return
+        oldest = _to_utc_naive(oldest).to_pydatetime()
+        with self._lock:
+            for f in filenames:
+                if not self.full_refresh and self.hold_expired(f):
+                    self.released.add(f)
+                    continue
+                entry = self.pending.setdefault(f, {})
+                if entry.get("hold_back") is None or oldest < entry["hold_back"]:
+                    entry["hold_back"] = oldest
+
+    # ---------- persistencia ----------
+    def commit(self, filenames: list, conn=None):
+        """Persiste las marcas de agua de los archivos cuya carga se confirmó."""
+        rows = []
+        now = pd.Timestamp.now().to_pydatetime()
+        for f, p in self.pending.items():
+            if f not in filenames:
+                continue
+            state = (p.get("file_mtime"), p.get("file_size"), p.get("file_hash"))
+            max_value, hold = p.get("max_value"), p.get("hold_back")
+            held = (0, None)
+            if hold is not None:
+                # sin mtime / hash guardados la próxima corrida lo trata como cambiado
+                state = (None, None, None)
+                max_value = hold if max_value is None else min(max_value, hold)
+                prev = {} if self.full_refresh else self.stored.get(f, {})
+                held = ((prev.get("held_runs") or 0) + 1, prev.get("held_since") or now)
+            rows.append((f, *state, max_value, *held))
+        if not rows:
+            return
+
+        query = """
+            INSERT INTO etl_watermarks (source, file_mtime, file_size, file_hash, max_value,
+                                        held_runs, held_since, updated_at)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,NOW())
+            ON CONFLICT (source) DO UPDATE SET
+                file_mtime = EXCLUDED.file_mtime,
+                file_size = EXCLUDED.file_size,
+                file_hash = EXCLUDED.file_hash,
+                max_value = COALESCE(EXCLUDED.max_value, etl_watermarks.max_value),
+                held_runs = EXCLUDED.held_runs,
+                held_since = EXCLUDED.held_since,
+                updated_at = NOW();
+        """
+        with connection_scope(conn) as conn:
+            cur = conn.cursor()
+            cur.executemany(query, rows)
+            cur.close()
@@ -1,115 +1,719 @@
 import os
 os.environ["PYTHONUTF8"] = "1"
 import time
-from reto_data_engineer.utils.logger import get_logger
-from reto_data_engineer.etl.extract import extract_all
-from reto_data_engineer.etl.transform import transform_all
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from reto_data_engineer.utils.logger import (
+    get_logger, timer, count, sample_memory, reset_metrics,
+    write_run_report, write_prometheus, profiling, PROFILE_MODES
+)
+from reto_data_engineer.etl.extract import extract_all, DEFAULT_CHUNK_SIZE, PARSERS
+from reto_data_engineer.etl.transform import TransformGraph
+from reto_data_engineer.etl.cache import DatasetCache, CACHE_MAX_BYTES
+from reto_data_engineer.etl.dates import date_failure_report, reset_date_failures
+from reto_data_engineer.etl.identity import match_report, reset_match_report, STRATEGIES
+from reto_data_engineer.etl.currency import conversion_report, reset_conversion_report, REPORTING_CURRENCY
+from reto_data_engineer.etl.stream import stream_sources, create_source_partitions, SOURCE_FILES
+from reto_data_engineer.etl.watermark import WatermarkTracker
+from reto_data_engineer.etl.kpi import KpiTracker
+from reto_data_engineer.etl.products import ensure_products
+from reto_data_engineer.etl.compact import compaction_report, reset_compaction_report
+from reto_data_engineer.etl.rejects import (
+    start_run, new_run_id, flush as flush_rejects, reject_report, add_listener as add_reject_listener,
+    SINKS as REJECT_SINKS
+)
+from reto_data_engineer.etl.partitions import (
+    PARTITIONED_TABLES, drop_partitions_before, split_by_partition, ensure_partitions
+)
 from reto_data_engineer.etl.load import (
+    connection_scope,
     load_customers, load_orders, load_reviews, load_competitor_pricing,
-    load_support_tickets, load_marketing_sends, load_campaigns, load_inventory
+    load_support_tickets, load_marketing_sends, load_campaigns, load_inventory,
+    load_csv_table, fetch_customer_map, POOL_SIZE
 )
+from reto_data_engineer.etl.csv_tables import CSV_TABLES
+from reto_data_engineer.etl.session import LoadSession
+from reto_data_engineer.etl.scheduler import run_dag
+from reto_data_engineer.etl.bulk_load import (
+    bulk_load_customers, bulk_load_orders, bulk_load_reviews,
+    bulk_load_competitor_pricing, bulk_load_support_tickets,
+    bulk_load_marketing_sends, bulk_load_campaigns, bulk_load_inventory,
+    bulk_load_csv_table
+)
+from reto_data_engineer.etl.shards import plan_units, run_worker, batch_status
 
 logger = get_logger(__name__)
 
+# Tablas que se cargan vía COPY + staging (etl/bulk_load.py).
+# Las que no estén aquí usan el INSERT fila a fila de etl/load.py.
+BULK_TABLES = {
+    "customers", "orders", "reviews", "competitor_pricing",
+    "support_tickets", "marketing_sends", "campaigns", "inventory_adjustments",
+    *CSV_TABLES
+}
 
-def run_etl():
+# En modo incremental sin --streaming cada archivo se lee en un único chunk
+FULL_FILE_CHUNK = 10 ** 9
 
-    logger.info("===== 🚀 INICIANDO ETL COMPLETO =====")
+# per_table | single | savepoint (ver etl/session.py)
+TRANSACTION_MODE = "per_table"
+
+# ejecución por shards: rangos de chunks en que se parte cada archivo
+# (además de la partición natural por archivo mensual / regional)
+SHARD_PARTS = 1
+
+# reporte JSON, métricas Prometheus y salidas de --profile
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics")
+
+# tabla -> (clave summary, clave del dict transformado, loader fila a fila, loader bulk)
+LOAD_TASKS = {
+    "customers": ("customers", "customers", load_customers, bulk_load_customers),
+    "orders": ("orders", "orders", load_orders, bulk_load_orders),
+    "reviews": ("reviews", "reviews", load_reviews, bulk_load_reviews),
+    "competitor_pricing": ("competitor", "competitor_pricing", load_competitor_pricing, bulk_load_competitor_pricing),
+    "support_tickets": ("support", "support_tickets", load_support_tickets, bulk_load_support_tickets),
+    "marketing_sends": ("marketing", "email_sends", load_marketing_sends, bulk_load_marketing_sends),
+    "campaigns": ("campaigns", "campaigns", load_campaigns, bulk_load_campaigns),
+    "inventory_adjustments": ("inventory", "inventory_adjustments", load_inventory, bulk_load_inventory),
+}
+# tablas de data/csv: sin dependencias, un loader genérico por tabla
+LOAD_TASKS.update({
+    table: (table, table, partial(load_csv_table, table), partial(bulk_load_csv_table, table))
+    for table in CSV_TABLES
+})
+
+# Sólo las tablas que necesitan customer_map esperan a customers;
+# competitor_pricing, campaigns e inventory_adjustments arrancan de inmediato.
+LOAD_DEPENDENCIES = {
+    "orders": ["customers"],
+    "reviews": ["customers"],
+    "support_tickets": ["customers"],
+    "marketing_sends": ["customers"],
+}
+
+
+def select_tables(tables=None) -> tuple:
+    """
+    (tablas de LOAD_TASKS a cargar, dependencias entre ellas). Las
+    dependencias hacia tablas no elegidas se descartan: la tabla usa lo
+    que ya está en la BD.
+    """
+    unknown = sorted(set(tables or ()) - set(LOAD_TASKS))
+    if unknown:
+        raise ValueError(f"Tablas desconocidas: {', '.join(unknown)}")
+    selected = [table for table in LOAD_TASKS if tables is None or table in tables]
+    dependencies = {
+        table: [d for d in deps if d in selected]
+        for table, deps in LOAD_DEPENDENCIES.items() if table in selected
+    }
+    return selected, dependencies
+
+
+def run_etl(bulk_tables=BULK_TABLES, transaction_mode=TRANSACTION_MODE, max_workers=POOL_SIZE,
+            streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, incremental=False, full_refresh=False,
+            extract_executor=None, extract_workers=None, json_parser=None,
+            use_cache=True, clear_cache=False, cache_max_bytes=CACHE_MAX_BYTES,
+            refresh_kpis=True, rebuild_kpis=False, retention_months=None,
+            metrics_dir=METRICS_DIR, profile=None, rejects_sink="table", tables=None):
+    """
+    tables: tablas de LOAD_TASKS a cargar (None = todas). Sólo se leen y
+    transforman los datasets que esas tablas necesitan.
+    """
+
+    reset_metrics()
     etl_start = time.time()
+    run_id = start_run(sink=rejects_sink)
+    logger.info(f"run_id: {run_id}")
+    with profiling(profile, metrics_dir):
+        summary = _run_etl(
+            bulk_tables, transaction_mode, max_workers, streaming, chunk_size, incremental,
+            full_refresh, extract_executor, extract_workers, json_parser, use_cache, clear_cache,
+            cache_max_bytes, refresh_kpis, rebuild_kpis, retention_months, tables,
+        )
+    sample_memory()
 
-    # 1️⃣ EXTRACT
     try:
-        t0 = time.time()
-        raw = extract_all()
-        logger.info(f"EXTRACT completado en {time.time() - t0:.3f} s")
+        flush_rejects()
     except Exception as e:
-        logger.error(f"FALLO EN EXTRACT: {e}", exc_info=True)
-        return
+        logger.error(f"Error escribiendo registros rechazados: {e}", exc_info=True)
 
-    # 2️⃣ TRANSFORM
+    # métricas de la corrida, también cuando falló (summary None)
     try:
-        t0 = time.time()
-        data = transform_all(raw)
-        logger.info(f"TRANSFORM completado en {time.time() - t0:.3f} s")
+        report = write_run_report(
+            os.path.join(metrics_dir, "run_report.json"),
+            run_id=run_id,
+            status="ok" if summary is not None else "failed",
+            duration_seconds=round(time.time() - etl_start, 3),
+            summary=summary,
+            identity=match_report(),
+            unconverted=conversion_report(),
+            date_failures=date_failure_report("date"),
+            integer_failures=date_failure_report("integer"),
+            rejects={"/".join(k): v for k, v in reject_report().items()},
+            frame_memory=compaction_report(),
+        )
+        write_prometheus(os.path.join(metrics_dir, "etl.prom"))
+        logger.info(f"Métricas escritas en {report}")
     except Exception as e:
-        logger.error(f"FALLO EN TRANSFORM: {e}", exc_info=True)
+        logger.error(f"Error escribiendo métricas: {e}", exc_info=True)
+    return summary
+
+
+def _hold_back_watermark(tracker, df, stage, table, reason):
+    # filas sin cliente o rechazadas por la BD: la marca de agua no las salta
+    if stage != "load" or table not in LOAD_TASKS:
         return
+    files, date_col = SOURCE_FILES[LOAD_TASKS[table][1]]
+    if date_col is not None and date_col in df:
+        tracker.hold_back(files, df[date_col])
 
-    # 3️⃣ LOAD
-    summary = {
-        "customers": 0, "orders": 0, "reviews": 0,
-        "competitor": 0, "support": 0,
-        "marketing": 0, "campaigns": 0, "inventory": 0
-    }
 
-    # Customers
-    try:
-        customer_map = load_customers(data["customers"])
-        summary["customers"] = len(customer_map)
-    except Exception as e:
-        logger.error(f"Error CUSTOMERS: {e}", exc_info=True)
-        customer_map = {}
+def _run_etl(bulk_tables, transaction_mode, max_workers, streaming, chunk_size, incremental,
+             full_refresh, extract_executor, extract_workers, json_parser, use_cache, clear_cache,
+             cache_max_bytes, refresh_kpis, rebuild_kpis, retention_months, tables):
 
-    # Orders
-    try:
-        load_orders(data["orders"], customer_map)
-        summary["orders"] = len(data["orders"])
-    except Exception as e:
-        logger.error(f"Error ORDERS: {e}", exc_info=True)
+    logger.info("===== 🚀 INICIANDO ETL COMPLETO =====")
+    etl_start = time.time()
+    reset_date_failures()
+    reset_match_report()
+    reset_conversion_report()
+    reset_compaction_report()
 
-    # Reviews
     try:
-        load_reviews(data["reviews"], customer_map)
-        summary["reviews"] = len(data["reviews"])
-    except Exception as e:
-        logger.error(f"Error REVIEWS: {e}", exc_info=True)
+        selected, dependencies = select_tables(tables)
+    except ValueError as e:
+        logger.error(str(e))
+        return
+    keys = [LOAD_TASKS[table][1] for table in selected]
+    if tables is not None:
+        logger.info(f"Tablas seleccionadas: {', '.join(selected)}")
 
-    # Competitor pricing
-    try:
-        load_competitor_pricing(data["competitor_pricing"])
-        summary["competitor"] = len(data["competitor_pricing"])
-    except Exception as e:
-        logger.error(f"Error COMPETITOR: {e}", exc_info=True)
+    tracker = None
+    if incremental or full_refresh:
+        try:
+            tracker = WatermarkTracker.load(full_refresh=full_refresh)
+            add_reject_listener(partial(_hold_back_watermark, tracker))
+            logger.info("Modo incremental" + (" (full refresh)" if full_refresh else ""))
+        except Exception as e:
+            logger.error(f"FALLO LEYENDO MARCAS DE AGUA: {e}", exc_info=True)
+            return
 
-    # Support tickets
-    try:
-        if "support_tickets" in data:
-            load_support_tickets(data["support_tickets"], customer_map)
-            summary["support"] = len(data["support_tickets"])
-        else:
-            logger.warning("⚠ No support data found in extract stage.")
-    except Exception as e:
-        logger.error(f"Error SUPPORT: {e}", exc_info=True)
+    if streaming or tracker is not None:
+        # 1️⃣+2️⃣ EXTRACT/TRANSFORM perezosos: los chunks se leen y
+        # transforman a medida que la fase LOAD los consume; en modo
+        # incremental los archivos sin cambios ni siquiera se abren
+        try:
+            size = chunk_size if streaming else FULL_FILE_CHUNK
+            with timer("stage", stage="extract") as t:
+                sources = stream_sources(size, tracker, keys=keys)
+            sample_memory("extract")
+            logger.info(f"STREAMING preparado en {t.seconds:.3f} s (chunk_size={size})")
+        except Exception as e:
+            logger.error(f"FALLO EN EXTRACT: {e}", exc_info=True)
+            return
+    else:
+        # caché columnar de extract/transform (sólo en modo batch completo)
+        cache = None
+        if use_cache or clear_cache:
+            try:
+                cache = DatasetCache(max_bytes=cache_max_bytes)
+                if clear_cache:
+                    cache.clear()
+                    logger.info("Caché de datasets vaciada")
+            except Exception as e:
+                logger.warning(f"Caché de datasets deshabilitada: {e}")
+                cache = None
+        if not use_cache:
+            cache = None
 
-    # Marketing sends
-    try:
-        load_marketing_sends(data["email_sends"], customer_map)
-        summary["marketing"] = len(data["email_sends"])
-    except Exception as e:
-        logger.error(f"Error MARKETING: {e}", exc_info=True)
+        # grafo perezoso: sólo los archivos y transformaciones de las tablas
+        # seleccionadas, cada entrada compartida (p. ej. customers) una vez
+        graph = TransformGraph(
+            extract=lambda names: extract_all(executor=extract_executor, max_workers=extract_workers,
+                                              parser=json_parser, cache=cache, names=names),
+            cache=cache,
+        )
 
-    # Campaigns
-    try:
-        load_campaigns(data["campaigns"])
-        summary["campaigns"] = len(data["campaigns"])
-    except Exception as e:
-        logger.error(f"Error CAMPAIGNS: {e}", exc_info=True)
+        # 1️⃣ EXTRACT
+        try:
+            if not graph.missing_raw(keys):
+                # las salidas pedidas siguen vigentes en caché: no hace falta leer nada
+                logger.info("EXTRACT omitido: transformaciones vigentes en caché")
+            else:
+                with timer("stage", stage="extract") as t:
+                    names = graph.load_raw(keys)
+                sample_memory("extract")
+                logger.info(f"EXTRACT completado en {t.seconds:.3f} s ({len(names)} datasets)")
+        except Exception as e:
+            logger.error(f"FALLO EN EXTRACT: {e}", exc_info=True)
+            return
 
-    # Inventory adjustments
+        # 2️⃣ TRANSFORM
+        try:
+            with timer("stage", stage="transform") as t:
+                data = graph.build(keys)
+            sample_memory("transform")
+            logger.info(f"TRANSFORM completado en {t.seconds:.3f} s")
+        except Exception as e:
+            logger.error(f"FALLO EN TRANSFORM: {e}", exc_info=True)
+            return
+
+        # 2️⃣b dimensión products: un único upsert antes de los hechos con FK
+        try:
+            with timer("stage", stage="products") as t:
+                n = ensure_products(data)
+            logger.info(f"PRODUCTS: {n} productos nuevos o actualizados en {t.seconds:.3f} s")
+        except Exception as e:
+            logger.error(f"FALLO EN PRODUCTS: {e}", exc_info=True)
+            return
+
+        sources = {key: (lambda df=df: iter([df])) for key, df in data.items()}
+
+    # 2️⃣c particiones mensuales, confirmadas antes de abrir las
+    # transacciones de carga (ver etl/partitions.py)
     try:
-        load_inventory(data["inventory_adjustments"])
-        summary["inventory"] = len(data["inventory_adjustments"])
+        with timer("stage", stage="partitions") as t:
+            if streaming or tracker is not None:
+                created = _create_partitions(selected, chunk_size=size)
+            else:
+                created = _create_partitions(selected, data)
+        if created:
+            logger.info(f"PARTICIONES: {len(created)} nuevas en {t.seconds:.3f} s ({', '.join(created)})")
     except Exception as e:
-        logger.error(f"Error INVENTORY: {e}", exc_info=True)
+        logger.error(f"FALLO CREANDO PARTICIONES: {e}", exc_info=True)
+        return
+
+    # 3️⃣ LOAD
+    summary = {LOAD_TASKS[table][0]: 0 for table in selected}
+
+    # claves cargadas en la corrida -> refresco incremental de kpi_*
+    kpis = KpiTracker() if refresh_kpis or rebuild_kpis else None
+
+    # con una sola conexión compartida (single/savepoint) no hay paralelismo
+    workers = max_workers if transaction_mode == "per_table" else 1
+
+    def before_load(table, chunk):
+        # cada chunk transformado, antes de cargarlo: claves para kpi_* y
+        # productos nuevos (en batch ya están todos en la caché)
+        if kpis is not None:
+            kpis.add(table, chunk)
+        ensure_products({LOAD_TASKS[table][1]: chunk})
+
+    for table in selected:
+        if LOAD_TASKS[table][1] not in sources:
+            logger.warning(f"⚠ No {table} data found in transform stage.")
+    selected = [table for table in selected if LOAD_TASKS[table][1] in sources]
+
+    outcome, failed, aborted = _run_sync_load(
+        selected, dependencies, sources, bulk_tables, transaction_mode, workers, before_load, tracker,
+    )
+
+    # tabla -> {inserted, skipped, rejected} de las tablas cargadas
+    loaded = {}
+    for table, res in outcome.items():
+        if res["status"] != "ok":
+            continue
+        summary[LOAD_TASKS[table][0]], loaded[table] = res["result"]
+
+    if aborted:
+        logger.error(f"Transacción única revertida por fallo en: {failed}")
+        summary = {k: 0 for k in summary}
+        loaded = {}
+    elif failed:
+        logger.warning(f"Tablas revertidas: {failed}")
+    sample_memory("load")
+
+    # filas confirmadas por tabla (las revertidas no cuentan); las sin
+    # cliente y las que rechaza la BD ya suman en rows_rejected por motivo
+    for table, res in outcome.items():
+        if res["status"] != "ok" or aborted or table in failed:
+            count("load_failures", table=table)
+            loaded.pop(table, None)
+            continue
+        count("rows_inserted", loaded[table]["inserted"], table=table)
+
+    if tracker is not None and not aborted:
+        files = [
+            f for table, res in outcome.items()
+            if res["status"] == "ok" and table not in failed
+            for f in SOURCE_FILES[LOAD_TASKS[table][1]][0]
+        ]
+        try:
+            tracker.commit(files)
+        except Exception as e:
+            logger.error(f"Error guardando marcas de agua: {e}", exc_info=True)
+        if tracker.released:
+            # sus filas pendientes quedan sólo en etl_rejects
+            count("watermark_holds_released", len(tracker.released))
+            logger.warning(f"⚠ Retención de marca de agua vencida, se libera: {sorted(tracker.released)}")
+
+    # retención: DROP de particiones mensuales viejas (sin DELETE por fecha)
+    if retention_months is not None and not aborted:
+        cutoff = pd.Timestamp.now(tz="UTC").tz_localize(None).normalize().replace(day=1)
+        cutoff -= pd.DateOffset(months=retention_months)
+        try:
+            with timer("stage", stage="retention"), connection_scope() as conn:
+                cur = conn.cursor()
+                for table in PARTITIONED_TABLES:
+                    removed = drop_partitions_before(cur, table, cutoff)
+                    count("partitions_dropped", len(removed), table=table)
+                    if removed:
+                        logger.info(f"Retención {table}: particiones eliminadas {removed}")
+                cur.close()
+        except Exception as e:
+            logger.error(f"Error aplicando retención: {e}", exc_info=True)
+
+    # KPI materializados: sólo las claves de tablas confirmadas
+    kpi_rows = {}
+    if kpis is not None and not aborted:
+        try:
+            confirmed = [
+                table for table, res in outcome.items()
+                if res["status"] == "ok" and table not in failed
+            ]
+            with timer("stage", stage="kpi") as t:
+                kpi_rows = kpis.refresh(tables=confirmed, full=rebuild_kpis or full_refresh)
+            sample_memory("kpi")
+            for kpi, n in kpi_rows.items():
+                count("kpi_rows_refreshed", n, kpi=kpi)
+            logger.info(f"KPI refrescados en {t.seconds:.3f} s")
+        except Exception as e:
+            logger.error(f"Error refrescando tablas KPI: {e}", exc_info=True)
 
     # 4️⃣ Summary
     logger.info("\n========== ETL SUMMARY ==========")
     for k, v in summary.items():
         logger.info(f"{k.upper():20} → {v}")
 
+    _log_load_counts(loaded)
+
+    if kpi_rows:
+        logger.info("---- KPI materializados (filas recalculadas) ----")
+        for k, v in kpi_rows.items():
+            logger.info(f"{k.upper():24} → {v}")
+
+    matches = match_report()
+    if matches.get("orders"):
+        logger.info("---- Resolución de cliente en órdenes ----")
+        for strategy in STRATEGIES + ("unmatched",):
+            n = matches.get(strategy, 0)
+            logger.info(f"{strategy.upper():20} → {n} ({n / matches['orders']:.1%})")
+
+    unconverted = conversion_report()
+    if unconverted:
+        logger.info(f"---- Órdenes sin tasa de cambio a {REPORTING_CURRENCY} (monto convertido NULL) ----")
+        for currency, n in unconverted.items():
+            logger.warning(f"{currency:20} → {n}")
+
+    date_failures = {k: v for k, v in date_failure_report("date").items() if v["failed"]}
+    if date_failures:
+        logger.info("---- Fechas no reconocidas (quedan NULL) ----")
+        for col, v in date_failures.items():
+            logger.warning(f"{col:40} → {v['failed']}/{v['total']} ej: {v['samples']}")
+
+    integer_failures = {k: v for k, v in date_failure_report("integer").items() if v["failed"]}
+    if integer_failures:
+        logger.info("---- Enteros no reconocidos o con decimales (quedan NULL) ----")
+        for col, v in integer_failures.items():
+            logger.warning(f"{col:40} → {v['failed']}/{v['total']} ej: {v['samples']}")
+
+    compacted = compaction_report()
+    if compacted:
+        logger.info("---- Memoria de frames transformados (antes → después) ----")
+        for dataset, m in compacted.items():
+            saved = 1 - m["after"] / m["before"] if m["before"] else 0.0
+            logger.info(f"{dataset:28} {m['before'] / 1024 ** 2:10.2f} MB → "
+                        f"{m['after'] / 1024 ** 2:10.2f} MB (-{saved:.0%})")
+
+    rejected = reject_report()
+    if rejected:
+        logger.info("---- Registros rechazados (etl_rejects) ----")
+        for (stage, table, reason), n in sorted(rejected.items()):
+            logger.info(f"{f'{stage}/{table}/{reason}':50} → {n}")
+
     logger.info(f"⏳ Duración total: {time.time() - etl_start:.3f} s")
     logger.info("===== ✔ ETL COMPLETADO =====")
+    return summary
+
+
+def _log_load_counts(loaded: dict):
+    """loaded: tabla -> {inserted, skipped, rejected} (etl_work_units en shards)."""
+    if loaded:
+        logger.info("---- Filas nuevas en LOAD (las que ya estaban se omiten) ----")
+        for k, v in loaded.items():
+            logger.info(f"{k.upper():28} → {v['inserted']}")
+    for key, title in (("skipped", "Descartados en LOAD sin cliente"), ("rejected", "Rechazados por la BD")):
+        rows = {k: v[key] for k, v in loaded.items() if v.get(key)}
+        if rows:
+            logger.info(f"---- {title} (ver etl_rejects) ----")
+            for k, v in rows.items():
+                logger.info(f"{k.upper():28} → {v}")
+
+
+def _create_partitions(tables, data: dict = None, chunk_size: int = None) -> list:
+    """
+    Crea los meses que la carga va a necesitar: de los DataFrames ya
+    transformados (data) o, en streaming / incremental, leyendo la columna
+    de fecha de los archivos origen.
+    """
+    partitioned = {t: LOAD_TASKS[t][1] for t in tables if t in PARTITIONED_TABLES}
+    if data is None:
+        return create_source_partitions(partitioned, chunk_size)
+    created = []
+    for table, data_key in partitioned.items():
+        df = data.get(data_key)
+        if df is None or df.empty:
+            continue
+        parts = split_by_partition(table, df[[PARTITIONED_TABLES[table]]])
+        created += ensure_partitions(table, [month for _, month, _ in parts])
+    return created
+
+
+def _run_sync_load(tables, dependencies, sources, bulk_tables, transaction_mode, workers, before_load, tracker):
+    """Fase LOAD con pg8000 sobre LoadSession. Devuelve (outcome, tablas revertidas, abortada)."""
+    with LoadSession(mode=transaction_mode) as session:
+
+        def make_task(table, data_key, row_loader, bulk_loader):
+            loader = bulk_loader if table in bulk_tables else row_loader
+
+            @timer("load_table", table=table)
+            def task(results):
+                rows, customer_map = 0, {}
+                stats = {"inserted": 0, "skipped": 0, "rejected": 0}
+                with session.table(table) as conn:
+                    customers = results["customers"][1]["customer_map"] if "customers" in results else None
+                    needs_map = loader is row_loader and "customers" in LOAD_DEPENDENCIES.get(table, ())
+                    if customers is None and needs_map:
+                        # customers fuera de la selección: los clientes ya cargados
+                        cur = conn.cursor()
+                        customers = fetch_customer_map(cur)
+                        cur.close()
+                    for chunk in sources[data_key]():
+                        rows += len(chunk)
+                        before_load(table, chunk)
+                        if table == "customers":
+                            loaded = loader(chunk, conn=conn)
+                            customer_map.update(loaded)
+                            stats["inserted"] += len(loaded)
+                            continue
+                        if "customers" in LOAD_DEPENDENCIES.get(table, ()):
+                            result = loader(chunk, customers, conn=conn)
+                        else:
+                            result = loader(chunk, conn=conn)
+                        # insertadas / sin cliente / rechazadas por la BD (detalle en etl_rejects)
+                        for k in stats:
+                            stats[k] += (result or {}).get(k, 0)
+                    if table == "customers" and tracker is not None:
+                        # las órdenes nuevas pueden apuntar a clientes de corridas previas
+                        cur = conn.cursor()
+                        customer_map.update(fetch_customer_map(cur))
+                        cur.close()
+                if table == "customers":
+                    stats["customer_map"] = customer_map
+                return rows, stats
+            return task
+
+        tasks = {table: make_task(table, *LOAD_TASKS[table][1:]) for table in tables}
+
+        # en streaming la carga consume los chunks: incluye extract/transform perezosos
+        with timer("stage", stage="load"):
+            outcome = run_dag(tasks, dependencies, max_workers=workers)
+    return outcome, list(session.failed), session.aborted
+
+
+# ==============================
+# EJECUCIÓN POR SHARDS (etl/shards.py)
+#
+# plan_shards (coordinador) registra las unidades del lote en
+# etl_work_units; run_shard_worker (uno o más procesos, en uno o varios
+# hosts con los mismos archivos y la misma BD) las reclama y carga;
+# reconcile_shards cierra el lote. run_sharded hace las tres cosas con
+# N workers locales.
+# ==============================
+
+def plan_shards(tables=None, parts: int = SHARD_PARTS, batch_id: str = None) -> str:
+    """Registra las unidades de un lote nuevo (o completa batch_id). Devuelve el batch_id."""
+    selected, dependencies = select_tables(tables)
+    batch_id = batch_id or new_run_id()
+    tables = {table: LOAD_TASKS[table][1] for table in selected}
+    # meses creados antes de que arranque cualquier worker (ver etl/shards.py)
+    created = create_source_partitions(tables)
+    n = plan_units(tables, dependencies, batch_id, parts=parts)
+    logger.info(f"Lote {batch_id}: {n} unidades de trabajo ({', '.join(selected)}), "
+                f"{len(created)} particiones nuevas")
+    return batch_id
+
+
+def run_shard_worker(batch_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE, rejects_sink="table",
+                     max_units: int = None) -> dict:
+    """Procesa unidades del lote hasta agotarlas. Devuelve tabla -> {units, rows, skipped, failed}."""
+    # los rechazos de todos los workers quedan con el id del lote
+    start_run(run_id=batch_id, sink=rejects_sink)
+    loaders = {table: (data_key, bulk_loader) for table, (_, data_key, _, bulk_loader) in LOAD_TASKS.items()}
+    stats = run_worker(
+        batch_id, loaders, chunk_size,
+        before_load=lambda table, chunk: ensure_products({LOAD_TASKS[table][1]: chunk}),
+        after_unit=lambda unit: flush_rejects(),
+        max_units=max_units,
+    )
+    for table, st in stats.items():
+        logger.info(f"{table:28} unidades {st['units']} (fallidas {st['failed']}) → {st['rows']} filas")
+    return stats
+
+
+def reconcile_shards(batch_id: str, refresh_kpis: bool = True, metrics_dir=METRICS_DIR):
+    """
+    Cierre del lote: summary por tabla desde etl_work_units y refresco
+    completo de kpi_* (cada worker vio sólo sus claves). Devuelve None
+    si quedan unidades sin cargar.
+    """
+    status = batch_status(batch_id)
+    if not status:
+        logger.error(f"Lote {batch_id} sin unidades de trabajo")
+        return
+
+    summary, loaded, unfinished = {}, {}, {}
+    for table, (summary_key, _, _, _) in LOAD_TASKS.items():
+        if table not in status:
+            continue
+        done = status[table]["status"].get("done", {"rows": 0, "inserted": 0, "skipped": 0, "rejected": 0})
+        summary[summary_key] = done["rows"]
+        loaded[table] = {k: done[k] for k in ("inserted", "skipped", "rejected")}
+        rest = {st: v["units"] for st, v in status[table]["status"].items() if st != "done"}
+        if rest:
+            unfinished[table] = rest
+
+    logger.info(f"\n========== SHARDS {batch_id} ==========")
+    for k, v in summary.items():
+        logger.info(f"{k.upper():20} → {v}")
+    _log_load_counts(loaded)
+
+    ok = not unfinished
+    if unfinished:
+        # una dimensión fallida deja 'pending' a las tablas que dependen de ella
+        failed = {table for table, rest in unfinished.items() if "failed" in rest}
+        for table, rest in unfinished.items():
+            blocked = [d for d in status[table]["depends_on"] if d in failed]
+            note = f" (bloqueada por {', '.join(blocked)})" if blocked else ""
+            logger.error(f"{table}: unidades sin cargar {rest}{note}")
+    elif refresh_kpis:
+        try:
+            with timer("stage", stage="kpi") as t:
+                kpi_rows = KpiTracker().refresh(tables=list(status), full=True)
+            for kpi, n in kpi_rows.items():
+                count("kpi_rows_refreshed", n, kpi=kpi)
+            logger.info(f"KPI refrescados en {t.seconds:.3f} s")
+        except Exception as e:
+            logger.error(f"Error refrescando tablas KPI: {e}", exc_info=True)
+
+    try:
+        write_run_report(os.path.join(metrics_dir, "run_report.json"), run_id=batch_id,
+                         status="ok" if ok else "failed", summary=summary, shards=status)
+    except Exception as e:
+        logger.error(f"Error escribiendo métricas: {e}", exc_info=True)
+    return summary if ok else None
+
+
+def run_sharded(shards: int, tables=None, parts: int = SHARD_PARTS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                rejects_sink="table", refresh_kpis: bool = True, metrics_dir=METRICS_DIR):
+    """Coordinador + shards workers locales (procesos) + reconciliación."""
+    reset_metrics()
+    try:
+        batch_id = plan_shards(tables, parts)
+    except Exception as e:
+        logger.error(f"FALLO PLANIFICANDO SHARDS: {e}", exc_info=True)
+        return
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        futures = [pool.submit(run_shard_worker, batch_id, chunk_size, rejects_sink) for _ in range(shards)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Worker de shards terminó con error: {e}", exc_info=True)
+    return reconcile_shards(batch_id, refresh_kpis, metrics_dir)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ETL e-commerce -> PostgreSQL")
+    parser.add_argument("--incremental", action="store_true",
+                        help="procesa sólo archivos/registros nuevos según etl_watermarks")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="ignora las marcas de agua, recarga todo y las reescribe")
+    parser.add_argument("--streaming", action="store_true",
+                        help="lee y carga los JSON en chunks de tamaño fijo")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--transaction-mode", choices=["per_table", "single", "savepoint"],
+                        default=TRANSACTION_MODE)
+    parser.add_argument("--extract-executor", choices=["thread", "process"], default=None,
+                        help="lee los JSON en paralelo (por defecto secuencial)")
+    parser.add_argument("--extract-workers", type=int, default=None)
+    parser.add_argument("--json-parser", choices=sorted(PARSERS), default=None,
+                        help="backend de parseo JSON (por defecto el más rápido instalado; pyarrow sólo lee NDJSON)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="no usa la caché columnar de extract/transform")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="vacía la caché antes de correr")
+    parser.add_argument("--cache-max-mb", type=int, default=CACHE_MAX_BYTES // 1024 ** 2)
+    parser.add_argument("--no-kpi-refresh", action="store_true",
+                        help="no actualiza las tablas kpi_* al terminar la carga")
+    parser.add_argument("--rebuild-kpis", action="store_true",
+                        help="recalcula las tablas kpi_* completas en vez de sólo las claves tocadas")
+    parser.add_argument("--retention-months", type=int, default=None,
+                        help="elimina las particiones mensuales de hechos más viejas que N meses")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR,
+                        help="dónde escribir run_report.json, etl.prom y las salidas de --profile")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None,
+                        help="perfila la corrida con cProfile o tracemalloc")
+    parser.add_argument("--rejects-sink", choices=REJECT_SINKS, default="table",
+                        help="dónde guardar los registros rechazados: tabla etl_rejects o rejects/<run_id>/")
+    parser.add_argument("--tables", type=lambda s: [t.strip() for t in s.split(",") if t.strip()],
+                        default=None, help="carga sólo estas tablas (separadas por coma, p. ej. orders,reviews)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="carga por unidades de trabajo con N procesos worker locales (etl/shards.py)")
+    parser.add_argument("--shard-parts", type=int, default=SHARD_PARTS,
+                        help="rangos de chunks en que se parte cada archivo origen (cada rango "
+                             "vuelve a leer y parsear el archivo completo: reparte transformación "
+                             "y carga, no la lectura)")
+    parser.add_argument("--shard-plan", action="store_true",
+                        help="sólo registra las unidades de un lote nuevo e imprime su batch_id")
+    parser.add_argument("--shard-worker", metavar="BATCH_ID", default=None,
+                        help="procesa unidades del lote hasta agotarlas (se puede lanzar en varios hosts)")
+    parser.add_argument("--shard-reconcile", metavar="BATCH_ID", default=None,
+                        help="verifica el lote, refresca kpi_* y escribe el summary")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    run_etl()
+    args = parse_args()
+    if args.shard_plan:
+        print(plan_shards(args.tables, args.shard_parts))
+    elif args.shard_worker:
+        run_shard_worker(args.shard_worker, args.chunk_size, args.rejects_sink)
+    elif args.shard_reconcile:
+        reconcile_shards(args.shard_reconcile, not args.no_kpi_refresh, args.metrics_dir)
+    elif args.shards:
+        run_sharded(args.shards, args.tables, args.shard_parts, args.chunk_size, args.rejects_sink,
+                    not args.no_kpi_refresh, args.metrics_dir)
+    else:
+        run_etl(
+            transaction_mode=args.transaction_mode,
+            streaming=args.streaming,
+            chunk_size=args.chunk_size,
+            incremental=args.incremental,
+            full_refresh=args.full_refresh,
+            extract_executor=args.extract_executor,
+            extract_workers=args.extract_workers,
+            json_parser=args.json_parser,
+            use_cache=not args.no_cache,
+            clear_cache=args.clear_cache,
+            cache_max_bytes=args.cache_max_mb * 1024 ** 2,
+            refresh_kpis=not args.no_kpi_refresh,
+            rebuild_kpis=args.rebuild_kpis,
+            retention_months=args.retention_months,
+            metrics_dir=args.metrics_dir,
+            profile=args.profile,
+            rejects_sink=args.rejects_sink,
+            tables=args.tables,
+        )
@@ -31,17 +31,23 @@ CREATE TABLE customers (
 );
 
 CREATE TABLE orders (
-    order_pk SERIAL PRIMARY KEY,
+    order_pk SERIAL,
     order_id VARCHAR(100),
     customer_pk INTEGER NOT NULL REFERENCES customers(customer_pk),
     total_amount NUMERIC(12,2),
     currency VARCHAR(10),
+    -- total_amount convertido a la moneda de reporte (USD) con la tasa
+    -- vigente a order_date; NULL si no hay tasa (ver etl/currency.py)
+    total_amount_reporting NUMERIC(14,2),
+    fx_rate NUMERIC(18,10),
     order_date TIMESTAMP,
     status VARCHAR(50),
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
-    CONSTRAINT uq_order_id UNIQUE(order_id)
-);
+    -- en una tabla particionada la clave única debe incluir la columna de
+    -- partición: order_id solo es único por el ETL (ver sección 2b)
+    CONSTRAINT uq_order_id UNIQUE(order_id, order_date)
+) PARTITION BY RANGE (order_date);
 
 
 
@@ -104,8 +110,8 @@ CREATE TABLE support_tickets (
 );
 
 CREATE TABLE marketing_sends (
-    send_pk SERIAL PRIMARY KEY,
-    send_id VARCHAR(100) UNIQUE,
+    send_pk SERIAL,
+    send_id VARCHAR(100),
     customer_pk INTEGER REFERENCES customers(customer_pk),
     campaign_id VARCHAR(100),
     sent_date TIMESTAMP,
@@ -117,8 +123,9 @@ CREATE TABLE marketing_sends (
     opened BOOLEAN,
     clicked BOOLEAN,
     converted BOOLEAN,
-    unsubscribed BOOLEAN
-);
+    unsubscribed BOOLEAN,
+    CONSTRAINT uq_send_id UNIQUE(send_id, sent_date)
+) PARTITION BY RANGE (sent_date);
 
 CREATE TABLE campaigns (
     campaign_pk SERIAL PRIMARY KEY,
@@ -137,8 +144,8 @@ CREATE TABLE campaigns (
 );
 
 CREATE TABLE inventory_adjustments (
-    inv_pk SERIAL PRIMARY KEY,
-    adjustment_id VARCHAR(100) UNIQUE,
+    inv_pk SERIAL,
+    adjustment_id VARCHAR(100),
     product_id VARCHAR(100),
     movement_type VARCHAR(20),
     quantity_change INT,
@@ -147,8 +154,48 @@ CREATE TABLE inventory_adjustments (
     warehouse VARCHAR(50),
     adjustment_date TIMESTAMP,
     user_name TEXT,
-    reason TEXT
-);
+    reason TEXT,
+    CONSTRAINT uq_adjustment_id UNIQUE(adjustment_id, adjustment_date)
+) PARTITION BY RANGE (adjustment_date);
+
+
+
+/* =====================================================================
+   2b) PARTICIONES MENSUALES DE HECHOS
+   orders / marketing_sends / inventory_adjustments se particionan por
+   mes sobre su fecha (UTC). Las particiones mensuales (orders_p202401,
+   ...) las crea el ETL al ver un mes nuevo (etl/partitions.py) y cada
+   chunk se inserta directo en la suya. Aquí sólo va la DEFAULT, que
+   recibe las filas sin fecha; como la clave única del padre incluye la
+   fecha (NULL nunca choca), la DEFAULT lleva además su propio índice
+   único sobre el id.
+
+   Unicidad de la clave de negocio: PostgreSQL no admite un UNIQUE sobre
+   el padre que no incluya la columna de partición, así que
+   UNIQUE(order_id, order_date) sólo impide repetir el id en la misma
+   fecha. El ETL completa la garantía: cada merge (etl/bulk_load.py,
+   etl/load.py) descarta los ids que ya existen en
+   cualquier partición (NOT EXISTS sobre el padre, que usa el índice
+   por (id, fecha) de cada partición) y deja uno solo por lote
+   (DISTINCT ON; transform rechaza antes los repetidos del origen como
+   duplicate_<id>). Límite: dos transacciones
+   concurrentes que carguen el mismo id con fechas de meses distintos no
+   se ven entre sí y ambas insertan; los ids vienen de un único archivo
+   por tabla, así que sólo ocurre con duplicados en el origen repartidos
+   en shards distintos (--shard-parts > 1). Las escrituras que no pasan
+   por el ETL no tienen esta garantía. Para detectar duplicados:
+       SELECT order_id FROM orders GROUP BY order_id HAVING COUNT(*) > 1;
+   ===================================================================== */
+
+CREATE TABLE orders_default PARTITION OF orders DEFAULT;
+CREATE UNIQUE INDEX uq_orders_default_order_id ON orders_default(order_id);
+
+CREATE TABLE marketing_sends_default PARTITION OF marketing_sends DEFAULT;
+CREATE UNIQUE INDEX uq_marketing_sends_default_send_id ON marketing_sends_default(send_id);
+
+CREATE TABLE inventory_adjustments_default PARTITION OF inventory_adjustments DEFAULT;
+CREATE UNIQUE INDEX uq_inventory_adjustments_default_adjustment_id
+    ON inventory_adjustments_default(adjustment_id);
 
 
 
@@ -161,24 +208,19 @@ DROP TABLE IF EXISTS products CASCADE;
 CREATE TABLE products (
     product_id VARCHAR(100) PRIMARY KEY,
     product_name TEXT,
+    category_id VARCHAR(50),
     category TEXT,
     subcategory TEXT,
     brand TEXT,
+    unit_cost NUMERIC,
+    unit_price NUMERIC,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
-INSERT INTO products (product_id)
-SELECT DISTINCT product_id
-FROM (
-    SELECT product_id FROM reviews
-    UNION ALL
-    SELECT product_id FROM competitor_pricing
-    UNION ALL
-    SELECT product_id FROM inventory_adjustments
-) t
-WHERE product_id IS NOT NULL
-ON CONFLICT (product_id) DO NOTHING;
+-- El ETL mantiene products antes de cargar cada chunk de hechos
+-- (etl/products.py): upsert de los product_id nuevos, con costo y precio
+-- de inventory_valuation y categoría de product_categories.
 
 ALTER TABLE reviews
 ADD CONSTRAINT fk_reviews_product
@@ -268,67 +310,433 @@ CREATE INDEX idx_products_id ON products(product_id);
 
 
 /* =====================================================================
-   7) VISTAS ANALÍTICAS – KPI
+   7) KPI MATERIALIZADOS + VISTAS ANALÍTICAS
+   Las tablas kpi_* las mantiene el ETL (etl/kpi.py): después de cada
+   carga recalcula sólo los clientes / países / días / productos
+   tocados. Las vistas vw_* que consume el dashboard leen de ellas en
+   lugar de re-agregar orders y reviews completos.
    ===================================================================== */
 
+DROP TABLE IF EXISTS kpi_sales_by_customer CASCADE;
+DROP TABLE IF EXISTS kpi_sales_by_country CASCADE;
+DROP TABLE IF EXISTS kpi_sales_by_date CASCADE;
+DROP TABLE IF EXISTS kpi_reviews_by_product CASCADE;
+
+CREATE TABLE kpi_sales_by_customer (
+    customer_pk INTEGER PRIMARY KEY,
+    customer_id VARCHAR(100) UNIQUE,
+    full_name TEXT,
+    email TEXT,
+    country VARCHAR(50),
+    total_sales NUMERIC(14,2),
+    total_orders INT,
+    -- órdenes con total_amount_reporting (denominador del ticket promedio)
+    priced_orders INT,
+    avg_ticket NUMERIC(14,2),
+    first_order_date TIMESTAMP,
+    last_order_date TIMESTAMP,
+    refreshed_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE kpi_sales_by_country (
+    country VARCHAR(50) PRIMARY KEY,
+    total_sales NUMERIC(14,2),
+    total_orders INT,
+    -- órdenes con total_amount_reporting (denominador del ticket promedio)
+    priced_orders INT,
+    avg_ticket NUMERIC(14,2),
+    refreshed_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE kpi_sales_by_date (
+    date_pk DATE PRIMARY KEY,
+    year INT,
+    month INT,
+    month_name TEXT,
+    week_of_year INT,
+    day_of_month INT,
+    total_sales NUMERIC(14,2),
+    total_orders INT,
+    -- órdenes con total_amount_reporting (denominador del ticket promedio)
+    priced_orders INT,
+    refreshed_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE kpi_reviews_by_product (
+    product_id VARCHAR(100) PRIMARY KEY,
+    total_reviews INT,
+    avg_rating NUMERIC(4,2),
+    refreshed_at TIMESTAMP DEFAULT NOW()
+);
+
+/* refresco por día: DATE(order_date) = ANY(...) usa este índice */
+CREATE INDEX idx_orders_order_day ON orders ((DATE(order_date)));
+
 /* Ventas por cliente */
 CREATE OR REPLACE VIEW vw_sales_by_customer AS
 SELECT
-    c.customer_id,
-    c.full_name,
-    c.email,
-    c.country,
-    SUM(o.total_amount) AS total_sales,
-    COUNT(o.order_pk) AS total_orders,
-    AVG(o.total_amount) AS avg_ticket,
-    MIN(o.order_date) AS first_order_date,
-    MAX(o.order_date) AS last_order_date
-FROM orders o
-JOIN customers c ON c.customer_pk = o.customer_pk
-GROUP BY
-    c.customer_id, c.full_name, c.email, c.country;
+    customer_id,
+    full_name,
+    email,
+    country,
+    total_sales,
+    total_orders,
+    avg_ticket,
+    first_order_date,
+    last_order_date
+FROM kpi_sales_by_customer;
 
 /* Ventas por país */
 CREATE OR REPLACE VIEW vw_sales_by_country AS
-SELECT
-    c.country,
-    SUM(o.total_amount) AS total_sales,
-    COUNT(o.order_pk) AS total_orders,
-    AVG(o.total_amount) AS avg_ticket
-FROM orders o
-JOIN customers c ON c.customer_pk = o.customer_pk
-GROUP BY c.country;
-
-/* Ticket promedio global */
+SELECT country, total_sales, total_orders, avg_ticket
+FROM kpi_sales_by_country;
+
+/* Ticket promedio global (promedio ponderado por órdenes con monto:
+   las que no tienen tasa de cambio no suman a total_sales) */
 CREATE OR REPLACE VIEW vw_avg_ticket AS
-SELECT AVG(total_amount) AS avg_ticket_global
-FROM orders;
+SELECT SUM(total_sales) / NULLIF(SUM(priced_orders), 0) AS avg_ticket_global
+FROM kpi_sales_by_country;
 
 /* Ventas por fecha */
 CREATE OR REPLACE VIEW vw_sales_by_date AS
 SELECT
-    o.date_pk,
-    d.year,
-    d.month,
-    d.month_name,
-    d.week_of_year,
-    d.day_of_month,
-    SUM(o.total_amount) AS total_sales,
-    COUNT(o.order_pk) AS total_orders
-FROM orders o
-JOIN dim_date d ON o.date_pk = d.date_pk
-GROUP BY
-    o.date_pk, d.year, d.month, d.month_name, d.week_of_year, d.day_of_month
-ORDER BY o.date_pk;
+    date_pk,
+    year,
+    month,
+    month_name,
+    week_of_year,
+    day_of_month,
+    total_sales,
+    total_orders
+FROM kpi_sales_by_date
+ORDER BY date_pk;
 
 /* Reviews por producto */
 CREATE OR REPLACE VIEW vw_reviews_by_product AS
 SELECT
     p.product_id,
     p.product_name,
-    COUNT(r.review_pk) AS total_reviews,
-    AVG(r.rating) AS avg_rating
+    COALESCE(k.total_reviews, 0) AS total_reviews,
+    k.avg_rating
 FROM products p
-LEFT JOIN reviews r ON p.product_id = r.product_id
-GROUP BY p.product_id, p.product_name;
+LEFT JOIN kpi_reviews_by_product k ON k.product_id = p.product_id;
+
+
+
+
+/* =====================================================================
+   8) CONTROL ETL – MARCAS DE AGUA (CARGA INCREMENTAL)
+   ===================================================================== */
+
+DROP TABLE IF EXISTS etl_watermarks CASCADE;
+
+CREATE TABLE etl_watermarks (
+    source VARCHAR(200) PRIMARY KEY,
+    file_mtime DOUBLE PRECISION,
+    file_size BIGINT,
+    file_hash VARCHAR(64),
+    max_value TIMESTAMP,
+    -- corridas seguidas con la marca retenida por filas no cargadas y
+    -- desde cuándo (etl/watermark.py: MAX_HOLD_RUNS / HOLD_BACK_MAX_AGE)
+    held_runs INT NOT NULL DEFAULT 0,
+    held_since TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+
+/* =====================================================================
+   8b) CONTROL ETL – REGISTROS RECHAZADOS (etl/rejects.py)
+   Cada fila descartada por una regla de calidad (TRANSFORM), sin
+   cliente o rechazada por la BD (LOAD), con el registro original.
+   ===================================================================== */
+
+DROP TABLE IF EXISTS etl_rejects CASCADE;
+
+CREATE TABLE etl_rejects (
+    reject_pk BIGSERIAL PRIMARY KEY,
+    run_id VARCHAR(64) NOT NULL,
+    stage VARCHAR(20) NOT NULL,
+    table_name VARCHAR(100) NOT NULL,
+    reason TEXT NOT NULL,
+    record JSONB,
+    rejected_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_etl_rejects_run ON etl_rejects(run_id, table_name);
+
+
+/* =====================================================================
+   8c) CONTROL ETL – UNIDADES DE TRABAJO (EJECUCIÓN POR SHARDS)
+   Una fila por (lote, tabla, archivo origen, rango de chunks). Los
+   workers las toman con SELECT ... FOR UPDATE SKIP LOCKED (etl/shards.py)
+   y marcan 'done' en la misma transacción que carga la unidad.
+   depends_on: tablas cuyas unidades del lote tienen que estar 'done'
+   antes (p. ej. orders espera a customers).
+   ===================================================================== */
+
+DROP TABLE IF EXISTS etl_work_units CASCADE;
+
+CREATE TABLE etl_work_units (
+    unit_id BIGSERIAL PRIMARY KEY,
+    batch_id VARCHAR(64) NOT NULL,
+    table_name VARCHAR(100) NOT NULL,
+    source VARCHAR(200) NOT NULL,
+    part INT NOT NULL DEFAULT 0,
+    parts INT NOT NULL DEFAULT 1,
+    depends_on TEXT[] NOT NULL DEFAULT '{}',
+    status VARCHAR(10) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    worker VARCHAR(200),
+    attempts INT NOT NULL DEFAULT 0,
+    rows_read BIGINT,
+    rows_inserted BIGINT,   -- nuevas en la tabla (ON CONFLICT omite las existentes)
+    rows_skipped BIGINT,    -- sin cliente
+    rows_rejected BIGINT,   -- rechazadas por la BD (write_bisect)
+    error TEXT,
+    claimed_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (batch_id, table_name, source, part)
+);
+
+CREATE INDEX idx_etl_work_units_claim ON etl_work_units(batch_id, status);
+
+
 
+/* =====================================================================
+   9) TABLAS DESDE data/csv
+   Referencias, dimensiones y agregados diarios/mensuales. La clave
+   natural (PK / UNIQUE) es la misma que usa el upsert de
+   etl/csv_tables.py (ON CONFLICT ... DO UPDATE).
+   ===================================================================== */
+
+DROP TABLE IF EXISTS countries CASCADE;
+DROP TABLE IF EXISTS exchange_rates CASCADE;
+DROP TABLE IF EXISTS customer_segments CASCADE;
+DROP TABLE IF EXISTS customer_service_metrics CASCADE;
+DROP TABLE IF EXISTS customers_legacy CASCADE;
+DROP TABLE IF EXISTS discount_codes CASCADE;
+DROP TABLE IF EXISTS employee_sales CASCADE;
+DROP TABLE IF EXISTS inventory_valuation CASCADE;
+DROP TABLE IF EXISTS marketing_budget CASCADE;
+DROP TABLE IF EXISTS payment_methods_monthly CASCADE;
+DROP TABLE IF EXISTS product_categories CASCADE;
+DROP TABLE IF EXISTS product_views_daily CASCADE;
+DROP TABLE IF EXISTS product_stock_daily CASCADE;
+DROP TABLE IF EXISTS sales_summary_daily CASCADE;
+DROP TABLE IF EXISTS shipping_carriers CASCADE;
+DROP TABLE IF EXISTS shipping_zones CASCADE;
+DROP TABLE IF EXISTS social_media_daily CASCADE;
+DROP TABLE IF EXISTS supplier_orders CASCADE;
+DROP TABLE IF EXISTS website_sessions_daily CASCADE;
+
+CREATE TABLE countries (
+    country_code VARCHAR(2) PRIMARY KEY,
+    country_name VARCHAR(100),
+    currency_code VARCHAR(3),
+    tax_rate NUMERIC(6,4),
+    shipping_zone VARCHAR(50),
+    language VARCHAR(10),
+    active BOOLEAN
+);
+
+CREATE TABLE exchange_rates (
+    rate_date DATE,
+    from_currency VARCHAR(3),
+    to_currency VARCHAR(3),
+    exchange_rate NUMERIC(18,8),
+    source VARCHAR(50),
+    PRIMARY KEY (rate_date, from_currency, to_currency)
+);
+
+CREATE TABLE customer_segments (
+    customer_id VARCHAR(100) PRIMARY KEY,
+    segment VARCHAR(50),
+    total_lifetime_value NUMERIC(12,2),
+    total_orders INT,
+    avg_order_value NUMERIC(12,2),
+    last_order_date DATE,
+    days_since_last_order INT,
+    churn_risk VARCHAR(20)
+);
+
+CREATE TABLE customer_service_metrics (
+    metric_date DATE PRIMARY KEY,
+    tickets_opened INT,
+    tickets_closed INT,
+    tickets_pending INT,
+    avg_response_time_hours NUMERIC(8,2),
+    avg_resolution_time_hours NUMERIC(8,2),
+    satisfaction_score NUMERIC(4,2)
+);
+
+CREATE TABLE customers_legacy (
+    customer_id VARCHAR(100) PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    email TEXT,
+    phone VARCHAR(50),
+    registration_date TIMESTAMP,
+    country VARCHAR(50),
+    vip_status BOOLEAN
+);
+
+CREATE TABLE discount_codes (
+    code VARCHAR(50) PRIMARY KEY,
+    discount_type VARCHAR(20),
+    discount_value NUMERIC(12,2),
+    min_purchase NUMERIC(12,2),
+    max_discount NUMERIC(12,2),
+    start_date DATE,
+    end_date DATE,
+    usage_limit INT,
+    times_used INT,
+    active BOOLEAN
+);
+
+CREATE TABLE employee_sales (
+    employee_id VARCHAR(50) PRIMARY KEY,
+    employee_name TEXT,
+    role VARCHAR(50),
+    region VARCHAR(50),
+    hire_date DATE,
+    sales_q1_2024 NUMERIC(14,2),
+    commission_earned NUMERIC(12,2),
+    active BOOLEAN
+);
+
+CREATE TABLE inventory_valuation (
+    product_id VARCHAR(100) PRIMARY KEY,
+    current_stock INT,
+    unit_cost NUMERIC(12,2),
+    unit_price NUMERIC(12,2),
+    total_cost NUMERIC(14,2),
+    total_retail_value NUMERIC(14,2),
+    margin_percentage NUMERIC(6,2),
+    turnover_rate NUMERIC(8,2),
+    days_of_supply NUMERIC(8,2)
+);
+
+CREATE TABLE marketing_budget (
+    year INT,
+    month INT,
+    channel VARCHAR(50),
+    allocated_budget NUMERIC(14,2),
+    spent_budget NUMERIC(14,2),
+    target_conversions INT,
+    actual_conversions INT,
+    target_roi NUMERIC(8,2),
+    actual_roi NUMERIC(8,2),
+    PRIMARY KEY (year, month, channel)
+);
+
+CREATE TABLE payment_methods_monthly (
+    year INT,
+    month INT,
+    payment_method VARCHAR(50),
+    transaction_count INT,
+    total_amount NUMERIC(14,2),
+    avg_transaction NUMERIC(12,2),
+    success_rate NUMERIC(6,2),
+    chargeback_count INT,
+    PRIMARY KEY (year, month, payment_method)
+);
+
+CREATE TABLE product_categories (
+    category_id VARCHAR(50) PRIMARY KEY,
+    category_name TEXT,
+    parent_category TEXT,
+    description TEXT,
+    active BOOLEAN,
+    commission_rate NUMERIC(6,4)
+);
+
+CREATE TABLE product_views_daily (
+    view_date DATE,
+    product_id VARCHAR(100),
+    views INT,
+    unique_visitors INT,
+    add_to_cart INT,
+    purchases INT,
+    conversion_rate NUMERIC(8,4),
+    PRIMARY KEY (view_date, product_id)
+);
+
+CREATE TABLE product_stock_daily (
+    stock_date DATE,
+    product_id VARCHAR(100),
+    warehouse VARCHAR(50),
+    opening_stock INT,
+    sales INT,
+    returns INT,
+    adjustments INT,
+    closing_stock INT,
+    PRIMARY KEY (stock_date, product_id, warehouse)
+);
+
+CREATE TABLE sales_summary_daily (
+    summary_date DATE PRIMARY KEY,
+    total_transactions INT,
+    total_revenue NUMERIC(14,2),
+    total_items_sold INT,
+    unique_customers INT,
+    avg_order_value NUMERIC(12,2)
+);
+
+CREATE TABLE shipping_carriers (
+    carrier_id VARCHAR(50) PRIMARY KEY,
+    carrier_name TEXT,
+    country VARCHAR(50),
+    domestic_rate NUMERIC(12,2),
+    international_rate NUMERIC(12,2),
+    avg_delivery_days_domestic NUMERIC(6,2),
+    avg_delivery_days_intl NUMERIC(6,2),
+    tracking_available BOOLEAN,
+    insurance_available BOOLEAN
+);
+
+CREATE TABLE shipping_zones (
+    zone_id VARCHAR(50) PRIMARY KEY,
+    zone_name TEXT,
+    countries TEXT,
+    base_cost NUMERIC(12,2),
+    cost_per_kg NUMERIC(12,2),
+    estimated_days_min INT,
+    estimated_days_max INT,
+    active BOOLEAN
+);
+
+CREATE TABLE social_media_daily (
+    activity_date DATE,
+    platform VARCHAR(50),
+    followers INT,
+    posts INT,
+    likes INT,
+    comments INT,
+    shares INT,
+    clicks INT,
+    engagement_rate NUMERIC(8,4),
+    PRIMARY KEY (activity_date, platform)
+);
+
+CREATE TABLE supplier_orders (
+    order_id VARCHAR(100) PRIMARY KEY,
+    supplier_id VARCHAR(100),
+    order_date DATE,
+    expected_delivery DATE,
+    actual_delivery DATE,
+    total_amount NUMERIC(14,2),
+    status VARCHAR(50),
+    products_count INT
+);
+
+CREATE TABLE website_sessions_daily (
+    session_date DATE PRIMARY KEY,
+    sessions INT,
+    unique_visitors INT,
+    page_views INT,
+    bounce_rate NUMERIC(6,2),
+    avg_session_duration NUMERIC(10,2),
+    conversions INT,
+    conversion_rate NUMERIC(8,4)
+);
@@ -1,4 +1,21 @@
+import cProfile
+import functools
+import json
 import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 
 def get_logger(name: str):
     logger = logging.getLogger(name)
@@ -11,3 +28,240 @@ def get_logger(name: str):
         logger.addHandler(ch)
 
     return logger
+
+
+# =======================================================
+#  INSTRUMENTACIÓN DE LA CORRIDA
+#
+#  Registro de métricas a nivel módulo (las tareas de carga corren en
+#  hilos, se protege con un lock):
+#   - timers:   segundos acumulados / cantidad / máximo por nombre +
+#               etiquetas (stage, dataset, table, fn...)
+#   - counters: filas leídas / transformadas / insertadas / omitidas /
+#               rechazadas, round trips a la BD...
+#   - gauges:   RSS pico del proceso, pico de tracemalloc
+#
+#  Al final de la corrida se escribe un reporte JSON y un archivo en
+#  formato textfile de Prometheus (node_exporter --collector.textfile).
+#  El profiling (cProfile / tracemalloc) se activa por corrida.
+# =======================================================
+
+METRICS_PREFIX = "etl"
+
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_gauges = {}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels):
+    """Suma una duración ya medida (p. ej. la que devuelve un proceso hijo)."""
+    with _lock:
+        entry = _timers.setdefault(_key(name, labels), {"count": 0, "seconds": 0.0, "max": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+
+
+def count(name: str, value: int = 1, **labels):
+    if not value:
+        return
+    with _lock:
+        k = _key(name, labels)
+        _counters[k] = _counters.get(k, 0) + int(value)
+
+
+def gauge_max(name: str, value: float, **labels):
+    with _lock:
+        k = _key(name, labels)
+        _gauges[k] = max(_gauges.get(k, value), value)
+
+
+class timer:
+    """
+    Cronómetro usable como context manager o decorador:
+
+        with timer("stage", stage="extract"):
+            ...
+
+        @timer("load_fn")
+        def load_orders(...): ...
+
+    Como decorador agrega la etiqueta fn=<nombre de la función>.
+    """
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self.seconds = None
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._t0
+        observe(self.name, self.seconds, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        labels = {"fn": fn.__name__, **self.labels}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(self.name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def peak_rss_bytes():
+    """RSS pico del proceso (None si la plataforma no lo expone)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def sample_memory(stage: str = None):
+    """Registra el RSS pico (y el pico de tracemalloc si está activo) tras una etapa."""
+    labels = {"stage": stage} if stage else {}
+    rss = peak_rss_bytes()
+    if rss is not None:
+        gauge_max("peak_rss_bytes", rss, **labels)
+    if tracemalloc.is_tracing():
+        gauge_max("tracemalloc_peak_bytes", tracemalloc.get_traced_memory()[1], **labels)
+
+
+def reset_metrics():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def metrics_report() -> dict:
+    def expand(store, value):
+        return [{"name": n, "labels": dict(lbl), **value(v)} for (n, lbl), v in sorted(store.items())]
+
+    with _lock:
+        return {
+            "timers": expand(_timers, lambda v: {k: (round(x, 6) if isinstance(x, float) else x)
+                                                 for k, x in v.items()}),
+            "counters": expand(_counters, lambda v: {"value": v}),
+            "gauges": expand(_gauges, lambda v: {"value": v}),
+        }
+
+
+# ==============================
+# SALIDAS
+# ==============================
+
+def write_run_report(path: str, **extra) -> str:
+    """Reporte JSON de la corrida: métricas + lo que pase el llamador (summary...)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), **extra, **metrics_report()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    return path
+
+
+def _metric_name(name: str) -> str:
+    return f"{METRICS_PREFIX}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def prometheus_text() -> str:
+    report = metrics_report()
+    # el formato exige las muestras de cada familia juntas, bajo su # TYPE:
+    # se agrupan por métrica y se escriben al final, en orden de aparición
+    families = {}
+
+    def emit(metric, kind, labels, value):
+        families.setdefault(metric, (kind, []))[1].append(f"{metric}{_labels(labels)} {value}")
+
+    for t in report["timers"]:
+        base = _metric_name(t["name"])
+        emit(f"{base}_seconds_total", "counter", t["labels"], t["seconds"])
+        emit(f"{base}_calls_total", "counter", t["labels"], t["count"])
+        emit(f"{base}_seconds_max", "gauge", t["labels"], t["max"])
+    for c in report["counters"]:
+        emit(f"{_metric_name(c['name'])}_total", "counter", c["labels"], c["value"])
+    for g in report["gauges"]:
+        emit(_metric_name(g["name"]), "gauge", g["labels"], g["value"])
+
+    lines = []
+    for metric, (kind, samples) in families.items():
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str) -> str:
+    # escribir y renombrar: node_exporter nunca lee un archivo a medias
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+    return path
+
+
+# ==============================
+# PROFILING
+# ==============================
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+@contextmanager
+def profiling(mode: str = None, output_dir: str = ".", top: int = 25):
+    """
+    mode None: no hace nada. "cprofile": guarda etl.prof (abrir con
+    snakeviz / pstats) y etl_profile.txt con las `top` funciones por
+    tiempo acumulado. "tracemalloc": etl_tracemalloc.txt con las `top`
+    líneas que más memoria asignaron y registra el pico como gauge.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Modo de profiling no soportado: {mode}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    if mode == "cprofile":
+        # cProfile sólo ve el hilo principal: las tareas LOAD que corren
+        # en el pool de run_dag no aparecen (sus tiempos están en los timers)
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(os.path.join(output_dir, "etl.prof"))
+            with open(os.path.join(output_dir, "etl_profile.txt"), "w", encoding="utf-8") as f:
+                pstats.Stats(prof, stream=f).sort_stats("cumulative").print_stats(top)
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        gauge_max("tracemalloc_peak_bytes", tracemalloc.get_traced_memory()[1])
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        tracemalloc.stop()
+        with open(os.path.join(output_dir, "etl_tracemalloc.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(str(s) for s in stats) + "\n")